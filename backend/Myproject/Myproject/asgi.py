@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Myproject.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the apps are loaded.
+from report.events import route_streams  # noqa: E402
+
+application = route_streams(django_application)
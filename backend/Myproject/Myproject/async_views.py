@@ -0,0 +1,88 @@
+"""
+Base class for the async read views under ``/api/async/`` (see
+report.async_views and waste.async_views).
+"""
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from rest_framework.views import APIView
+
+from . import versions
+from .caching import acount, get_cache, get_cache_key
+
+
+class AsyncAPIView(APIView):
+    """
+    Base for the async read views.
+
+    ``dispatch`` is DRF's with an async handler: ``initial`` (content
+    negotiation, authentication, permissions and throttling, all with the
+    API's settings) runs in a thread, then the ``get`` coroutine, and
+    exceptions and the response go through ``handle_exception`` and
+    ``finalize_response`` as in any other API view. Views with
+    ``version_resources`` answer conditional requests like
+    ``ConditionalGetMixin``, and list views with a ``cache_namespace``
+    share ``CachedListMixin``'s cache.
+    """
+
+    http_method_names = ['get', 'head']
+    version_resources = ()
+    cache_namespace = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        self.versions = self.etag = self.last_modified = self.cache_status = None
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = None
+            if self.version_resources:
+                response = await self.get_not_modified_response(request)
+            if response is None:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+                response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def get_resource_versions(self):
+        return await versions.aget_versions(self.version_resources)
+
+    async def get_not_modified_response(self, request):
+        self.versions = await self.get_resource_versions()
+        self.etag, self.last_modified = versions.get_validators(
+            request, self.versions, request.accepted_renderer.format
+        )
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag and response.status_code in (200, 304):
+            versions.set_validators(response, self.etag, self.last_modified)
+        if self.cache_status:
+            response['X-Cache'] = self.cache_status
+        return response
+
+    def get_cache_scope(self):
+        return 'all'
+
+    async def get_cached(self, build):
+        """Return the cached list page, or ``await build()`` and cache it."""
+        cache = get_cache()
+        key = get_cache_key(
+            self.cache_namespace, self.get_cache_scope(), self.request,
+            self.request.accepted_renderer.format, self.versions,
+        )
+        data = await cache.aget(key)
+        if data is not None:
+            await acount(self.cache_namespace, 'hits')
+            self.cache_status = 'HIT'
+            return data
+        await acount(self.cache_namespace, 'misses')
+        self.cache_status = 'MISS'
+        data = await build()
+        await cache.aset(key, data)
+        return data
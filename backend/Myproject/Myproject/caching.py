@@ -0,0 +1,125 @@
+"""
+Shared response cache for the list endpoints.
+
+Officers and admins all see the same report list, yet each refresh used to
+run the query and serialize every row again. ``CachedListMixin`` keeps the
+serialized page in the ``api`` cache alias, keyed on:
+
+* the scope of what the user may see (``all``, or one citizen's own rows),
+  so officers share entries and citizens never see each other's;
+* the resource versions from Myproject.versions, so any committed write
+  makes every older entry unreachable, with no explicit delete; and
+* the full URL (filters, page cursor) and the rendered format.
+
+Unreachable entries are dropped by the backend's TTL and eviction. The
+backend is whatever ``CACHES['api']`` names: local memory (LRU) by default
+and in tests, a shared directory or Redis when several workers should
+share one cache. Hits and misses are counted in the cache itself so every
+worker adds to the same totals.
+"""
+import hashlib
+import json
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .versions import get_versions
+
+CACHE_ALIAS = 'api'
+COUNTER_PREFIX = 'api-cache'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def count(namespace, outcome):
+    cache = get_cache()
+    key = f'{COUNTER_PREFIX}:{outcome}:{namespace}'
+    # add() only succeeds for the first worker; everyone else increments.
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr().
+            cache.add(key, 1, timeout=None)
+
+
+async def acount(namespace, outcome):
+    cache = get_cache()
+    key = f'{COUNTER_PREFIX}:{outcome}:{namespace}'
+    if not await cache.aadd(key, 1, timeout=None):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aadd(key, 1, timeout=None)
+
+
+def get_cache_key(namespace, scope, request, renderer_format, versions):
+    fingerprint = json.dumps([
+        request.build_absolute_uri(),
+        renderer_format,
+        sorted((name, version, str(updated_at)) for name, (version, updated_at) in versions.items()),
+    ])
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()
+    return f'{namespace}:{scope}:{digest}'
+
+
+def get_counters(namespaces):
+    cache = get_cache()
+    keys = {
+        (namespace, outcome): f'{COUNTER_PREFIX}:{outcome}:{namespace}'
+        for namespace in namespaces
+        for outcome in ('hits', 'misses')
+    }
+    values = cache.get_many(list(keys.values()))
+    return {
+        namespace: {outcome: values.get(keys[namespace, outcome], 0) for outcome in ('hits', 'misses')}
+        for namespace in namespaces
+    }
+
+
+class CachedListMixin:
+    """
+    Serve ``list`` from the ``api`` cache.
+
+    Put it after ``ConditionalGetMixin`` in the bases so a 304 is decided
+    first and the versions it read are reused for the key. Views set
+    ``cache_namespace`` and may override ``get_cache_scope()``, which by
+    default treats the list as the same for every user.
+    """
+
+    cache_namespace = None
+    cache_status = None
+
+    def get_cache_scope(self):
+        return 'all'
+
+    def get_cache_key(self, request):
+        versions = getattr(self, 'versions', None)
+        if versions is None:
+            versions = self.versions = get_versions(self.version_resources)
+        return get_cache_key(
+            self.cache_namespace, self.get_cache_scope(), request, request.accepted_renderer.format, versions
+        )
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            count(self.cache_namespace, 'hits')
+            self.cache_status = 'HIT'
+            return Response(data)
+        count(self.cache_namespace, 'misses')
+        self.cache_status = 'MISS'
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.cache_status:
+            response['X-Cache'] = self.cache_status
+        return response
@@ -0,0 +1,190 @@
+"""
+Per-request timings: where the time of an API request goes.
+
+``Myproject.middleware.TimingMiddleware`` starts a ``Timings`` for every
+request and makes it current for the request's context (threads that run
+the request's sync code and its async ORM calls inherit it). While one is
+current:
+
+* every query on every connection is counted and timed by ``record_query``,
+  which ``install`` adds to each connection as it is opened; queries
+  slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged with the line of our
+  code that ran them;
+* ``section(name)`` adds the time spent inside it under ``name``; nested
+  sections of the same name count once. ``TimedSerializerMixin`` times
+  serialization and validation under ``serializer``, and
+  ``TimedViewMixin`` the permission checks under ``permissions``.
+
+The middleware turns the totals into a ``Server-Timing`` header and one
+structured log line per request. When no ``Timings`` is current (the
+feature is off, or the code runs outside a request) every hook costs a
+context variable lookup.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+current = contextvars.ContextVar('request_timings', default=None)
+
+# Frames from these directories are not "our" code when looking for the
+# call site of a slow query.
+LIBRARY_PATHS = tuple(
+    os.path.dirname(module.__file__) + os.sep
+    for module in (sys.modules['django'], sys.modules['rest_framework'])
+) + (os.path.dirname(os.__file__) + os.sep, __file__)
+
+
+class Timings:
+    def __init__(self, request=None):
+        self.started = time.perf_counter()
+        self.path = request.path if request is not None else None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.sections = {}
+        self._depth = {}
+
+    def add_query(self, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+
+    def enter(self, name):
+        depth = self._depth.get(name, 0)
+        self._depth[name] = depth + 1
+        return depth == 0
+
+    def leave(self, name, seconds):
+        self._depth[name] -= 1
+        if seconds is not None:
+            self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    def total_seconds(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_seconds() * 1000, 2),
+            'db_queries': self.queries,
+            'db_ms': round(self.db_seconds * 1000, 2),
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in self.sections.items()},
+        }
+
+    def server_timing(self):
+        """The ``Server-Timing`` header value."""
+        metrics = [
+            f'total;dur={self.total_seconds() * 1000:.1f}',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+        ]
+        metrics += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.sections.items()]
+        return ', '.join(metrics)
+
+
+@contextmanager
+def section(name):
+    timings = current.get()
+    if timings is None:
+        yield
+        return
+    outermost = timings.enter(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.leave(name, time.perf_counter() - started if outermost else None)
+
+
+def get_call_site():
+    """``file:line in function`` of the innermost frame outside Django, DRF and the stdlib."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(LIBRARY_PATHS) and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        timings.add_query(seconds)
+        if seconds * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            logger.warning(json.dumps({
+                'event': 'slow_query',
+                'path': timings.path,
+                'ms': round(seconds * 1000, 2),
+                'sql': sql if len(sql) <= 2000 else sql[:2000] + '...',
+                'call_site': get_call_site(),
+            }))
+
+
+def add_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """Time the queries of every connection, open or opened later, in any thread."""
+    connection_created.connect(add_wrapper, dispatch_uid='Myproject.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        add_wrapper(connection)
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with section('serializer'):
+            return super().data
+
+    def is_valid(self, *args, **kwargs):
+        with section('serializer'):
+            return super().is_valid(*args, **kwargs)
+
+
+class TimedSerializerMixin:
+    """Time ``data`` and ``is_valid`` (of the serializer, or of its ``many=True`` list) as ``serializer``."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # many=True builds the Meta's list_serializer_class.
+        if getattr(cls, 'Meta', None) is None:
+            cls.Meta = type('Meta', (), {})
+        if not hasattr(cls.Meta, 'list_serializer_class'):
+            cls.Meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with section('serializer'):
+            return super().data
+
+    def is_valid(self, *args, **kwargs):
+        with section('serializer'):
+            return super().is_valid(*args, **kwargs)
+
+
+class TimedViewMixin:
+    """Time the permission checks of a DRF view as ``permissions``."""
+
+    def check_permissions(self, request):
+        with section('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with section('permissions'):
+            super().check_object_permissions(request, obj)
@@ -0,0 +1,226 @@
+"""
+Response compression, per-request timings and metrics.
+
+``CompressionMiddleware`` compresses responses with brotli or gzip,
+whichever the client accepts.
+
+Report pages are hundreds of kilobytes of JSON that compress to a tenth of
+that, and many clients are phones on slow connections. Django's
+GZipMiddleware only speaks gzip and compresses streams as well, which
+would hold back the live event stream; ``CompressionMiddleware`` prefers
+brotli when the ``brotli`` package is installed, falls back to gzip, and
+only touches complete (non-streaming) responses of a compressible type of
+at least ``RESPONSE_COMPRESSION_MIN_SIZE`` bytes. ``text/event-stream``
+and file downloads are always streamed, so they pass through untouched.
+
+Against BREACH, gzip output carries random padding as in GZipMiddleware.
+Brotli has no field to hide padding in, so requests with credentials
+(cookies or an ``Authorization`` header), whose responses may hold secrets,
+only ever get gzip; brotli is kept for anonymous responses.
+
+``TimingMiddleware`` measures every request with
+``Myproject.instrumentation`` and reports wall, database, serializer and
+permission time in one JSON log line on the ``Myproject.middleware``
+logger. It costs a few microseconds per request and per query, so it is
+on unless ``REQUEST_TIMING`` is false. The same figures go in a
+``Server-Timing`` header (shown by the browser's developer tools) only
+with ``SERVER_TIMING_HEADER``, on by default with ``DEBUG``: query counts
+and the time a login spends checking the password are not for clients.
+
+``MetricsMiddleware`` feeds the Prometheus metrics of ``Myproject.metrics``.
+"""
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+from . import instrumentation, metrics
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+)
+# Quick enough to run on every response; the higher levels buy a few
+# percent more for several times the CPU.
+BROTLI_QUALITY = 4
+# The encodings compress() adds random padding to.
+PADDED_ENCODINGS = ('gzip',)
+
+
+def get_encodings():
+    """The encodings this process can produce, best first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding, padded=False):
+    """
+    The best encoding the ``Accept-Encoding`` header allows, or None. With
+    ``padded``, only an encoding that ``compress`` pads against BREACH.
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, *params = part.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip():
+            accepted[name.strip().lower()] = quality
+    for encoding in get_encodings():
+        if padded and encoding not in PADDED_ENCODINGS:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    # Like GZipMiddleware, pad gzip output by a random length against BREACH.
+    return compress_string(content, max_random_bytes=GZipMiddleware.max_random_bytes)
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').partition(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        credentialed = 'HTTP_AUTHORIZATION' in request.META or bool(request.COOKIES)
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), padded=credentialed)
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The bytes differ from the uncompressed body's, so the ETag can
+        # only be weak (the validators compare If-None-Match weakly anyway).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class TimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if settings.REQUEST_TIMING:
+            instrumentation.install()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REQUEST_TIMING:
+            return self.get_response(request)
+        timings = instrumentation.Timings(request)
+        token = instrumentation.current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+        return self.process_response(request, response, timings)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_TIMING:
+            return await self.get_response(request)
+        timings = instrumentation.Timings(request)
+        # Sync code further in runs in a thread with a copy of this context,
+        # so it sees (and adds to) the same Timings.
+        token = instrumentation.current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+        return self.process_response(request, response, timings)
+
+    def process_response(self, request, response, timings):
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = timings.server_timing()
+        logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **timings.as_dict(),
+        }))
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Count and time API requests for ``/metrics``.
+
+    Goes right after ``TimingMiddleware``, whose ``Timings`` (when enabled)
+    supplies the database figures.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS or not request.path.startswith(metrics.PATH_PREFIXES):
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        metrics.observe(request, response, time.perf_counter() - started, instrumentation.current.get())
+        return response
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS or not request.path.startswith(metrics.PATH_PREFIXES):
+            return await self.get_response(request)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        metrics.observe(request, response, time.perf_counter() - started, instrumentation.current.get())
+        return response
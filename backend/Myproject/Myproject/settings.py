@@ -45,7 +45,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover everything else.
+    "Myproject.middleware.TimingMiddleware",
+    "Myproject.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Outermost after the redirect to HTTPS, so it sees final bodies.
+    "Myproject.middleware.CompressionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -75,6 +80,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "Myproject.wsgi.application"
 
+# Keeps the per-request log lines out of the test output (Myproject.test_runner).
+TEST_RUNNER = "Myproject.test_runner.TestRunner"
+
 # Database
 DATABASES = {
     "default": dj_database_url.config(
@@ -82,6 +90,16 @@ DATABASES = {
         conn_max_age=600,
     )
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # Under ASGI every request runs in its own thread with its own
+    # connection. Start write transactions with the write lock taken, so
+    # concurrent ones wait for each other instead of failing with "database
+    # is locked", and let readers work alongside the writer (WAL).
+    DATABASES["default"]["OPTIONS"] = {
+        "transaction_mode": "IMMEDIATE",
+        "timeout": 20,
+        "init_command": "PRAGMA journal_mode=WAL;",
+    }
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -111,12 +129,21 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 STORAGES = {
     "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # Report photos and their derivatives, deduplicated by content hash.
+    "reports": {"BACKEND": "report.storage.ContentAddressedStorage"},
     "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
 }
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Report photo derivatives (see report.imaging). With 0 workers the
+# derivatives are built inline, which is what tests and commands use.
+REPORT_IMAGE_WORKERS = int(os.environ.get("REPORT_IMAGE_WORKERS", "2"))
+REPORT_THUMBNAIL_SIZE = int(os.environ.get("REPORT_THUMBNAIL_SIZE", "320"))
+REPORT_MEDIUM_SIZE = int(os.environ.get("REPORT_MEDIUM_SIZE", "1280"))
+REPORT_IMAGE_QUALITY = int(os.environ.get("REPORT_IMAGE_QUALITY", "80"))
+
 # CORS / CSRF
 default_frontend_origins = [
     "https://abdullatif-ymyj.vercel.app",
@@ -161,8 +188,90 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
+    # orjson when it is installed, DRF's stdlib json otherwise (Myproject.renderers).
+    "DEFAULT_RENDERER_CLASSES": [
+        "Myproject.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "Myproject.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Responses smaller than this go out uncompressed (Myproject.middleware).
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.environ.get("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+
+# A JSON log line per request (Myproject.middleware); queries slower than
+# SLOW_QUERY_THRESHOLD_MS are logged with the code that ran them
+# (Myproject.instrumentation). The timings are also sent to clients in a
+# Server-Timing header only with SERVER_TIMING_HEADER, which follows DEBUG.
+REQUEST_TIMING = os.environ.get("REQUEST_TIMING", "True").lower() == "true"
+SERVER_TIMING_HEADER = os.environ.get("SERVER_TIMING_HEADER", str(DEBUG)).lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "100"))
+
+# Prometheus metrics of the API at /metrics (Myproject.metrics). Set
+# PROMETHEUS_MULTIPROC_DIR in the environment when running several workers.
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; without a token the
+# endpoint is only served when DEBUG is on.
+REQUEST_METRICS = os.environ.get("REQUEST_METRICS", "True").lower() == "true"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+REQUEST_LOG_LEVEL = os.environ.get("REQUEST_LOG_LEVEL", "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "Myproject.middleware": {"handlers": ["console"], "level": REQUEST_LOG_LEVEL},
+        "Myproject.instrumentation": {"handlers": ["console"], "level": "WARNING"},
+    },
 }
 
+# Report list pagination (see report.pagination.ReportCursorPagination)
+REPORT_PAGE_SIZE = int(os.environ.get("REPORT_PAGE_SIZE", "50"))
+REPORT_MAX_PAGE_SIZE = int(os.environ.get("REPORT_MAX_PAGE_SIZE", "500"))
+REPORT_BULK_MAX_ITEMS = int(os.environ.get("REPORT_BULK_MAX_ITEMS", "500"))
+
+# Resolved reports older than this move to the archive table when
+# ``manage.py archive_reports`` runs (see report.archive).
+REPORT_ARCHIVE_AFTER_DAYS = int(os.environ.get("REPORT_ARCHIVE_AFTER_DAYS", "180"))
+
+# Response cache of the list endpoints (Myproject.caching). Local memory is
+# per process and evicts least recently used entries; with several workers
+# point it at a shared directory (FileBasedCache) or Redis (RedisCache,
+# with maxmemory-policy allkeys-lru) so they share entries and counters.
+API_CACHE_BACKEND = os.environ.get("API_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "api": {
+        "BACKEND": API_CACHE_BACKEND,
+        "LOCATION": os.environ.get("API_CACHE_LOCATION", "api"),
+        "TIMEOUT": int(os.environ.get("API_CACHE_TIMEOUT", "300")),
+    },
+}
+if "redis" not in API_CACHE_BACKEND:
+    # Redis evicts on its own; the other backends take an entry limit.
+    CACHES["api"]["OPTIONS"] = {"MAX_ENTRIES": int(os.environ.get("API_CACHE_MAX_ENTRIES", "1000"))}
+
+# How long a process uses its copy of the waste type catalogue before
+# checking the version stamp again (waste.catalogue), in seconds.
+WASTETYPE_CATALOGUE_CHECK_INTERVAL = float(os.environ.get("WASTETYPE_CATALOGUE_CHECK_INTERVAL", "1"))
+
+# Live report events (report.events). The in-process broker only reaches
+# clients of the worker that made the change; with several workers use
+# report.events.DatabaseBroker.
+REPORT_EVENTS_BACKEND = os.environ.get("REPORT_EVENTS_BACKEND", "report.events.InProcessBroker")
+REPORT_EVENTS_POLL_INTERVAL = float(os.environ.get("REPORT_EVENTS_POLL_INTERVAL", "1"))
+REPORT_EVENTS_HEARTBEAT = float(os.environ.get("REPORT_EVENTS_HEARTBEAT", "15"))
+REPORT_EVENTS_QUEUE_SIZE = int(os.environ.get("REPORT_EVENTS_QUEUE_SIZE", "100"))
+REPORT_EVENTS_RETENTION = int(os.environ.get("REPORT_EVENTS_RETENTION", "3600"))
+# Seconds a stream ticket (report.events.get_ticket) may be used to connect.
+REPORT_EVENTS_TICKET_MAX_AGE = int(os.environ.get("REPORT_EVENTS_TICKET_MAX_AGE", "60"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "AUTH_HEADER_TYPES": ("Bearer",),
@@ -0,0 +1,27 @@
+"""
+The test runner (``TEST_RUNNER``).
+
+Django's own, with the per-request log lines of ``Myproject.middleware``
+turned down to warnings so they do not flood the output; tests that read
+them use ``assertLogs``, which lowers the level again for their duration.
+"""
+import logging
+
+from django.test.runner import DiscoverRunner
+
+QUIET_LOGGERS = ('Myproject.middleware',)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.log_levels = {}
+        for name in QUIET_LOGGERS:
+            logger = logging.getLogger(name)
+            self.log_levels[name] = logger.level
+            logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, level in self.log_levels.items():
+            logging.getLogger(name).setLevel(level)
+        super().teardown_test_environment(**kwargs)
@@ -21,11 +21,21 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from Myproject.metrics import metrics_view
+from report import async_views as report_async
+from waste import async_views as waste_async
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/user/', include('user.urls')),
     path('api/waste/', include('waste.urls')),
     path('api/report/', include('report.urls')),
+    # Async read-only variants of the busiest endpoints; best served by Myproject.asgi.
+    path('api/async/report/report/', report_async.ReportListAsyncView.as_view(), name='async_report_list'),
+    path('api/async/report/report/<int:pk>/', report_async.ReportDetailAsyncView.as_view(), name='async_report_detail'),
+    path('api/async/report/stats/', report_async.ReportStatsAsyncView.as_view(), name='async_report_stats'),
+    path('api/async/waste/waste/', waste_async.WastetypeListAsyncView.as_view(), name='async_waste_list'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,119 @@
+"""
+Version stamps and conditional GET for the API.
+
+The dashboard refetches reports, profiles and waste types on every mount,
+and the data has almost never changed in between. Every write bumps a
+``ResourceVersion`` row for the resource it touches, inside the writing
+transaction. ``ConditionalGetMixin`` turns those rows into an ETag and a
+Last-Modified date with one small query, before the queryset is even
+built, and answers a matching ``If-None-Match``/``If-Modified-Since``
+with 304 without serializing anything.
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from report.models import ResourceVersion
+
+REPORTS = 'reports'
+USERS = 'users'
+USERPROFILES = 'userprofiles'
+WASTETYPES = 'wastetypes'
+
+
+def bump(name):
+    now = timezone.now()
+    versions = ResourceVersion.objects.filter(name=name)
+    if versions.update(version=F('version') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            ResourceVersion.objects.create(name=name, version=1, updated_at=now)
+    except IntegrityError:
+        # Another transaction created the row first.
+        versions.update(version=F('version') + 1, updated_at=now)
+
+
+def get_versions(names):
+    """Return ``{name: (version, updated_at)}``; unknown names are ``(0, None)``."""
+    versions = {name: (0, None) for name in names}
+    for name, version, updated_at in ResourceVersion.objects.filter(name__in=names).values_list(
+        'name', 'version', 'updated_at'
+    ):
+        versions[name] = (version, updated_at)
+    return versions
+
+
+async def aget_versions(names):
+    versions = {name: (0, None) for name in names}
+    async for name, version, updated_at in ResourceVersion.objects.filter(name__in=names).values_list(
+        'name', 'version', 'updated_at'
+    ):
+        versions[name] = (version, updated_at)
+    return versions
+
+
+def get_validators(request, versions, renderer_format):
+    """
+    Return the ``(etag, last_modified)`` of a response built from
+    ``versions`` for ``request``. The ETag also covers the requesting user,
+    the full path and the rendered format, because those change the body
+    as well.
+    """
+    key = json.dumps([
+        request.user.pk,
+        request.get_full_path(),
+        renderer_format,
+        sorted((name, version) for name, (version, _) in versions.items()),
+    ])
+    etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+    changed = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    # Whole seconds, like the header; If-None-Match wins when both are sent.
+    return etag, int(max(changed).timestamp()) if changed else None
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let the browser keep the body but revalidate it every time.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified for ``list`` and ``retrieve``.
+
+    ``version_resources`` names every resource the responses are built
+    from; see ``get_validators`` for what else the ETag covers.
+    """
+
+    version_resources = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_not_modified_response(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_not_modified_response(request) or super().retrieve(request, *args, **kwargs)
+
+    def get_resource_versions(self):
+        return get_versions(self.version_resources)
+
+    def get_not_modified_response(self, request):
+        # Read before the data, so a write racing with this request can only
+        # make the ETag older than the body, never newer.
+        self.versions = self.get_resource_versions()
+        self.etag, self.last_modified = get_validators(request, self.versions, request.accepted_renderer.format)
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            set_validators(response, self.etag, self.last_modified)
+        return response
@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect
 from django.views import View
-from report.models import Reportwaste
-from waste.models import Wastetype
+from report import stats
+from waste import catalogue
 
 class HomeView(View):
     def get(self, request):
@@ -9,15 +9,13 @@ class HomeView(View):
         if not request.user.is_authenticated:
             return redirect('user:login')
 
-        total_reports = Reportwaste.objects.count()
-        pending_reports = Reportwaste.objects.filter(status='pending').count()
-        resolved_reports = Reportwaste.objects.filter(status='resolved').count()
-        waste_types = Wastetype.objects.count()
+        report_stats = stats.get_stats()
+        waste_types = len(catalogue.get_catalogue().entries)
         
         context = {
-            'total_reports': total_reports,
-            'pending_reports': pending_reports,
-            'resolved_reports': resolved_reports,
+            'total_reports': report_stats['total'],
+            'pending_reports': report_stats['by_status'].get('pending', 0),
+            'resolved_reports': report_stats['by_status'].get('resolved', 0),
             'waste_types': waste_types,
         }
         return render(request, 'home.html', context)
@@ -0,0 +1,10 @@
+"""
+Benchmark scripts for the backend.
+
+Each script is run from the directory that holds manage.py, e.g.::
+
+    python -m benchmarks.search_benchmark --rows 100000 1000000
+
+and works on its own throwaway SQLite database (or on DATABASE_URL when
+--use-database-url is given), never on the development database.
+"""
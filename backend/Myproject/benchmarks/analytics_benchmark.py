@@ -0,0 +1,95 @@
+"""
+Compare analytics reads from the daily rollups with GROUP BY over the reports.
+
+    python -m benchmarks.analytics_benchmark --rows 100000 1000000
+
+For every table size the script seeds a fresh database (one year of
+reports), rebuilds the rollups and times a year of weekly counts per
+waste type, a month of daily counts per status and the per-status totals
+behind the ward resolution rates, once from report.rollups and once as
+the equivalent GROUP BY over the report table. The output is JSON so runs
+can be compared.
+"""
+import argparse
+import json
+import os
+from datetime import date
+
+from benchmarks.common import reset_reports, seed_reports, setup_django, timed
+
+QUERIES = {
+    'year by week and waste type': (date(2025, 1, 1), date(2025, 12, 31), 'week', 'waste_type'),
+    'month by day and status': (date(2025, 6, 1), date(2025, 6, 30), 'day', 'status'),
+    'year by month': (date(2025, 1, 1), date(2025, 12, 31), 'month', None),
+}
+
+
+def raw_series(start, end, interval, group_by):
+    from django.db.models import Count, F
+    from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+
+    from report.models import Reportwaste
+
+    bucket = {'day': TruncDate, 'week': TruncWeek, 'month': TruncMonth}[interval]('time_created')
+    groups = Reportwaste.objects.filter(time_created__date__gte=start, time_created__date__lte=end)
+    groups = groups.values(period=bucket, **({'key': F(group_by)} if group_by else {}))
+    return list(groups.annotate(n=Count('id')).order_by())
+
+
+def raw_wards(start, end):
+    from django.db.models import Count
+
+    from report.models import Reportwaste
+
+    reports = Reportwaste.objects.filter(time_created__date__gte=start, time_created__date__lte=end)
+    return list(reports.values('ward', 'status').annotate(n=Count('id')).order_by())
+
+
+def run(rows, repeat):
+    from django.db import connection
+
+    from report import rollups
+    from report.models import ReportDailyRollup
+
+    seed_seconds = seed_reports(rows)
+    rollup_rows = rollups.rebuild()
+    results = {
+        'rows': rows, 'vendor': connection.vendor, 'seed_seconds': round(seed_seconds, 1),
+        'rollup_rows': rollup_rows, 'queries': {},
+    }
+    for label, (start, end, interval, group_by) in QUERIES.items():
+        rollup_seconds, _ = timed(lambda: rollups.get_series(start, end, interval, group_by=group_by), repeat)
+        raw_seconds, _ = timed(lambda: raw_series(start, end, interval, group_by), repeat)
+        results['queries'][label] = {'rollups_ms': round(rollup_seconds * 1000, 2), 'raw_ms': round(raw_seconds * 1000, 2)}
+    start, end = date(2025, 1, 1), date(2025, 12, 31)
+    rollup_seconds, _ = timed(lambda: rollups.get_ward_resolution(start, end), repeat)
+    raw_seconds, _ = timed(lambda: raw_wards(start, end), repeat)
+    results['queries']['ward resolution for a year'] = {
+        'rollups_ms': round(rollup_seconds * 1000, 2), 'raw_ms': round(raw_seconds * 1000, 2),
+    }
+    ReportDailyRollup.objects.all().delete()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--use-database-url', action='store_true',
+                        help='Benchmark DATABASE_URL (e.g. PostgreSQL) instead of a temporary SQLite file.')
+    args = parser.parse_args()
+
+    db_path = setup_django(use_database_url=args.use_database_url)
+    output = []
+    try:
+        for rows in args.rows:
+            reset_reports()
+            output.append(run(rows, args.repeat))
+    finally:
+        if db_path:
+            os.unlink(db_path)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure the live report table before and after archiving resolved reports.
+
+    python -m benchmarks.archive_benchmark --rows 200000 1000000
+
+For every table size the script seeds a fresh database (one year of
+reports, three quarters of them resolved), times a few typical dashboard
+queries on the live table, runs ``archive_reports`` and times them again.
+It also reports the time the archiving took and the first page of the
+list with ``include_archived`` merged in. The output is JSON so runs can
+be compared.
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.common import reset_reports, seed_reports, setup_django, timed
+
+
+def measure(repeat):
+    from django.db.models import Count
+
+    from report.models import Reportwaste
+
+    open_work = Reportwaste.objects.filter(status__in=['pending', 'in_progress'])
+    queries = {
+        'list first page': lambda: list(Reportwaste.objects.order_by('-time_created', '-id')[:51]),
+        'open work first page': lambda: list(open_work.order_by('-time_created', '-id')[:51]),
+        'open work per waste type': lambda: list(open_work.values('waste_type').annotate(n=Count('id')).order_by()),
+        'plastic first page': lambda: list(
+            Reportwaste.objects.filter(waste_type__name='Plastic').order_by('-time_created', '-id')[:51]
+        ),
+    }
+    results = {label: round(timed(query, repeat)[0] * 1000, 2) for label, query in queries.items()}
+    results['live_rows'] = Reportwaste.objects.count()
+    return results
+
+
+def run(rows, repeat):
+    from django.core.management import call_command
+    from django.db import connection
+
+    from report.archive import filter_archive
+    from report.models import ArchivedReport, Reportwaste
+    from report.pagination import ReportCursorPagination
+
+    seed_seconds = seed_reports(rows)
+    before = measure(repeat)
+    started = time.perf_counter()
+    call_command('archive_reports', '--older-than', '0', '--batch-size', '5000', stdout=open(os.devnull, 'w'))
+    archive_seconds = time.perf_counter() - started
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    after = measure(repeat)
+
+    class Request:
+        query_params = {'include_archived': 'true'}
+
+        def build_absolute_uri(self):
+            return '/api/report/report/?include_archived=true'
+
+    def merged_page():
+        paginator = ReportCursorPagination()
+        paginator.prepare(Request())
+        return paginator.build_page(paginator.merge_results(
+            paginator.get_page_queryset(Reportwaste.objects.all()),
+            paginator.get_page_queryset(filter_archive(Request(), ArchivedReport.objects.all(), None)),
+        ))
+
+    merged_seconds, _ = timed(merged_page, repeat)
+    result = {
+        'rows': rows, 'vendor': connection.vendor, 'seed_seconds': round(seed_seconds, 1),
+        'archive_seconds': round(archive_seconds, 1), 'archived_rows': ArchivedReport.objects.count(),
+        'before_ms': before, 'after_ms': after,
+        'merged_first_page_ms': round(merged_seconds * 1000, 2),
+    }
+    ArchivedReport.objects.all()._raw_delete(connection.alias)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--use-database-url', action='store_true',
+                        help='Benchmark DATABASE_URL (e.g. PostgreSQL) instead of a temporary SQLite file.')
+    args = parser.parse_args()
+
+    db_path = setup_django(use_database_url=args.use_database_url)
+    output = []
+    try:
+        for rows in args.rows:
+            reset_reports()
+            output.append(run(rows, args.repeat))
+    finally:
+        if db_path:
+            os.unlink(db_path)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
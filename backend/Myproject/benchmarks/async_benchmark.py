@@ -0,0 +1,164 @@
+"""
+Compare sync WSGI and async ASGI throughput with slow clients connected.
+
+    python -m benchmarks.async_benchmark --rows 20000 --fast 32 --slow 0 64 256
+
+Seeds a throwaway SQLite database and serves it three ways:
+
+* ``wsgi``: gunicorn sync workers (as deployed before) on the DRF views;
+* ``asgi-sync``: uvicorn, one process, on the same DRF views;
+* ``asgi-async``: uvicorn, one process, on the ``/api/async/`` views.
+
+For ``--duration`` seconds, ``--fast`` clients request the report list,
+a report, the stats and the waste types back to back, while ``--slow``
+clients trickle their requests in over ``--slow-seconds`` like a phone on
+a bad connection. Output is the fast clients' throughput and latency per
+server and slow client count, as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, free_port, seed_reports, setup_django, wait_for_port
+
+SERVERS = {
+    'wsgi': ('/api/', lambda port, args: [
+        sys.executable, '-m', 'gunicorn', 'Myproject.wsgi:application', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(args.wsgi_workers), '--log-level', 'warning',
+    ]),
+    'asgi-sync': ('/api/', lambda port, args: [
+        sys.executable, '-m', 'uvicorn', 'Myproject.asgi:application', '--port', str(port),
+        '--log-level', 'warning', '--no-access-log',
+    ]),
+    'asgi-async': ('/api/async/', lambda port, args: [
+        sys.executable, '-m', 'uvicorn', 'Myproject.asgi:application', '--port', str(port),
+        '--log-level', 'warning', '--no-access-log',
+    ]),
+}
+
+
+def request_bytes(path, port, token):
+    # The settings redirect plain HTTP; pretend a TLS proxy is in front.
+    return (
+        f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nX-Forwarded-Proto: https\r\n'
+        f'Authorization: Bearer {token}\r\nConnection: close\r\n\r\n'
+    ).encode()
+
+
+async def fetch(port, request, trickle=0):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        if trickle:
+            # Send the request a few bytes at a time, spread over ``trickle`` seconds.
+            pieces = [request[i:i + 16] for i in range(0, len(request), 16)]
+            for piece in pieces:
+                writer.write(piece)
+                await asyncio.sleep(trickle / len(pieces))
+        else:
+            writer.write(request)
+        response = await reader.read()
+    finally:
+        writer.close()
+    return response.split(b' ', 2)[1] if response else b'---'
+
+
+async def fast_client(port, prefix, token, report_ids, deadline, latencies, errors):
+    rng = random.Random()
+    paths = ['report/report/', 'report/stats/', 'waste/waste/']
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths + [f'report/report/{rng.choice(report_ids)}/'])
+        started = time.perf_counter()
+        try:
+            status = await fetch(port, request_bytes(prefix + path, port, token))
+        except OSError:
+            status = b'---'
+        if status == b'200':
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(status.decode())
+
+
+async def slow_client(port, prefix, token, deadline, seconds):
+    while time.perf_counter() < deadline:
+        try:
+            await fetch(port, request_bytes(prefix + 'report/stats/', port, token), trickle=seconds)
+        except OSError:
+            await asyncio.sleep(0.1)
+
+
+async def load(port, prefix, token, report_ids, args, slow):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(
+        *(slow_client(port, prefix, token, deadline, args.slow_seconds) for _ in range(slow)),
+        *(fast_client(port, prefix, token, report_ids, deadline, latencies, errors) for _ in range(args.fast)),
+    )
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 1) if latencies else None
+
+    return {
+        'slow_clients': slow,
+        'requests_per_second': round(len(latencies) / args.duration, 1),
+        'p50_ms': percentile(0.5),
+        'p99_ms': percentile(0.99),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--fast', type=int, default=32)
+    parser.add_argument('--slow', type=int, nargs='+', default=[0, 64, 256])
+    parser.add_argument('--slow-seconds', type=float, default=2.0)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--wsgi-workers', type=int, default=2)
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    db_path = setup_django()
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from report import stats
+    from report.models import Reportwaste
+    from user.models import Userprofile
+
+    seed_reports(args.rows)
+    stats.rebuild()
+    officer = User.objects.create_user('bench-officer', 'bench-officer@example.com', 'pass')
+    Userprofile.objects.create(user=officer, role='officer')
+    token = str(RefreshToken.for_user(officer).access_token)
+    report_ids = list(Reportwaste.objects.values_list('id', flat=True)[:1000])
+
+    results = []
+    try:
+        for name in args.servers:
+            prefix, command = SERVERS[name]
+            for slow in args.slow:
+                port = free_port()
+                server = subprocess.Popen(command(port, args), cwd=BASE_DIR, env=dict(os.environ))
+                try:
+                    wait_for_port(port)
+                    results.append({'server': name, **asyncio.run(load(port, prefix, token, report_ids, args, slow))})
+                finally:
+                    server.terminate()
+                    server.wait()
+    finally:
+        os.unlink(db_path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+WASTE_TYPES = ['Plastic', 'Organic', 'Glass', 'Metal', 'E-waste', 'Paper', 'Textile']
+STATUSES = ['pending', 'in_progress', 'resolved']
+STREETS = [
+    'Uhuru', 'Morogoro', 'Samora', 'Bibi Titi', 'Kawawa', 'Nyerere', 'Ali Hassan Mwinyi',
+    'Kilwa', 'Mandela', 'Sokoine', 'Azikiwe', 'Jamhuri', 'Lumumba', 'Msimbazi', 'Kariakoo',
+]
+CITY_CENTRE = (-6.8161, 39.2804)
+WORDS = (
+    'bin overflowing bags bottles smell rats flies dumped rubble tyres mattress sewage '
+    'drain blocked leaking oil burning smoke market school hospital bus stop corner '
+    'behind near beside gate fence river bridge roadside pile heap broken glass cans '
+    'cardboard boxes food waste leaves branches furniture fridge batteries chemicals'
+).split()
+
+
+def setup_django(db_path=None, use_database_url=False):
+    """
+    Configure Django against a throwaway SQLite file and migrate it.
+
+    Returns the database path (None when DATABASE_URL is used as is).
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    if not use_database_url:
+        if db_path is None:
+            handle, db_path = tempfile.mkstemp(prefix='bench-', suffix='.sqlite3')
+            os.close(handle)
+            os.unlink(db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Myproject.settings')
+    # No JSON line per request (Myproject.middleware) in the benchmark output.
+    os.environ.setdefault('REQUEST_LOG_LEVEL', 'WARNING')
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def seed_reports(count, users=200, seed=1, batch_size=20000):
+    """
+    Insert ``count`` synthetic reports (and their reporters) with raw SQL.
+
+    The ORM and the per-row signals are bypassed on purpose: seeding a
+    million rows through save() would take longer than the benchmark.
+    Run the rebuild_* management commands afterwards if a benchmark needs
+    the derived tables.
+    """
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from report import geo
+    from waste.models import Wastetype
+
+    rng = random.Random(seed)
+    # Zipf-like word frequencies, so early WORDS are common and late ones rare.
+    word_weights = [1 / rank for rank in range(1, len(WORDS) + 1)]
+    existing = User.objects.filter(username__startswith='bench-').count()
+    User.objects.bulk_create([
+        User(username=f'bench-{i}', email=f'bench-{i}@example.com', last_login=None)
+        for i in range(existing, users)
+    ])
+    user_ids = list(User.objects.filter(username__startswith='bench-').values_list('id', flat=True))
+    type_ids = [Wastetype.objects.get_or_create(name=name, defaults={'description': name})[0].id for name in WASTE_TYPES]
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    span = 365 * 24 * 3600
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA journal_mode = MEMORY')
+
+    insert = (
+        'INSERT INTO report_reportwaste '
+        '(user_id, waste_type_id, location, description, status, time_created, latitude, longitude, geocell) '
+        'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)'
+    )
+    started = time.perf_counter()
+    rows = []
+    for i in range(count):
+        # Spread over roughly 30 x 30 km around central Dar es Salaam.
+        latitude = CITY_CENTRE[0] + rng.uniform(-0.135, 0.135)
+        longitude = CITY_CENTRE[1] + rng.uniform(-0.135, 0.135)
+        created = start + timedelta(seconds=span * i / max(count, 1) + rng.random())
+        rows.append((
+            rng.choice(user_ids),
+            rng.choices(type_ids, weights=[30, 25, 12, 10, 3, 12, 8])[0],
+            f'{rng.choice(STREETS)} street {rng.randint(1, 400)}',
+            ' '.join(rng.choices(WORDS, word_weights, k=rng.randint(6, 24))),
+            rng.choices(STATUSES, weights=[15, 10, 75])[0],
+            created.isoformat() if connection.vendor != 'sqlite' else created.strftime('%Y-%m-%d %H:%M:%S.%f'),
+            latitude,
+            longitude,
+            geo.encode(latitude, longitude),
+        ))
+        if len(rows) == batch_size:
+            _flush(connection, insert, rows)
+            rows = []
+    if rows:
+        _flush(connection, insert, rows)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return time.perf_counter() - started
+
+
+def _flush(connection, insert, rows):
+    from django.db import transaction
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(insert, rows)
+
+
+def timed(function, repeat=5):
+    """Run ``function`` ``repeat`` times; return (median seconds, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port):
+    for _ in range(200):
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Nothing listening on port {port}')
+
+
+def reset_reports():
+    """Empty the report table without running signals, so each size starts clean."""
+    from django.db import connection
+
+    from report.models import Reportwaste
+
+    Reportwaste.objects.all()._raw_delete(connection.alias)
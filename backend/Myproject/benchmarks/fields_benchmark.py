@@ -0,0 +1,81 @@
+"""
+Compare a full report page with sparse fieldsets and the summary.
+
+    python -m benchmarks.fields_benchmark --rows 20000 --page-size 1000
+
+Seeds a throwaway SQLite database and, as an officer, requests one page of
+``--page-size`` reports per representation through the API (with the
+response cache cleared before every request, so each one queries and
+serializes). Output is the median time per request, the time to
+serialize the page alone and the size of the JSON body, as JSON.
+"""
+import argparse
+import json
+import os
+
+from benchmarks.common import seed_reports, setup_django, timed
+
+REPRESENTATIONS = {
+    'full': '',
+    'omit description and reporter': 'omit=description,user_details',
+    'summary': 'summary=true',
+    'fields id,status': 'fields=id,status',
+}
+
+
+def run(page_size, repeat):
+    from django.contrib.auth.models import User
+    from django.core.cache import caches
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from report.models import Reportwaste
+    from report.serializers import ReportwasteSerializer
+    from user.models import Userprofile
+
+    officer = User.objects.create_user('bench-officer', 'bench-officer@example.com', 'pass')
+    Userprofile.objects.create(user=officer, role='officer')
+    client = APIClient()
+    client.force_authenticate(officer)
+
+    def get(query):
+        caches['api'].clear()
+        return client.get(f'/api/report/report/?page_size={page_size}&{query}')
+
+    def serialize(query):
+        fields = ReportwasteSerializer.select_fields(dict(part.split('=') for part in query.split('&') if part))
+        reports = ReportwasteSerializer.setup_eager_loading(Reportwaste.objects.all(), fields)
+        page = list(reports.order_by('-time_created', '-id')[:page_size])
+        return lambda: ReportwasteSerializer(page, many=True, fields=fields).data
+
+    results = {}
+    with override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=['*'], REPORT_MAX_PAGE_SIZE=page_size):
+        for label, query in REPRESENTATIONS.items():
+            request_seconds, response = timed(lambda: get(query), repeat)
+            serialize_seconds, _ = timed(serialize(query), repeat)
+            results[label] = {
+                'request_ms': round(request_seconds * 1000, 1),
+                'serialize_ms': round(serialize_seconds * 1000, 1),
+                'bytes': len(response.content),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        seed_reports(args.rows)
+        output = {'rows': args.rows, 'page_size': args.page_size, 'representations': run(args.page_size, args.repeat)}
+    finally:
+        os.unlink(db_path)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare JSON encoding and response compression for report pages.
+
+    python -m benchmarks.json_benchmark --sizes 100 1000 10000
+
+Seeds a throwaway SQLite database, serializes report pages of each size
+once, then times rendering them with DRF's stdlib renderer and with
+Myproject.renderers.FastJSONRenderer, and compressing the body with gzip
+and (when installed) brotli the way Myproject.middleware does. Output is
+the median encode and compress times and the bytes that would be sent,
+as JSON.
+"""
+import argparse
+import json
+import os
+
+from benchmarks.common import seed_reports, setup_django, timed
+
+
+def run(size, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from Myproject import middleware
+    from Myproject.renderers import FastJSONRenderer, orjson
+    from report.models import Reportwaste
+    from report.serializers import ReportwasteSerializer
+
+    reports = ReportwasteSerializer.setup_eager_loading(Reportwaste.objects.order_by('-time_created', '-id'))
+    data = ReportwasteSerializer(list(reports[:size]), many=True).data
+
+    stdlib_seconds, body = timed(lambda: JSONRenderer().render(data), repeat)
+    fast_seconds, fast_body = timed(lambda: FastJSONRenderer().render(data), repeat)
+    assert fast_body == body
+    results = {
+        'rows': size,
+        'orjson': orjson is not None,
+        'encode_ms': {'stdlib': round(stdlib_seconds * 1000, 2), 'fast': round(fast_seconds * 1000, 2)},
+        'bytes': {'identity': len(body)},
+        'compress_ms': {},
+    }
+    for encoding in middleware.get_encodings():
+        seconds, compressed = timed(lambda: middleware.compress(body, encoding), repeat)
+        results['bytes'][encoding] = len(compressed)
+        results['compress_ms'][encoding] = round(seconds * 1000, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    try:
+        seed_reports(max(args.sizes))
+        output = [run(size, args.repeat) for size in args.sizes]
+    finally:
+        os.unlink(db_path)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
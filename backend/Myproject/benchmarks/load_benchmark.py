@@ -0,0 +1,267 @@
+"""
+Load-test the API with a realistic mix of traffic.
+
+    python -m benchmarks.load_benchmark --rows 20000 --concurrency 16 --duration 30
+    python -m benchmarks.load_benchmark --mix officer-list=1 waste-types=1 --output before.json
+
+Seeds a throwaway SQLite database (or DATABASE_URL, closer to production,
+with ``--use-database-url``) with ``--rows`` reports, ``--officers``
+officers and ``--citizens`` citizens, serves it with uvicorn on a local
+port (as deployed, ``--workers`` processes) and runs ``--concurrency``
+clients, each on its own keep-alive connection, for ``--duration`` seconds
+after ``--warmup`` seconds whose results are thrown away. Every client
+picks its next request from ``--mix`` (defaults in ``MIX``):
+
+* ``citizen-create``: a citizen reports waste;
+* ``officer-list``: an officer reads the first page of reports;
+* ``officer-filter``: ... a page filtered by status and waste type;
+* ``officer-patch``: ... moves a report to another status;
+* ``login``: a user logs in with their password;
+* ``waste-types``: anyone reads the waste type list.
+
+Clients pick with their own seeded random generator (``--seed``), so two
+runs send the same sequence. Output is, per scenario and in total, the
+request count, errors by status, throughput and p50/p95/p99 latency, plus
+the commit and the options used, as JSON with sorted keys so runs on two
+commits can be diffed.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import BASE_DIR, STATUSES, WASTE_TYPES, free_port, seed_reports, setup_django, wait_for_port
+
+MIX = {
+    'citizen-create': 10,
+    'officer-list': 25,
+    'officer-filter': 20,
+    'officer-patch': 10,
+    'login': 5,
+    'waste-types': 30,
+}
+PASSWORD = 'bench-pass-123'
+
+
+class Scenario:
+    """What one client needs to make requests: users, tokens and report ids."""
+
+    def __init__(self, citizens, officers, report_ids):
+        self.citizens = citizens
+        self.officers = officers
+        self.report_ids = report_ids
+
+    def request(self, name, rng):
+        """(method, path, body, token) of the next ``name`` request."""
+        if name == 'citizen-create':
+            body = {
+                'waste_type': rng.choice(WASTE_TYPES),
+                'location': f'Load test street {rng.randint(1, 400)}',
+                'description': 'Bags of rubbish left by the road',
+            }
+            return 'POST', '/api/report/report/', body, rng.choice(self.citizens)[1]
+        if name == 'officer-list':
+            return 'GET', '/api/report/report/?page_size=50', None, rng.choice(self.officers)[1]
+        if name == 'officer-filter':
+            query = f'status={rng.choice(STATUSES)}&waste_type={rng.choice(WASTE_TYPES)}&page_size=50'
+            return 'GET', f'/api/report/report/?{query}', None, rng.choice(self.officers)[1]
+        if name == 'officer-patch':
+            path = f'/api/report/report/{rng.choice(self.report_ids)}/'
+            return 'PATCH', path, {'status': rng.choice(STATUSES)}, rng.choice(self.officers)[1]
+        if name == 'login':
+            username = rng.choice(self.citizens + self.officers)[0]
+            return 'POST', '/api/user/login/', {'username': username, 'password': PASSWORD}, None
+        if name == 'waste-types':
+            return 'GET', '/api/waste/waste/', None, rng.choice(self.citizens)[1]
+        raise ValueError(f'Unknown scenario {name!r}')
+
+
+def seed_users(citizens, officers):
+    """Users with PASSWORD and an access token each, as [(username, token)]."""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from user.models import Userprofile
+
+    # One hash for all: hashing is deliberately slow.
+    password = make_password(PASSWORD)
+    User.objects.filter(username__startswith='load-').delete()
+    users = {'citizen': [], 'officer': []}
+    for role, count in (('citizen', citizens), ('officer', officers)):
+        User.objects.bulk_create([
+            User(username=f'load-{role}-{i}', email=f'load-{role}-{i}@example.com', password=password)
+            for i in range(count)
+        ])
+        created = list(User.objects.filter(username__startswith=f'load-{role}-'))
+        Userprofile.objects.bulk_create([Userprofile(user=user, role=role) for user in created])
+        users[role] = [(user.username, str(RefreshToken.for_user(user).access_token)) for user in created]
+    return users['citizen'], users['officer']
+
+
+def client(port, scenario, mix, seed, warmup_until, deadline, results):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, body, token = scenario.request(name, rng)
+        # The settings redirect plain HTTP; pretend a TLS proxy is in front.
+        headers = {'X-Forwarded-Proto': 'https', 'Accept-Encoding': 'gzip, br'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(body)
+        request_started = time.perf_counter()
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            status = 'connection error'
+        finished = time.perf_counter()
+        if request_started >= warmup_until and finished <= deadline:
+            results.append((name, status, finished - request_started))
+    connection.close()
+
+
+def percentile(latencies, p):
+    if not latencies:
+        return None
+    return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 2)
+
+
+def summarize(results, duration):
+    by_name = {}
+    for name, status, seconds in results:
+        by_name.setdefault(name, []).append((status, seconds))
+    by_name['total'] = [(status, seconds) for _, status, seconds in results]
+
+    summary = {}
+    for name, outcomes in by_name.items():
+        latencies = sorted(seconds for status, seconds in outcomes if isinstance(status, int) and status < 400)
+        errors = {}
+        for status, _ in outcomes:
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        summary[name] = {
+            'requests': len(outcomes),
+            'errors': errors,
+            'requests_per_second': round(len(latencies) / duration, 1),
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        }
+    return summary
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(values):
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in MIX:
+            raise argparse.ArgumentTypeError(f'Unknown scenario {name!r}; pick from {", ".join(MIX)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--citizens', type=int, default=50)
+    parser.add_argument('--officers', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--warmup', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--mix', nargs='+', metavar='SCENARIO=WEIGHT', help='default: ' + ' '.join(
+        f'{name}={weight}' for name, weight in MIX.items()
+    ))
+    parser.add_argument('--use-database-url', action='store_true',
+                        help='Load-test DATABASE_URL (e.g. PostgreSQL) instead of a temporary SQLite file.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON here as well as to stdout')
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix) if args.mix else MIX
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+
+    db_path = setup_django(use_database_url=args.use_database_url)
+    from report import stats
+    from report.models import Reportwaste
+
+    try:
+        seed_reports(args.rows, seed=args.seed)
+        stats.rebuild()
+        citizens, officers = seed_users(args.citizens, args.officers)
+        report_ids = list(Reportwaste.objects.order_by('id').values_list('id', flat=True)[:5000])
+        scenario = Scenario(citizens, officers, report_ids)
+
+        port = free_port()
+        server = subprocess.Popen([
+            sys.executable, '-m', 'uvicorn', 'Myproject.asgi:application', '--port', str(port),
+            '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log',
+        ], cwd=BASE_DIR, env=dict(os.environ))
+        try:
+            wait_for_port(port)
+            results = []
+            warmup_until = time.perf_counter() + args.warmup
+            deadline = warmup_until + args.duration
+            threads = [
+                threading.Thread(target=client, args=(
+                    port, scenario, mix, args.seed * 1000 + i, warmup_until, deadline, results,
+                ))
+                for i in range(args.concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+    finally:
+        if db_path:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.unlink(db_path + suffix)
+
+    output = {
+        'commit': get_commit(),
+        'options': {
+            'rows': args.rows, 'citizens': args.citizens, 'officers': args.officers,
+            'concurrency': args.concurrency, 'duration': args.duration, 'warmup': args.warmup,
+            'workers': args.workers, 'mix': mix, 'seed': args.seed,
+            'database': 'DATABASE_URL' if args.use_database_url else 'sqlite',
+        },
+        'scenarios': summarize(results, args.duration),
+    }
+    text = json.dumps(output, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
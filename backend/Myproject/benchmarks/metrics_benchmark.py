@@ -0,0 +1,97 @@
+"""
+Measure what the Prometheus metrics cost per API request.
+
+    python -m benchmarks.metrics_benchmark --requests 2000
+    python -m benchmarks.metrics_benchmark --multiprocess
+
+Seeds a throwaway SQLite database and, as an officer, requests one
+(cached) report page and the waste type list over and over with
+``REQUEST_METRICS`` on and off, then times ``Myproject.metrics.observe``
+alone. ``--multiprocess`` keeps the metrics in memory-mapped files under a
+temporary ``PROMETHEUS_MULTIPROC_DIR``, as several workers would, and also
+times a scrape. Output is microseconds per request, as JSON.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.common import seed_reports, setup_django
+
+
+def per_request(function, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def run(count):
+    from django.contrib.auth.models import User
+    from django.test import RequestFactory, override_settings
+    from django.urls import resolve
+    from django.http import HttpResponse
+    from rest_framework.test import APIClient
+
+    from Myproject import metrics
+    from Myproject import instrumentation
+    from user.models import Userprofile
+
+    officer = User.objects.create_user('bench-officer', 'bench-officer@example.com', 'pass')
+    Userprofile.objects.create(user=officer, role='officer')
+    client = APIClient()
+    client.force_authenticate(officer)
+    urls = ['/api/report/report/', '/api/waste/waste/']
+
+    results = {'multiprocess': 'PROMETHEUS_MULTIPROC_DIR' in os.environ, 'requests_us': {}}
+    with override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=['*']):
+        for url in urls:
+            client.get(url)
+            results['requests_us'][url] = {}
+            # Alternate so drift (cache warm-up, GC) hits both sides alike.
+            totals = {True: 0.0, False: 0.0}
+            for _ in range(5):
+                for enabled in (False, True):
+                    with override_settings(REQUEST_METRICS=enabled):
+                        totals[enabled] += per_request(lambda: client.get(url), count // 5) / 5
+            results['requests_us'][url] = {
+                'metrics off': round(totals[False], 1),
+                'metrics on': round(totals[True], 1),
+            }
+
+        request = RequestFactory().get(urls[0])
+        request.resolver_match = resolve(urls[0])
+        response = HttpResponse()
+        timings = instrumentation.Timings(request)
+        results['observe_us'] = round(per_request(lambda: metrics.observe(request, response, 0.01, timings), count), 2)
+        registry = metrics.get_registry()
+        results['scrape_ms'] = round(per_request(lambda: metrics.generate_latest(registry), 20) / 1000, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--multiprocess', action='store_true')
+    args = parser.parse_args()
+
+    metrics_dir = None
+    if args.multiprocess:
+        # prometheus_client picks its value storage when first imported.
+        metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='bench-metrics-')
+    db_path = setup_django()
+    try:
+        seed_reports(args.rows)
+        output = run(args.requests)
+    finally:
+        os.unlink(db_path)
+        if metrics_dir:
+            shutil.rmtree(metrics_dir)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
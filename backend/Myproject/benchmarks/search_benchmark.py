@@ -0,0 +1,74 @@
+"""
+Compare report full-text search against ``icontains``.
+
+    python -m benchmarks.search_benchmark --rows 100000 1000000
+
+For every table size the script seeds a fresh database and times the
+first page (50 rows) and the full match count for a rare and a common
+term, once through report.search.search() (FTS5 on SQLite, GIN/tsvector
+on PostgreSQL) and once through the icontains fallback. The output is
+JSON so runs can be compared.
+"""
+import argparse
+import json
+import os
+
+from benchmarks.common import reset_reports, seed_reports, setup_django, timed
+
+TERMS = {
+    'common': 'bin',
+    'rare': 'chemicals',
+    'two words': 'blocked drain',
+    'location': 'Kariakoo',
+}
+
+
+def run(rows, repeat):
+    from django.db import connection
+
+    from report.models import Reportwaste
+    from report.search import search, search_icontains
+
+    seed_seconds = seed_reports(rows)
+    results = {'rows': rows, 'vendor': connection.vendor, 'seed_seconds': round(seed_seconds, 1), 'terms': {}}
+    reports = Reportwaste.objects.all()
+    for label, term in TERMS.items():
+        measured = {}
+        for method, function in (('index', search), ('icontains', search_icontains)):
+            matched = function(reports, term)
+            first_page, _ = timed(
+                lambda: list(matched.order_by('-search_rank', '-id').values_list('id', flat=True)[:50]),
+                repeat,
+            )
+            count_seconds, count = timed(lambda: matched.count(), repeat)
+            measured[method] = {
+                'first_page_ms': round(first_page * 1000, 2),
+                'count_ms': round(count_seconds * 1000, 2),
+                'matches': count,
+            }
+        results['terms'][f'{label}:{term}'] = measured
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--use-database-url', action='store_true',
+                        help='Benchmark DATABASE_URL (e.g. PostgreSQL) instead of a temporary SQLite file.')
+    args = parser.parse_args()
+
+    db_path = setup_django(use_database_url=args.use_database_url)
+    output = []
+    try:
+        for rows in args.rows:
+            reset_reports()
+            output.append(run(rows, args.repeat))
+    finally:
+        if db_path:
+            os.unlink(db_path)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Hold idle report event streams open against one ASGI process.
+
+    python -m benchmarks.sse_benchmark --connections 1000 5000
+
+Starts uvicorn with a single worker on a throwaway SQLite database, opens
+``--connections`` idle ``/api/report/events/`` streams as an officer, and
+records the server's resident memory and thread count. It then has a
+citizen create reports through the API and times how long each event
+takes to reach every open stream. Run it with ``--backend report.events.DatabaseBroker``
+to include the polling delay of the multi-worker broker. The output is
+JSON so runs can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, setup_django
+
+MARKER = b'event: created'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_status(pid):
+    """Return (resident MiB, thread count) of ``pid`` from /proc."""
+    fields = {}
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            name, _, value = line.partition(':')
+            fields[name] = value.split()
+    return round(int(fields['VmRSS'][0]) / 1024, 1), int(fields['Threads'][0])
+
+
+def request_bytes(method, path, port, token, body=b''):
+    # The settings redirect plain HTTP; pretend a TLS proxy is in front.
+    headers = [
+        f'{method} {path} HTTP/1.1',
+        f'Host: 127.0.0.1:{port}',
+        'X-Forwarded-Proto: https',
+        f'Authorization: Bearer {token}',
+    ]
+    if body:
+        headers += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode() + body
+
+
+class Stream:
+    def __init__(self):
+        self.seen = 0
+        self.changed = asyncio.Event()
+
+    async def open(self, port, token):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+        self.writer.write(request_bytes('GET', '/api/report/events/', port, token))
+        received = b''
+        while b'retry:' not in received:
+            chunk = await self.reader.read(4096)
+            if not chunk:
+                raise ConnectionError(received.decode(errors='replace'))
+            received += chunk
+        self.task = asyncio.create_task(self.read())
+
+    async def read(self):
+        while chunk := await self.reader.read(65536):
+            if MARKER in chunk:
+                self.seen += chunk.count(MARKER)
+                self.changed.set()
+
+    async def wait_for(self, count):
+        while self.seen < count:
+            self.changed.clear()
+            await self.changed.wait()
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+async def create_report(port, token):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps({'waste_type': 'Plastic', 'location': 'Kariakoo', 'description': 'bench'}).encode()
+    writer.write(request_bytes('POST', '/api/report/report/', port, token, body))
+    status_line = await reader.readline()
+    writer.close()
+    if b' 201 ' not in status_line:
+        raise RuntimeError(status_line.decode())
+
+
+async def measure(connections, events, port, token, citizen_token, pid):
+    rss_before, threads_before = process_status(pid)
+    streams = []
+    started = time.perf_counter()
+    # Connect in batches so the listen backlog never overflows.
+    for offset in range(0, connections, 500):
+        batch = [Stream() for _ in range(min(500, connections - offset))]
+        await asyncio.gather(*(stream.open(port, token) for stream in batch))
+        streams += batch
+    connect_seconds = time.perf_counter() - started
+    await asyncio.sleep(1)
+    rss_after, threads_after = process_status(pid)
+
+    fanout = []
+    for number in range(1, events + 1):
+        started = time.perf_counter()
+        await create_report(port, citizen_token)
+        await asyncio.wait_for(asyncio.gather(*(stream.wait_for(number) for stream in streams)), 60)
+        fanout.append((time.perf_counter() - started) * 1000)
+    for stream in streams:
+        stream.close()
+    fanout.sort()
+    return {
+        'connections': connections,
+        'connect_seconds': round(connect_seconds, 2),
+        'rss_mib_before': rss_before,
+        'rss_mib_after': rss_after,
+        'kib_per_connection': round((rss_after - rss_before) * 1024 / connections, 1),
+        'threads_before': threads_before,
+        'threads_after': threads_after,
+        'fanout_ms_median': round(fanout[len(fanout) // 2], 1),
+        'fanout_ms_max': round(fanout[-1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--events', type=int, default=5)
+    parser.add_argument('--backend', default='report.events.InProcessBroker')
+    args = parser.parse_args()
+
+    # Every stream costs one descriptor here and one in the server.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    db_path = setup_django()
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from user.models import Userprofile
+    from waste.models import Wastetype
+
+    Wastetype.objects.create(name='Plastic', description='Plastic')
+    officer = User.objects.create_user('bench-officer', 'bench-officer@example.com', 'pass')
+    Userprofile.objects.create(user=officer, role='officer')
+    citizen = User.objects.create_user('bench-citizen', 'bench-citizen@example.com', 'pass')
+    Userprofile.objects.create(user=citizen, role='citizen')
+    token = str(RefreshToken.for_user(officer).access_token)
+    citizen_token = str(RefreshToken.for_user(citizen).access_token)
+
+    results = []
+    try:
+        for connections in args.connections:
+            port = free_port()
+            env = dict(os.environ, REPORT_EVENTS_BACKEND=args.backend)
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'uvicorn', 'Myproject.asgi:application', '--port', str(port),
+                 '--backlog', '4096', '--log-level', 'warning', '--no-access-log'],
+                cwd=BASE_DIR, env=env,
+            )
+            try:
+                for _ in range(100):
+                    try:
+                        socket.create_connection(('127.0.0.1', port)).close()
+                        break
+                    except OSError:
+                        time.sleep(0.1)
+                result = asyncio.run(measure(connections, args.events, port, token, citizen_token, server.pid))
+                results.append({'backend': args.backend, **result})
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        os.unlink(db_path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ReportConfig(AppConfig):
     name = 'report'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,86 @@
+"""
+Hot/cold archival of resolved reports.
+
+Almost every list, filter and dashboard query is about open work, but
+resolved reports used to stay in ``report_reportwaste`` (and its indexes)
+for good. ``manage.py archive_reports`` moves resolved reports older than
+``REPORT_ARCHIVE_AFTER_DAYS`` into ``ArchivedReport``, one short
+transaction per batch, so it can run next to live traffic and be stopped
+and re-run at any point.
+
+Archiving is a storage detail, not a change to the report. The move sends
+no signals: the counters, rollups and map clusters keep counting the
+report (their rebuilds read both tables), no event is published and its
+files keep their references. Only the ``reports`` version is bumped,
+because the default lists no longer contain it.
+
+The API reads the archive only when asked with ``?include_archived=true``:
+list pages then merge a keyset page from each table, and a report that is
+not found in the live table is looked up in the archive.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from Myproject import versions
+from .filters import ReportSearchFilter, ReportwasteFilter
+from .models import ArchivedReport, Reportwaste
+
+INCLUDE_ARCHIVED_PARAM = 'include_archived'
+ARCHIVED_STATUS = 'resolved'
+# Everything but archived_at, which the archive sets itself.
+COLUMNS = tuple(
+    field.attname for field in ArchivedReport._meta.concrete_fields if field.name != 'archived_at'
+)
+
+
+def include_archived(request):
+    return request.query_params.get(INCLUDE_ARCHIVED_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def get_cutoff(days=None):
+    if days is None:
+        days = settings.REPORT_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    return Reportwaste.objects.filter(status=ARCHIVED_STATUS, time_created__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=1000, after_id=0):
+    """
+    Move up to ``batch_size`` archivable reports with an id above
+    ``after_id`` into the archive, in one transaction.
+
+    Rows another transaction holds locked are skipped (on databases with
+    ``SKIP LOCKED``) and picked up by the next run. Returns ``(moved, last
+    id)``, with ``last id`` None when nothing was left.
+    """
+    with transaction.atomic():
+        rows = list(
+            archivable(cutoff).filter(id__gt=after_id).order_by('id')
+            .select_for_update(skip_locked=True).values(*COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return 0, None
+        ids = [row['id'] for row in rows]
+        ArchivedReport.objects.bulk_create([ArchivedReport(**row) for row in rows])
+        # A raw DELETE: no signals, so nothing counts the report as gone and
+        # its files are not released.
+        Reportwaste.objects.filter(id__in=ids)._raw_delete(Reportwaste.objects.db)
+        versions.bump(versions.REPORTS)
+    return len(ids), ids[-1]
+
+
+def filter_archive(request, queryset, view):
+    """Apply the report list filters and ``?q=`` search to an archive queryset."""
+    # DjangoFilterBackend insists on the FilterSet's own model, so the
+    # FilterSet is applied directly, as the bulk status filter does.
+    filterset = ReportwasteFilter(request.query_params, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return ReportSearchFilter().filter_queryset(request, filterset.qs, view)
@@ -0,0 +1,136 @@
+"""
+Async variants of the hot read endpoints, under ``/api/async/``.
+
+The DRF viewsets are synchronous, so under WSGI a request holds its worker
+for as long as the client takes to send the request and read the answer,
+which on a slow mobile connection is most of the time. These views run on
+the ASGI event loop and read through Django's async ORM: a request that
+waits on the database or on the network holds a coroutine, not a worker.
+
+They are DRF views, so authentication, permissions, throttling and errors
+are the API's own, and they answer with the same JSON as the viewsets,
+reusing their pieces: the filters, keyset pagination and serializers for
+the body, the resource versions for ETag/304, and the ``api`` cache for
+list pages. Only GET is served here; writes stay on the viewsets. The
+shared base class is ``Myproject.async_views.AsyncAPIView``.
+"""
+from collections import OrderedDict
+
+from django.http import Http404
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from Myproject import versions
+from Myproject.async_views import AsyncAPIView
+from waste import catalogue
+from . import archive, stats
+from .filters import ReportSearchFilter, ReportwasteFilter
+from .models import ArchivedReport, Reportwaste
+from .pagination import ReportCursorPagination
+from .permissions import IsAdminOrReadOnly, report_scope
+from .serializers import ReportwasteSerializer
+
+
+class ReportAsyncMixin:
+    permission_classes = [IsAdminOrReadOnly]
+    version_resources = (versions.REPORTS, versions.USERS, versions.USERPROFILES, versions.WASTETYPES)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Loads the profile here, in the thread, rather than from the event loop.
+        report_scope(request.user)
+
+    def get_scoped_queryset(self, model=Reportwaste):
+        scope = report_scope(self.request.user)
+        if scope == 'all':
+            return model.objects.all()
+        if scope == 'own':
+            return model.objects.filter(user=self.request.user)
+        return model.objects.none()
+
+    def get_selected_fields(self):
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = ReportwasteSerializer.select_fields(self.request.query_params)
+        return self._selected_fields
+
+    def get_serializer(self, *args, **kwargs):
+        return ReportwasteSerializer(*args, fields=self.get_selected_fields(), **kwargs)
+
+    async def get_serializer_context(self, reports):
+        # The serializer must not query from the event loop, so the waste
+        # type catalogue it names reports from is fetched here.
+        # Reports loaded without their waste type (see select_fields) need none.
+        ids = {report.__dict__.get('waste_type_id') for report in reports} - {None}
+        wastetypes = await catalogue.aget_catalogue(ids, stamp=self.versions[versions.WASTETYPES])
+        return {'request': self.request, 'view': self, 'wastetypes': wastetypes}
+
+
+class ReportListAsyncView(ReportAsyncMixin, AsyncAPIView):
+    """``/api/async/report/report/``: the report list, with the viewset's filters and cursor pages."""
+
+    cache_namespace = versions.REPORTS
+
+    @property
+    def keyset_ordering(self):
+        return ReportSearchFilter.get_keyset_ordering(self.request)
+
+    def get_cache_scope(self):
+        scope = report_scope(self.request.user)
+        return f'user-{self.request.user.pk}' if scope == 'own' else str(scope)
+
+    async def get(self, request):
+        return Response(await self.get_cached(self.build_page))
+
+    async def build_page(self):
+        filterset = ReportwasteFilter(
+            self.request.query_params, queryset=self.get_scoped_queryset(), request=self.request
+        )
+        if not filterset.is_valid():
+            raise exceptions.ValidationError(filterset.errors)
+        reports = ReportSearchFilter().filter_queryset(self.request, filterset.qs, self)
+        reports = ReportwasteSerializer.setup_eager_loading(reports, self.get_selected_fields())
+
+        paginator = ReportCursorPagination()
+        paginator.prepare(self.request, self)
+        results = [report async for report in paginator.get_page_queryset(reports)]
+        if archive.include_archived(self.request):
+            archived = ReportwasteSerializer.setup_eager_loading(
+                self.get_scoped_queryset(ArchivedReport), self.get_selected_fields()
+            )
+            archived = archive.filter_archive(self.request, archived, self)
+            results = paginator.merge_results(
+                results, [report async for report in paginator.get_page_queryset(archived)]
+            )
+        page = paginator.build_page(results)
+        return OrderedDict([
+            ('next', paginator.get_next_link()),
+            ('previous', paginator.get_previous_link()),
+            ('results', self.get_serializer(page, many=True, context=await self.get_serializer_context(page)).data),
+        ])
+
+
+class ReportDetailAsyncView(ReportAsyncMixin, AsyncAPIView):
+    """``/api/async/report/report/<pk>/``: one report."""
+
+    async def get(self, request, pk):
+        sources = (Reportwaste, ArchivedReport) if archive.include_archived(self.request) else (Reportwaste,)
+        for model in sources:
+            reports = ReportwasteSerializer.setup_eager_loading(
+                self.get_scoped_queryset(model), self.get_selected_fields()
+            )
+            report = await reports.filter(pk=pk).afirst()
+            if report is not None:
+                break
+        else:
+            raise Http404('No Reportwaste matches the given query.')
+        return Response(self.get_serializer(report, context=await self.get_serializer_context([report])).data)
+
+
+class ReportStatsAsyncView(AsyncAPIView):
+    """``/api/async/report/stats/``: the report counters."""
+
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        return Response(await stats.aget_stats())
@@ -0,0 +1,201 @@
+"""
+Pre-aggregated map clusters.
+
+The map used to download every report and cluster them in the browser.
+Instead, every write adjusts ``ReportCluster`` rows, one per geohash
+prefix of the report's cell for each precision in ``PRECISIONS``, in the
+same transaction (the same way report.stats keeps its counters). A map
+request picks the precision that suits its zoom level and reads the rows
+of the cells in its viewport, so the response grows with the viewport and
+never with the number of reports.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Substr
+
+from . import geo
+from .models import WASTE_TYPE_NAME, ArchivedReport, Reportwaste, ReportCluster
+
+# 1 character is a 45 degree cell, 7 characters about 150 x 150 metres.
+PRECISIONS = range(1, 8)
+# Never return more cells than this, however large the requested viewport.
+MAX_CLUSTERS = 1024
+# The viewport is read as at most this many cell ranges per box.
+CELL_RANGES = 64
+
+
+def _keys(row):
+    if not row.get('geocell'):
+        return
+    for precision in PRECISIONS:
+        yield (precision, row['geocell'][:precision], row['status'], row['waste_type'])
+
+
+def get_deltas(changes):
+    """
+    Turn ``(before, after)`` report snapshots into cluster adjustments of
+    ``[count, latitude_sum, longitude_sum]``. Adjustments that cancel out
+    are dropped.
+    """
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for before, after in changes:
+        for row, sign in ((before, -1), (after, 1)):
+            if row is None:
+                continue
+            for key in _keys(row):
+                delta = deltas[key]
+                delta[0] += sign
+                delta[1] += sign * row['latitude']
+                delta[2] += sign * row['longitude']
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+
+def apply_changes(changes):
+    # Sorted so concurrent writers take row locks in the same order.
+    for key, delta in sorted(get_deltas(changes).items()):
+        _bump(key, *delta)
+
+
+def _bump(key, count, latitude_sum, longitude_sum):
+    precision, cell, status, waste_type = key
+    clusters = ReportCluster.objects.filter(
+        precision=precision, cell=cell, status=status, waste_type=waste_type
+    )
+    changes = {
+        'count': F('count') + count,
+        'latitude_sum': F('latitude_sum') + latitude_sum,
+        'longitude_sum': F('longitude_sum') + longitude_sum,
+    }
+    if clusters.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            ReportCluster.objects.create(
+                precision=precision, cell=cell, status=status, waste_type=waste_type,
+                count=count, latitude_sum=latitude_sum, longitude_sum=longitude_sum,
+            )
+    except IntegrityError:
+        # Another transaction created the row first.
+        clusters.update(**changes)
+
+
+def zoom_precision(zoom):
+    """
+    Return the cell precision for a web-map zoom level (0-22).
+
+    A 256 pixel tile spans 360 / 2**zoom degrees of longitude; this picks
+    cells about a quarter of a tile wide.
+    """
+    return min(max(round((zoom + 2) * 2 / 5), PRECISIONS[0]), PRECISIONS[-1])
+
+
+def get_clusters(south, west, north, east, zoom, status=None, waste_type=None, exact=True):
+    """
+    Return ``(precision, clusters)`` for the viewport.
+
+    Each cluster carries its cell, report count, position and the counts by
+    status and waste type. With ``exact`` the position is the centroid of
+    the reports and cells are kept when it lies in the viewport. Otherwise,
+    for users who may not see every report, it is the centre of the cell
+    and cells are kept when they touch the viewport, so neither a lone
+    report's coordinates nor a viewport narrowed around them give it away.
+    """
+    boxes = geo.split_box(south, west, north, east)
+    precision = zoom_precision(zoom)
+    while precision > PRECISIONS[0] and _cell_count(boxes, precision) > MAX_CLUSTERS:
+        precision -= 1
+
+    area = Q(precision=precision)
+    # Never finer than the clusters, whose cells would not start with them.
+    covering = [geo.covering_cells(*box, max_cells=CELL_RANGES, max_precision=precision) for box in boxes]
+    if None not in covering:
+        area = Q()
+        for cells in covering:
+            area |= geo.cell_ranges(cells, field='cell', precision=precision)
+    rows = ReportCluster.objects.filter(area, count__gt=0)
+    if status:
+        rows = rows.filter(status__in=status)
+    if waste_type:
+        rows = rows.filter(waste_type=waste_type)
+
+    clusters = {}
+    for cell, row_status, row_type, count, latitude_sum, longitude_sum in rows.values_list(
+        'cell', 'status', 'waste_type', 'count', 'latitude_sum', 'longitude_sum'
+    ):
+        cluster = clusters.setdefault(cell, {
+            'cell': cell, 'count': 0, 'latitude': 0.0, 'longitude': 0.0,
+            'by_status': {}, 'by_waste_type': {},
+        })
+        cluster['count'] += count
+        cluster['latitude'] += latitude_sum
+        cluster['longitude'] += longitude_sum
+        cluster['by_status'][row_status] = cluster['by_status'].get(row_status, 0) + count
+        cluster['by_waste_type'][row_type] = cluster['by_waste_type'].get(row_type, 0) + count
+
+    result = []
+    for cluster in clusters.values():
+        if exact:
+            cluster['latitude'] = round(cluster['latitude'] / cluster['count'], 6)
+            cluster['longitude'] = round(cluster['longitude'] / cluster['count'], 6)
+            visible = any(
+                box_south <= cluster['latitude'] <= box_north and box_west <= cluster['longitude'] <= box_east
+                for box_south, box_west, box_north, box_east in boxes
+            )
+        else:
+            cell_south, cell_west, cell_north, cell_east = geo.cell_bounds(cluster['cell'])
+            cluster['latitude'] = round((cell_south + cell_north) / 2, 6)
+            cluster['longitude'] = round((cell_west + cell_east) / 2, 6)
+            visible = any(
+                cell_south <= box_north and box_south <= cell_north and cell_west <= box_east and box_west <= cell_east
+                for box_south, box_west, box_north, box_east in boxes
+            )
+        if visible:
+            result.append(cluster)
+    result.sort(key=lambda cluster: cluster['cell'])
+    return precision, result
+
+
+def _cell_count(boxes, precision):
+    total = 0
+    for box in boxes:
+        rows, columns = geo.cell_grid(*box, precision)
+        total += len(rows) * len(columns)
+    return total
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every cluster from the report table and the archive."""
+    ReportCluster.objects.all().delete()
+    for precision in PRECISIONS:
+        sums = defaultdict(lambda: [0, 0.0, 0.0])
+        for model in (Reportwaste, ArchivedReport):
+            groups = model.objects.filter(geocell__isnull=False).order_by().values(
+                'status', prefix=Substr('geocell', 1, precision), type_name=WASTE_TYPE_NAME,
+            ).annotate(n=Count('id'), latitude_sum=Sum('latitude'), longitude_sum=Sum('longitude'))
+            for group in groups:
+                cluster = sums[(group['prefix'], group['status'], group['type_name'])]
+                cluster[0] += group['n']
+                cluster[1] += group['latitude_sum']
+                cluster[2] += group['longitude_sum']
+        ReportCluster.objects.bulk_create([
+            ReportCluster(
+                precision=precision, cell=cell, status=status, waste_type=waste_type,
+                count=count, latitude_sum=latitude_sum, longitude_sum=longitude_sum,
+            )
+            for (cell, status, waste_type), (count, latitude_sum, longitude_sum) in sums.items()
+        ], batch_size=1000)
+    return ReportCluster.objects.filter(precision=PRECISIONS[0]).aggregate(total=Sum('count'))['total'] or 0
+
+
+def rename_waste_type(old, new):
+    """Move the clusters of waste type ``old`` to ``new`` after a catalogue rename."""
+    rows = ReportCluster.objects.filter(waste_type=old)
+    try:
+        with transaction.atomic():
+            rows.update(waste_type=new)
+    except IntegrityError:
+        # The new name is a key already (see report.stats.rename_waste_type).
+        rebuild()
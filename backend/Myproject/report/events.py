@@ -0,0 +1,365 @@
+"""
+Live report events for the dashboards.
+
+Officers and citizens used to learn about new reports and status changes
+by reloading the list. Now every committed create or status change becomes
+an event that ``report.views.report_events`` pushes to connected dashboards as
+server-sent events, filtered by what each user may see. The stream is an
+async view, so it has to be served by the ASGI application; one process
+then holds thousands of idle connections on a single event loop.
+
+Events travel through a broker, chosen with ``REPORT_EVENTS_BACKEND``:
+
+* ``InProcessBroker`` fans events out to the subscribers of the process
+  that made the change. Enough for one worker and for development.
+* ``DatabaseBroker`` also writes each event to ``ReportEvent`` in the
+  writing transaction and has every process poll that table, so a change
+  made in one worker reaches the dashboards connected to all of them, and
+  a reconnecting client can resume from ``Last-Event-ID``.
+
+EventSource cannot send an Authorization header, and a JWT access token in
+the query string would end up in server and proxy access logs. Browsers
+therefore POST to ``events/ticket/`` first and open the stream with the
+returned ``?ticket=``: a signed user id that is only good for the stream
+and only for ``REPORT_EVENTS_TICKET_MAX_AGE`` seconds.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CREATED = 'created'
+STATUS_CHANGED = 'status_changed'
+TICKET_SALT = 'report.events.ticket'
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.REPORT_EVENTS_BACKEND)()
+        return _broker
+
+
+def get_ticket(user):
+    """A stream ticket for ``user``; see the module docstring."""
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def read_ticket(ticket):
+    """The user id in a valid, unexpired ``ticket``, or None."""
+    try:
+        value = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+            ticket, max_age=settings.REPORT_EVENTS_TICKET_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    return int(value)
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'REPORT_EVENTS_BACKEND':
+        _broker = None
+
+
+def events_from_changes(changes):
+    """Turn ``reports_changed`` snapshots into create and status-change events."""
+    events = []
+    for before, after in changes:
+        if after is None:
+            continue
+        if before is None:
+            kind = CREATED
+        elif before.get('status') != after.get('status'):
+            kind = STATUS_CHANGED
+        else:
+            continue
+        events.append({
+            'type': kind,
+            'report': after['id'],
+            'user': after.get('user_id'),
+            'status': after.get('status'),
+            'previous_status': before.get('status') if before else None,
+            'waste_type': after.get('waste_type'),
+        })
+    return events
+
+
+def record(changes):
+    events = events_from_changes(changes)
+    if events:
+        get_broker().record(events)
+
+
+def is_visible(event, scope, user_id):
+    return scope == 'all' or (scope == 'own' and event['user'] == user_id)
+
+
+class Subscription:
+    """The queue of one connected client, owned by the event loop serving it."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        # Events missed while disconnected, sent before the live feed, which
+        # then skips their ids.
+        self.backlog = []
+        self.replayed = set()
+        self.closed = False
+
+    def deliver(self, events):
+        # Runs on self.loop. A client that stops reading is disconnected
+        # rather than buffered without limit; it reconnects and refetches.
+        if self.closed:
+            return
+        if self.queue.qsize() >= settings.REPORT_EVENTS_QUEUE_SIZE:
+            self.closed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(events)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Fan events out to the subscribers of this process once the write commits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._ids = itertools.count(1)
+
+    def record(self, events):
+        transaction.on_commit(lambda: self.publish(events))
+
+    def publish(self, events):
+        """Deliver ``events`` to every subscriber; safe to call from any thread."""
+        events = [{'id': event.get('id') or next(self._ids), **event} for event in events]
+        # Formatted once here rather than once per subscriber.
+        events = [(event, format_event(event)) for event in events]
+        with self._lock:
+            loops = {loop: list(subscriptions) for loop, subscriptions in self._subscriptions.items()}
+        for loop, subscriptions in loops.items():
+            # One wake-up per event loop, however many clients it serves.
+            try:
+                loop.call_soon_threadsafe(self._deliver, subscriptions, events)
+            except RuntimeError:
+                # The loop has shut down.
+                pass
+
+    @staticmethod
+    def _deliver(subscriptions, events):
+        for subscription in subscriptions:
+            subscription.deliver(events)
+
+    async def subscribe(self, last_event_id=None):
+        """
+        Register a client on the running event loop. ``last_event_id`` is
+        ignored: this broker keeps no history to replay.
+        """
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(loop)
+        with self._lock:
+            self._subscriptions.setdefault(loop, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.loop)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.loop]
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Share events between processes through the ``ReportEvent`` table.
+
+    Events are inserted in the writing transaction, so only committed
+    changes are ever seen. Each process runs one poller per event loop that
+    reads new rows every ``REPORT_EVENTS_POLL_INTERVAL`` seconds and fans
+    them out locally. Ids can commit out of order, so ids skipped by a poll
+    are looked for again until ``GAP_TIMEOUT`` has passed.
+    """
+
+    GAP_TIMEOUT = 10
+    BATCH_SIZE = 1000
+    PRUNE_EVERY = 60
+
+    def __init__(self):
+        super().__init__()
+        self._pollers = {}
+        self._last_id = None
+        self._gaps = {}
+        self._last_prune = 0
+
+    def record(self, events):
+        from .models import ReportEvent
+
+        ReportEvent.objects.bulk_create([ReportEvent(payload=event) for event in events])
+
+    async def subscribe(self, last_event_id=None):
+        subscription = await super().subscribe(last_event_id)
+        loop = subscription.loop
+        if loop not in self._pollers or self._pollers[loop].done():
+            if self._last_id is None:
+                await sync_to_async(self._start, thread_sensitive=False)()
+            self._pollers[loop] = loop.create_task(self._poll_forever())
+        if last_event_id is not None:
+            missed = await sync_to_async(self._since, thread_sensitive=False)(last_event_id)
+            subscription.backlog = missed
+            subscription.replayed = {event['id'] for event in missed}
+        return subscription
+
+    def _start(self):
+        from .models import ReportEvent
+
+        try:
+            self._last_id = ReportEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        finally:
+            close_old_connections()
+
+    def _since(self, last_event_id):
+        from .models import ReportEvent
+
+        try:
+            rows = ReportEvent.objects.filter(id__gt=last_event_id).order_by('id')[:self.BATCH_SIZE]
+            return [{**row.payload, 'id': row.id} for row in rows]
+        finally:
+            close_old_connections()
+
+    async def _poll_forever(self):
+        loop = asyncio.get_running_loop()
+        while self._subscriptions.get(loop):
+            try:
+                events = await sync_to_async(self.fetch_new, thread_sensitive=False)()
+            except Exception:
+                logger.exception('Could not poll report events')
+                events = []
+            if events:
+                self.publish(events)
+            await asyncio.sleep(settings.REPORT_EVENTS_POLL_INTERVAL)
+
+    def fetch_new(self):
+        """Return the events committed since the previous call."""
+        from .models import ReportEvent
+
+        try:
+            if self._last_id is None:
+                self._start()
+            now = time.monotonic()
+            self._gaps = {gap: seen_at for gap, seen_at in self._gaps.items() if now - seen_at < self.GAP_TIMEOUT}
+            rows = ReportEvent.objects.filter(id__gt=self._last_id)
+            if self._gaps:
+                rows = ReportEvent.objects.filter(id__gt=self._last_id) | ReportEvent.objects.filter(id__in=list(self._gaps))
+            events = []
+            for row in rows.order_by('id')[:self.BATCH_SIZE]:
+                if row.id in self._gaps:
+                    del self._gaps[row.id]
+                elif row.id <= self._last_id:
+                    continue
+                else:
+                    for gap in range(self._last_id + 1, row.id):
+                        self._gaps[gap] = now
+                    self._last_id = row.id
+                events.append({**row.payload, 'id': row.id})
+            if now - self._last_prune > self.PRUNE_EVERY:
+                self._last_prune = now
+                cutoff = timezone.now() - timedelta(seconds=settings.REPORT_EVENTS_RETENTION)
+                ReportEvent.objects.filter(created_at__lt=cutoff).delete()
+            return events
+        finally:
+            close_old_connections()
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream(broker, subscription, scope, user_id):
+    """Yield server-sent events for one client until it disconnects."""
+    try:
+        # Tell EventSource how long to wait before reconnecting.
+        yield 'retry: 5000\n\n' + ''.join(
+            format_event(event) for event in subscription.backlog if is_visible(event, scope, user_id)
+        )
+        while True:
+            try:
+                async with asyncio.timeout(settings.REPORT_EVENTS_HEARTBEAT):
+                    events = await subscription.get()
+            except TimeoutError:
+                # A comment line keeps proxies from closing an idle stream.
+                yield ': keep-alive\n\n'
+                continue
+            if events is None:
+                return
+            chunk = ''.join(
+                text
+                for event, text in events
+                if is_visible(event, scope, user_id) and event['id'] not in subscription.replayed
+            )
+            if chunk:
+                yield chunk
+    finally:
+        broker.unsubscribe(subscription)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, minus the thread kept for each request.
+
+    ``ASGIHandler`` runs a request's synchronous code (most middleware, the
+    request signals) on a thread of its own that lives until the response
+    ends, which for an event stream is a parked thread per open dashboard.
+    Here that code runs on asgiref's shared sync thread instead, so an idle
+    stream costs only its coroutine and queue.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError('Django can only handle ASGI/HTTP connections, not %s.' % scope['type'])
+        await self.handle(scope, receive, send)
+
+
+def route_streams(application):
+    """Wrap an ASGI application so the event stream is served by ``StreamingASGIHandler``."""
+    streaming = StreamingASGIHandler()
+    path = reverse('report_events')
+
+    async def router(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == path:
+            await streaming(scope, receive, send)
+        else:
+            await application(scope, receive, send)
+
+    return router
+
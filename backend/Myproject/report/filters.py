@@ -0,0 +1,129 @@
+import django_filters
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from . import geo
+from .models import Reportwaste
+from .pagination import ReportCursorPagination
+from .search import search
+
+DEFAULT_RADIUS_M = 200
+MAX_RADIUS_M = 50_000
+
+
+class NumberListFilter(django_filters.BaseCSVFilter, django_filters.NumberFilter):
+    """A comma-separated list of numbers, e.g. ``?near=-6.8,39.28``."""
+
+
+def parse_numbers(name, value, size):
+    if len(value) != size:
+        raise ValidationError({name: [f'Expected {size} comma-separated numbers.']})
+    return [float(number) for number in value]
+
+
+class ReportwasteFilter(django_filters.FilterSet):
+    """
+    Filters for the report list.
+
+    Every filter is an equality or range test on a column that leads one of
+    the composite indexes declared on ``Reportwaste``, so combined with the
+    ``time_created`` ordering each filtered page stays an index range scan.
+
+    ``bbox=west,south,east,north`` and ``near=lat,lng`` (with ``radius`` in
+    metres, default 200) only read the geohash cells around the area; see
+    report.geo.
+    """
+
+    # No join, so no duplicates to remove; DISTINCT would sort every match
+    # instead of range-scanning report_status_time_idx.
+    status = django_filters.MultipleChoiceFilter(choices=Reportwaste.STATUS_CHOICES, distinct=False)
+    # By name; a join on the catalogue's primary key into report_type_time_idx.
+    waste_type = django_filters.CharFilter(field_name='waste_type__name')
+    time_created = django_filters.IsoDateTimeFromToRangeFilter()
+    user = django_filters.NumberFilter(field_name='user_id')
+    bbox = NumberListFilter(method='filter_bbox')
+    near = NumberListFilter(method='filter_near')
+    # Read by filter_near.
+    radius = django_filters.NumberFilter(method='filter_noop', min_value=1, max_value=MAX_RADIUS_M)
+
+    class Meta:
+        model = Reportwaste
+        fields = ['status', 'waste_type', 'time_created', 'user']
+
+    def filter_bbox(self, queryset, name, value):
+        west, south, east, north = parse_numbers(name, value, 4)
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            raise ValidationError({'bbox': ['Expected west,south,east,north in degrees.']})
+        return queryset.filter(geo.in_bbox(south, west, north, east))
+
+    def filter_near(self, queryset, name, value):
+        latitude, longitude = parse_numbers(name, value, 2)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValidationError({'near': ['Expected lat,lng in degrees.']})
+        radius = self.form.cleaned_data.get('radius') or DEFAULT_RADIUS_M
+        return geo.within_radius(queryset, latitude, longitude, float(radius))
+
+    def filter_noop(self, queryset, name, value):
+        return queryset
+
+    # Parameters that only qualify another filter and select nothing alone.
+    QUALIFIERS = ('radius',)
+
+    @classmethod
+    def get_param_names(cls):
+        names = []
+        for name, filter_ in cls.base_filters.items():
+            suffixes = getattr(filter_.field.widget, 'suffixes', None) or ['']
+            names += [f'{name}_{suffix}' if suffix else name for suffix in suffixes]
+        return names
+
+    @classmethod
+    def from_dict(cls, data, queryset, request=None):
+        """
+        The filterset of a JSON object of parameters, as bulk updates send.
+
+        Values may be scalars or lists (joined with commas for the
+        comma-separated filters). Unlike on a query string, an unknown
+        parameter or a filter that narrows nothing is an error: the caller
+        is about to change every report it selects.
+        """
+        unknown = sorted(set(data) - set(cls.get_param_names()))
+        if unknown:
+            raise ValidationError({'filter': {name: ['Unknown filter.'] for name in unknown}})
+        query = QueryDict(mutable=True)
+        for name, value in data.items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            values = ['' if item is None else str(item) for item in values]
+            if isinstance(cls.base_filters.get(name), django_filters.BaseCSVFilter):
+                values = [','.join(values)] if values else []
+            query.setlist(name, values)
+        filterset = cls(query, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            raise ValidationError({'filter': filterset.errors})
+        narrowing = [
+            name for name, value in filterset.form.cleaned_data.items()
+            if name not in cls.QUALIFIERS and value not in (None, '', [], (), slice(None, None))
+        ]
+        if not narrowing:
+            raise ValidationError({'filter': ['The filter must narrow the reports down.']})
+        return filterset
+
+
+class ReportSearchFilter(BaseFilterBackend):
+    """Full-text search over location and description with ``?q=``."""
+
+    search_param = 'q'
+
+    @classmethod
+    def get_keyset_ordering(cls, request):
+        # Search results are paged by relevance, everything else by age.
+        if request.query_params.get(cls.search_param, '').strip():
+            return ('-search_rank', '-id')
+        return ReportCursorPagination.ordering
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip():
+            return queryset
+        return search(queryset, text)
@@ -0,0 +1,172 @@
+"""
+Geohash cells for report coordinates.
+
+Reports store ``latitude``/``longitude`` plus ``geocell``, the geohash of
+the point at ``GEOCELL_PRECISION`` characters. A geohash prefix names a
+rectangle, and every point inside it has a geohash starting with that
+prefix, so "all reports in this cell" is the string range
+``prefix <= geocell < prefix + '{'`` and runs on a plain B-tree index on
+any database, without PostGIS.
+
+Bounding-box and radius queries are turned into a handful of such
+ranges (``cell_ranges``) that cover the area, then refined with exact
+comparisons on the coordinates so the cells only decide which rows are
+read, never which rows are returned.
+"""
+import math
+
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# 9 characters is a cell of roughly 5 x 5 metres.
+GEOCELL_PRECISION = 9
+# Sorts after every geohash character, so prefix + CELL_END bounds the range.
+CELL_END = '{'
+# A query is covered with at most this many cells; more, smaller cells
+# read fewer rows outside the area but cost more OR'd range conditions.
+MAX_QUERY_CELLS = 16
+EARTH_RADIUS_M = 6_371_000
+METRES_PER_DEGREE = 111_320
+
+
+def encode(latitude, longitude, precision=GEOCELL_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_bounds(cell):
+    """Return the (south, west, north, east) corners of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def cell_size(precision):
+    """Return the (latitude, longitude) size in degrees of a cell at ``precision``."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def cell_grid(south, west, north, east, precision):
+    """Return the row and column ranges of the cells at ``precision`` that the box touches."""
+    height, width = cell_size(precision)
+    rows = range(math.floor((south + 90) / height), math.floor((min(north, 90 - 1e-9) + 90) / height) + 1)
+    columns = range(math.floor((west + 180) / width), math.floor((min(east, 180 - 1e-9) + 180) / width) + 1)
+    return rows, columns
+
+
+def covering_cells(south, west, north, east, max_cells=MAX_QUERY_CELLS, max_precision=GEOCELL_PRECISION):
+    """
+    Return the geohash cells covering the box, at the finest precision up
+    to ``max_precision`` that needs at most ``max_cells`` of them. Returns
+    None when even single-character cells are too many; the box is then
+    filtered on the coordinates alone.
+    """
+    for precision in range(max_precision, 0, -1):
+        height, width = cell_size(precision)
+        rows, columns = cell_grid(south, west, north, east, precision)
+        if len(rows) * len(columns) <= max_cells:
+            return sorted({
+                encode(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision)
+                for row in rows
+                for column in columns
+            })
+    return None
+
+
+def cell_ranges(cells, field='geocell', **equal):
+    """
+    Q() matching the cells. ``equal`` lookups are repeated in every range,
+    so each stays a single seek on an index that starts with those columns.
+    """
+    condition = Q()
+    for cell in cells:
+        condition |= Q(**equal, **{f'{field}__gte': cell, f'{field}__lt': cell + CELL_END})
+    return condition
+
+
+def split_box(south, west, north, east):
+    """
+    Return the box as a list of boxes that do not cross the antimeridian.
+    ``west > east`` means the box crosses it and is split in two.
+    """
+    if west > east:
+        return [(south, west, north, 180), (south, -180, north, east)]
+    return [(south, west, north, east)]
+
+
+def in_bbox(south, west, north, east):
+    """Q() for reports inside the box."""
+    condition = Q()
+    for south, west, north, east in split_box(south, west, north, east):
+        part = Q(latitude__gte=south, latitude__lte=north, longitude__gte=west, longitude__lte=east)
+        cells = covering_cells(south, west, north, east)
+        if cells is not None:
+            part &= cell_ranges(cells)
+        condition |= part
+    return condition
+
+
+def radius_bbox(latitude, longitude, metres):
+    """Return (south, west, north, east) of a box that contains the circle."""
+    lat_delta = metres / METRES_PER_DEGREE
+    south, north = max(latitude - lat_delta, -90), min(latitude + lat_delta, 90)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if cos_lat < 1e-6 or lat_delta / cos_lat >= 180:
+        return south, -180, north, 180
+    lng_delta = lat_delta / cos_lat
+    west = (longitude - lng_delta + 540) % 360 - 180
+    east = (longitude + lng_delta + 540) % 360 - 180
+    return south, west, north, east
+
+
+def distance_to(latitude, longitude):
+    """Haversine distance in metres from the given point, as a query expression."""
+    lat = math.radians(latitude)
+    d_lat = (Radians(F('latitude')) - lat) / 2
+    d_lng = (Radians(F('longitude')) - math.radians(longitude)) / 2
+    a = Power(Sin(d_lat), 2) + math.cos(lat) * Cos(Radians(F('latitude'))) * Power(Sin(d_lng), 2)
+    return ASin(Sqrt(a), output_field=FloatField()) * (2 * EARTH_RADIUS_M)
+
+
+def within_radius(queryset, latitude, longitude, metres):
+    """Reports within ``metres`` of the point, annotated with ``distance`` in metres."""
+    distance = distance_to(latitude, longitude)
+    nearby = queryset.model._base_manager.using(queryset.db).filter(
+        in_bbox(*radius_bbox(latitude, longitude, metres))
+    ).annotate(distance=distance).filter(distance__lte=metres)
+    # As a subquery the cell ranges always drive the lookup. Inlined, the
+    # planner may prefer walking the list's time index and testing every row.
+    return queryset.filter(pk__in=nearby.values('pk')).annotate(distance=distance)
@@ -0,0 +1,125 @@
+"""
+Derivative images for report photos.
+
+Phones upload multi-megabyte originals. After a report is committed its
+photo is decoded once in a background worker and re-encoded as a small
+JPEG thumbnail and a medium-sized WebP (JPEG when Pillow lacks WebP). Both
+are written without EXIF, so list views never download the original or
+leak the GPS data embedded in it. The request that stored the photo does
+no image work at all.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+from Myproject import versions
+from .models import Reportwaste
+from .storage import release_on_commit
+
+logger = logging.getLogger(__name__)
+
+MEDIUM_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Resizing and encoding release the GIL inside Pillow, so a small thread
+    # pool keeps the work off the request threads without the start-up and
+    # pickling cost of a process pool.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORT_IMAGE_WORKERS,
+                thread_name_prefix='report-images',
+            )
+        return _executor
+
+
+def schedule_derivatives(report_id):
+    """Build the derivatives of a report once the current transaction commits."""
+    transaction.on_commit(lambda: submit(report_id))
+
+
+def submit(report_id):
+    if settings.REPORT_IMAGE_WORKERS <= 0:
+        return build_derivatives(report_id)
+    return get_executor().submit(_build_in_worker, report_id)
+
+
+def _build_in_worker(report_id):
+    close_old_connections()
+    try:
+        return build_derivatives(report_id)
+    except Exception:
+        logger.exception('Could not build image derivatives for report %s', report_id)
+    finally:
+        close_old_connections()
+
+
+def render(image, max_size, image_format):
+    """Return ``image`` fitted into ``max_size`` pixels, encoded without metadata."""
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    buffer = BytesIO()
+    # Pillow only writes EXIF when it is passed explicitly, so the output
+    # carries no camera or location metadata.
+    image.save(buffer, image_format, quality=settings.REPORT_IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def build_derivatives(report_id, model=Reportwaste):
+    """Build the derivatives of a report, live (default) or archived (``model=ArchivedReport``)."""
+    try:
+        report = model.objects.only('id', 'image', 'thumbnail', 'image_medium').get(pk=report_id)
+    except model.DoesNotExist:
+        return None
+    if not report.image:
+        return None
+
+    source_name = report.image.name
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    with report.image.open('rb') as source, Image.open(source) as image:
+        image.load()
+        variants = {
+            'thumbnail': render(image.copy(), settings.REPORT_THUMBNAIL_SIZE, 'JPEG'),
+            'image_medium': render(image.copy(), settings.REPORT_MEDIUM_SIZE, MEDIUM_FORMAT),
+        }
+
+    names = {}
+    for field_name, content in variants.items():
+        field = model._meta.get_field(field_name)
+        image_format = 'JPEG' if field_name == 'thumbnail' else MEDIUM_FORMAT
+        name = field.generate_filename(report, stem + EXTENSIONS[image_format])
+        names[field_name] = field.storage.save(name, ContentFile(content))
+
+    # Only attach the derivatives if the photo was not replaced meanwhile.
+    # A queryset update also keeps this out of the report change signals.
+    with transaction.atomic():
+        attached = model.objects.filter(pk=report_id, image=source_name).update(**names)
+        # Every save took a reference, so drop the one held by the
+        # derivatives being replaced, or by the new ones if they are unused.
+        if attached:
+            versions.bump(versions.REPORTS)
+            release_on_commit([getattr(report, field).name for field in names])
+        else:
+            release_on_commit(names.values())
+    return names if attached else None
@@ -0,0 +1,76 @@
+"""
+Batch creation of reports uploaded by field devices.
+
+Trucks and kiosks buffer reports offline and sync them in one request.
+The batch is validated item by item with a single ``ReportwasteSerializer``,
+written with one multi-row INSERT per chunk inside one transaction, and
+announced through ``reports_changed`` so the counters see it exactly as
+they would see individual creates. Items carrying a ``client_key`` that the
+user already submitted are reported as duplicates and not inserted again,
+which makes replaying a batch after a lost response a no-op.
+"""
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .models import Reportwaste
+from .serializers import ReportwasteSerializer
+from .signals import reports_changed, snapshots
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+
+
+def ingest_reports(items, user, context):
+    validator = ReportwasteSerializer(context=context)
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, validator.run_validation(item)))
+        except serializers.ValidationError as exc:
+            results[index] = {'index': index, 'status': INVALID, 'errors': exc.detail}
+
+    try:
+        _insert(valid, user, results)
+    except IntegrityError:
+        # A concurrent replay inserted some of the same keys after we looked
+        # them up; the retry sees them and reports them as duplicates.
+        _insert(valid, user, results)
+    return results
+
+
+@transaction.atomic
+def _insert(valid, user, results):
+    keys = {data['client_key'] for _, data in valid if data.get('client_key')}
+    existing = dict(
+        Reportwaste.objects.filter(user=user, client_key__in=keys).values_list('client_key', 'id')
+    ) if keys else {}
+
+    pending = []
+    claimed = {}
+    for index, data in valid:
+        key = data.get('client_key')
+        if key and key in existing:
+            results[index] = {'index': index, 'status': DUPLICATE, 'id': existing[key]}
+        elif key and key in claimed:
+            results[index] = {'index': index, 'status': DUPLICATE, 'id': None}
+            claimed[key].append(index)
+        else:
+            if key:
+                claimed[key] = []
+            report = Reportwaste(user=user, **data)
+            # bulk_create skips save(), which normally derives this.
+            report.assign_geocell()
+            pending.append((index, report))
+
+    created = Reportwaste.objects.bulk_create([report for _, report in pending], batch_size=500)
+    for (index, _), report in zip(pending, created):
+        results[index] = {'index': index, 'status': CREATED, 'id': report.pk}
+        for duplicate in claimed.get(report.client_key, ()) if report.client_key else ():
+            results[duplicate]['id'] = report.pk
+
+    if created:
+        reports_changed.send(
+            sender=Reportwaste, changes=[(None, row) for row in snapshots(created)]
+        )
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from report import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move resolved reports older than --older-than days (REPORT_ARCHIVE_AFTER_DAYS) '
+        'into the archive table. Works in id-ordered batches, each in its own '
+        'transaction, and can be interrupted and re-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None, help='Age in days (default: REPORT_ARCHIVE_AFTER_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to wait between batches, to leave room for live traffic.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = archive.get_cutoff(options['older_than'])
+        archived = 0
+        last_id = 0
+        while True:
+            moved, last_id = archive.archive_batch(cutoff, options['batch_size'], after_id=last_id)
+            if last_id is None:
+                break
+            archived += moved
+            self.stdout.write(f'Archived reports up to id {last_id}')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} reports resolved before {cutoff:%Y-%m-%d}.'))
@@ -0,0 +1,67 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from report.models import Reportwaste
+from report.signals import TRACKED_FIELDS, reports_changed, snapshot
+
+# "-6.8161, 39.2804" as pasted from a map app into the location field.
+COORDINATES_IN_TEXT = re.compile(r'^\s*(-?\d{1,2}(?:\.\d+)?)\s*[,;]\s*(-?\d{1,3}(?:\.\d+)?)\s*$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill Reportwaste.geocell for reports that have coordinates and, with '
+        '--parse-location, take coordinates from locations typed as "lat, lng". '
+        'Works in id-ordered batches and can be interrupted and re-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--parse-location', action='store_true',
+            help='Also read coordinates from reports whose location is a "lat, lng" pair.',
+        )
+
+    def handle(self, *args, **options):
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Reportwaste.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('location', *TRACKED_FIELDS)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            changed = []
+            changes = []
+            for report in batch:
+                before = snapshot(report)
+                parsed = report.latitude is None and options['parse_location'] and self.parse_location(report)
+                report.assign_geocell()
+                if parsed or report.geocell != before['geocell']:
+                    changed.append(report)
+                    changes.append((before, snapshot(report)))
+            if changed:
+                with transaction.atomic():
+                    Reportwaste.objects.bulk_update(changed, ['latitude', 'longitude', 'geocell'])
+                    # bulk_update sends no signals; keep the map clusters in step.
+                    reports_changed.send(sender=Reportwaste, changes=changes)
+                updated += len(changed)
+            self.stdout.write(f'Processed reports up to id {last_id}')
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} reports.'))
+
+    def parse_location(self, report):
+        match = COORDINATES_IN_TEXT.match(report.location or '')
+        if not match:
+            return False
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return False
+        report.latitude, report.longitude = latitude, longitude
+        return True
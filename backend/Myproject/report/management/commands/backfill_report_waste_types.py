@@ -0,0 +1,79 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Myproject import versions
+from report.models import ArchivedReport, Reportwaste
+from report.signals import TRACKED_FIELDS, name_waste_types, reports_changed
+from waste.models import Wastetype
+
+
+class Command(BaseCommand):
+    help = (
+        'Point the waste_type of reports (live and archived) that still only have the legacy '
+        'free-text type at the catalogue entry of that name, ignoring case and surrounding spaces. '
+        'Works in id-ordered batches and can be interrupted and re-run. Types without a catalogue '
+        'entry are listed, or added to the catalogue with --create-missing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Add a catalogue entry for every legacy type that has none.',
+        )
+
+    def handle(self, *args, **options):
+        catalogue = {}
+        for waste_type in Wastetype.objects.order_by('-id'):
+            # The oldest entry wins when names differ only in case.
+            catalogue[waste_type.name.strip().casefold()] = waste_type
+        mapped = 0
+        unmapped = Counter()
+        for model in (Reportwaste, ArchivedReport):
+            last_id = 0
+            while True:
+                with transaction.atomic():
+                    batch = name_waste_types(list(
+                        model.objects.filter(id__gt=last_id, waste_type__isnull=True)
+                        .order_by('id').select_for_update().values(*TRACKED_FIELDS)[:options['batch_size']]
+                    ))
+                    if not batch:
+                        break
+                    last_id = batch[-1]['id']
+                    ids_by_type, changes = self.map_batch(batch, catalogue, unmapped, options['create_missing'])
+                    for waste_type, ids in ids_by_type.items():
+                        model.objects.filter(id__in=ids).update(waste_type=waste_type, legacy_waste_type=None)
+                        mapped += len(ids)
+                    if changes:
+                        # Only a change of spelling moves the counters, clusters and rollups.
+                        reports_changed.send(sender=model, changes=changes)
+                    elif ids_by_type:
+                        # The names are the same, but filters by type now find these reports.
+                        versions.bump(versions.REPORTS)
+                label = 'archived reports' if model is ArchivedReport else 'reports'
+                self.stdout.write(f'Processed {label} up to id {last_id}')
+
+        self.stdout.write(self.style.SUCCESS(f'Mapped {mapped} reports.'))
+        if unmapped:
+            self.stdout.write(self.style.WARNING(f'{sum(unmapped.values())} reports have a type missing from the catalogue:'))
+            for name, count in unmapped.most_common():
+                self.stdout.write(f'  {name!r}: {count}')
+
+    def map_batch(self, batch, catalogue, unmapped, create_missing):
+        ids_by_type = defaultdict(list)
+        changes = []
+        for before in batch:
+            name = (before['legacy_waste_type'] or '').strip()
+            waste_type = catalogue.get(name.casefold())
+            if waste_type is None and name and create_missing:
+                waste_type = catalogue[name.casefold()] = Wastetype.objects.create(name=name, description='')
+            if waste_type is None:
+                unmapped[before['legacy_waste_type']] += 1
+                continue
+            ids_by_type[waste_type].append(before['id'])
+            after = {**before, 'waste_type_id': waste_type.pk, 'legacy_waste_type': None, 'waste_type': waste_type.name}
+            if after['waste_type'] != before['waste_type']:
+                changes.append((before, after))
+        return ids_by_type, changes
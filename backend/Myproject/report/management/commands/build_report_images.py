@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+
+from report import imaging
+from report.models import ArchivedReport, Reportwaste
+
+
+class Command(BaseCommand):
+    help = 'Build missing thumbnail and medium images for report photos, archived reports included.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild derivatives that already exist too.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for model in (Reportwaste, ArchivedReport):
+            reports = model.objects.exclude(image='').exclude(image__isnull=True)
+            if not options['all']:
+                # Rows created without one hold '' rather than NULL.
+                reports = reports.filter(Q(thumbnail__isnull=True) | Q(thumbnail=''))
+            ids = reports.order_by('id').values_list('id', flat=True)
+            label = 'archived reports' if model is ArchivedReport else 'reports'
+
+            last_id = 0
+            while True:
+                batch = list(ids.filter(id__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    break
+                last_id = batch[-1]
+                jobs = [(model, report_id) for report_id in batch]
+                if settings.REPORT_IMAGE_WORKERS > 0:
+                    results = list(imaging.get_executor().map(self._build_in_worker, jobs))
+                else:
+                    results = [self._build(job) for job in jobs]
+                built += sum(results)
+                failed += len(results) - sum(results)
+                self.stdout.write(f'Processed {label} up to id {last_id}')
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {built} reports ({failed} failed).'))
+
+    def _build_in_worker(self, job):
+        close_old_connections()
+        try:
+            return self._build(job)
+        finally:
+            close_old_connections()
+
+    def _build(self, job):
+        model, report_id = job
+        try:
+            imaging.build_derivatives(report_id, model=model)
+            return True
+        except Exception as exc:
+            self.stderr.write(f'{model.__name__} {report_id}: {exc}')
+            return False
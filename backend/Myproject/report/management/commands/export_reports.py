@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from report import export
+from report.filters import ReportwasteFilter
+from report.models import Reportwaste
+
+
+class Command(BaseCommand):
+    help = 'Stream reports as CSV or NDJSON, with the same filters as the report list API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--file', help='Write to this path instead of stdout.')
+        parser.add_argument('--status', action='append', help='May be given more than once.')
+        parser.add_argument('--waste-type')
+        parser.add_argument('--user', type=int)
+        parser.add_argument('--after', help='ISO 8601 lower bound on time_created.')
+        parser.add_argument('--before', help='ISO 8601 upper bound on time_created.')
+
+    def handle(self, *args, **options):
+        params = {
+            'status': options['status'],
+            'waste_type': options['waste_type'],
+            'user': options['user'],
+            'time_created_after': options['after'],
+            'time_created_before': options['before'],
+        }
+        filterset = ReportwasteFilter(
+            {name: value for name, value in params.items() if value is not None},
+            queryset=Reportwaste.objects.all(),
+        )
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        chunks = export.iter_export(filterset.qs, options['output'])
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', encoding='utf-8', newline='') as stream:
+            stream.writelines(chunks)
@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Myproject import versions
+from report.models import ArchivedReport, Reportwaste
+from report.storage import is_content_addressed, report_storage
+
+FILE_FIELDS = ('image', 'thumbnail', 'image_medium')
+MODELS = (Reportwaste, ArchivedReport)
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy report photos stored under their upload name into the '
+        'content-addressed layout and rewrite the paths of live and archived reports in batches. '
+        'Safe to interrupt and re-run: rows that already point at '
+        'content-addressed files are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--delete-originals', action='store_true',
+            help='Remove the old files once every row referencing them has been rewritten.',
+        )
+
+    def handle(self, *args, **options):
+        storage = report_storage()
+        # Shared by both tables, so a file referenced from both is copied once.
+        moved = {}
+        missing = []
+        rows = 0
+        for model in MODELS:
+            rows += self.migrate(model, storage, moved, missing, options['batch_size'])
+
+        if options['delete_originals']:
+            originals = FileSystemStorage(location=storage.location)
+            for old_name, new_name in moved.items():
+                if new_name is None or new_name == old_name:
+                    continue
+                # A row written meanwhile may still point at the old file.
+                if self.is_referenced(old_name):
+                    self.stderr.write(f'Still referenced, left in place: {old_name}')
+                    continue
+                originals.delete(old_name)
+
+        for name in missing:
+            self.stderr.write(f'Missing file left in place: {name}')
+        copied = sum(1 for name in moved.values() if name is not None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {copied} files and rewrote {rows} reports ({len(missing)} missing).'
+        ))
+
+    def migrate(self, model, storage, moved, missing, batch_size):
+        label = 'archived reports' if model is ArchivedReport else 'reports'
+        rows = 0
+        last_id = 0
+        while True:
+            batch = list(
+                model.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values('id', *FILE_FIELDS)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]['id']
+
+            updates = defaultdict(list)
+            with transaction.atomic():
+                for row in batch:
+                    for field in FILE_FIELDS:
+                        name = row[field]
+                        if not name or is_content_addressed(name):
+                            continue
+                        if name not in moved:
+                            moved[name] = self.copy(storage, name)
+                            if moved[name] is None:
+                                missing.append(name)
+                        elif moved[name] is not None:
+                            storage.retain(moved[name])
+                        if moved[name] is not None:
+                            updates[(field, moved[name])].append(row['id'])
+                for (field, new_name), ids in updates.items():
+                    model.objects.filter(id__in=ids).update(**{field: new_name})
+                if updates:
+                    versions.bump(versions.REPORTS)
+            rows += len({report_id for ids in updates.values() for report_id in ids})
+            self.stdout.write(f'Rewrote {label} up to id {last_id}')
+        return rows
+
+    def is_referenced(self, name):
+        return any(
+            model.objects.filter(**{field: name}).exists() for model in MODELS for field in FILE_FIELDS
+        )
+
+    def copy(self, storage, name):
+        if not storage.exists(name):
+            return None
+        with storage.open(name, 'rb') as original:
+            return storage.save(name, File(original))
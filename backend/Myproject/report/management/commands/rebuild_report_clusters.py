@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from report import clusters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the map cluster table (reports per geohash cell, status and waste type) from the report table.'
+
+    def handle(self, *args, **options):
+        located = clusters.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt clusters for {located} located reports.'))
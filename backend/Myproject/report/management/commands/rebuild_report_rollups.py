@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from report import rollups
+
+
+class Command(BaseCommand):
+    help = 'Check the daily report rollups against the report table and recompute them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the rollups with the report table; fail if they differ.',
+        )
+
+    def handle(self, *args, **options):
+        drift = rollups.verify()
+        for (day, waste_type, status, ward), stored, actual in drift[:20]:
+            self.stdout.write(f'{day} {waste_type}/{status}/{ward or "-"}: stored {stored}, actual {actual}')
+        if len(drift) > 20:
+            self.stdout.write(f'... and {len(drift) - 20} more')
+        if options['check']:
+            if drift:
+                raise CommandError(f'{len(drift)} rollups differ from the report table.')
+            self.stdout.write(self.style.SUCCESS('Rollups are accurate.'))
+            return
+        rows = rollups.rebuild()
+        if drift:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} rollups had drifted.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Rollups were accurate.'))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} rollups.'))
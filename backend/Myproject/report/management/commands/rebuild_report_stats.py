@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from report import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the report counters (total, per status, per waste type) from the report table.'
+
+    def handle(self, *args, **options):
+        before = stats.get_stats()
+        after = stats.rebuild()
+        if before == after:
+            self.stdout.write(self.style.SUCCESS(f"Counters were accurate ({after['total']} reports)."))
+        else:
+            self.stdout.write(self.style.WARNING(f'Counters drifted: {before}'))
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt counters: {after}'))
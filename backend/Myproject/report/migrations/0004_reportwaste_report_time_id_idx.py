@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0003_alter_reportwaste_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reportwaste',
+            index=models.Index(fields=['time_created', 'id'], name='report_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0004_reportwaste_report_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reportwaste',
+            index=models.Index(fields=['status', 'time_created'], name='report_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportwaste',
+            index=models.Index(fields=['waste_type', 'time_created'], name='report_type_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportwaste',
+            index=models.Index(fields=['user', 'time_created'], name='report_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+def populate_stats(apps, schema_editor):
+    Reportwaste = apps.get_model('report', 'Reportwaste')
+    ReportStat = apps.get_model('report', 'ReportStat')
+    rows = [ReportStat(dimension='total', key='', count=Reportwaste.objects.count())]
+    for dimension in ('status', 'waste_type'):
+        for group in Reportwaste.objects.values(dimension).annotate(n=models.Count('id')).order_by():
+            rows.append(ReportStat(dimension=dimension, key=group[dimension], count=group['n']))
+    ReportStat.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0005_reportwaste_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='report_stat_unique_key')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
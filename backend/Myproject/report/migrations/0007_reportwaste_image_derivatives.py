@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0006_reportstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportwaste',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='reports/thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='reportwaste',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='reports/medium/'),
+        ),
+    ]
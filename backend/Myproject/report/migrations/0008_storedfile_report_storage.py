@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+import report.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0007_reportwaste_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='reportwaste',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=report.storage.report_storage, upload_to='reports/'),
+        ),
+        migrations.AlterField(
+            model_name='reportwaste',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=report.storage.report_storage, upload_to='reports/medium/'),
+        ),
+        migrations.AlterField(
+            model_name='reportwaste',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=report.storage.report_storage, upload_to='reports/thumbnails/'),
+        ),
+    ]
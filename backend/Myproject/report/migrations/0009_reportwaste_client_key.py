@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0008_storedfile_report_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportwaste',
+            name='client_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='reportwaste',
+            constraint=models.UniqueConstraint(fields=('user', 'client_key'), name='report_user_client_key_unique'),
+        ),
+    ]
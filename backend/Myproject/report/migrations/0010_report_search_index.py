@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from report import search
+
+
+def install_search_index(apps, schema_editor):
+    search.install_index(schema_editor, apps.get_model('report', 'Reportwaste'))
+
+
+def uninstall_search_index(apps, schema_editor):
+    search.uninstall_index(schema_editor, apps.get_model('report', 'Reportwaste'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0009_reportwaste_client_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,31 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0010_report_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportwaste',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='reportwaste',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddField(
+            model_name='reportwaste',
+            name='geocell',
+            field=models.CharField(blank=True, editable=False, max_length=9, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reportwaste',
+            index=models.Index(fields=['geocell'], name='report_geocell_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+
+def populate_clusters(apps, schema_editor):
+    Reportwaste = apps.get_model('report', 'Reportwaste')
+    ReportCluster = apps.get_model('report', 'ReportCluster')
+    located = Reportwaste.objects.filter(geocell__isnull=False).order_by()
+    for precision in range(1, 8):
+        groups = located.values('status', 'waste_type', prefix=Substr('geocell', 1, precision)).annotate(
+            n=models.Count('id'), latitude_sum=models.Sum('latitude'), longitude_sum=models.Sum('longitude'),
+        )
+        ReportCluster.objects.bulk_create([
+            ReportCluster(
+                precision=precision, cell=group['prefix'], status=group['status'],
+                waste_type=group['waste_type'], count=group['n'],
+                latitude_sum=group['latitude_sum'], longitude_sum=group['longitude_sum'],
+            )
+            for group in groups
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0011_reportwaste_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('cell', models.CharField(max_length=9)),
+                ('status', models.CharField(max_length=25)),
+                ('waste_type', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('precision', 'cell', 'status', 'waste_type'), name='report_cluster_unique_key')],
+            },
+        ),
+        migrations.RunPython(populate_clusters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    Reportwaste = apps.get_model('report', 'Reportwaste')
+    ReportDailyRollup = apps.get_model('report', 'ReportDailyRollup')
+    groups = Reportwaste.objects.values(
+        'waste_type', 'status', day=TruncDate('time_created'), ward_key=Coalesce('ward', models.Value('')),
+    ).annotate(n=models.Count('id')).order_by()
+    ReportDailyRollup.objects.bulk_create([
+        ReportDailyRollup(
+            day=group['day'], waste_type=group['waste_type'], status=group['status'],
+            ward=group['ward_key'], count=group['n'],
+        )
+        for group in groups
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0014_reportevent'),
+    ]
+
+    operations = [
+        # Nullable, so SQLite adds the column in place and keeps the search triggers.
+        migrations.AddField(
+            model_name='reportwaste',
+            name='ward',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReportDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('waste_type', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=25)),
+                ('ward', models.CharField(blank=True, max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'waste_type', 'status', 'ward'), name='report_rollup_unique_key')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+import django.core.validators
+import django.db.models.deletion
+import report.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0015_reportwaste_ward_reportdailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReport',
+            fields=[
+                ('waste_type', models.CharField(max_length=100)),
+                ('location', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('image', models.ImageField(blank=True, null=True, storage=report.storage.report_storage, upload_to='reports/')),
+                ('thumbnail', models.ImageField(blank=True, editable=False, null=True, storage=report.storage.report_storage, upload_to='reports/thumbnails/')),
+                ('image_medium', models.ImageField(blank=True, editable=False, null=True, storage=report.storage.report_storage, upload_to='reports/medium/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('resolved', 'Resolved')], default='pending', max_length=25)),
+                ('client_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)])),
+                ('longitude', models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)])),
+                ('geocell', models.CharField(blank=True, editable=False, max_length=9, null=True)),
+                ('ward', models.CharField(blank=True, max_length=100, null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('time_created', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['time_created', 'id'], name='archive_time_id_idx'), models.Index(fields=['user', 'time_created'], name='archive_user_time_idx')],
+            },
+        ),
+    ]
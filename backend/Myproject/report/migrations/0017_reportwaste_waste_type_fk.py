@@ -0,0 +1,75 @@
+"""
+Turn ``waste_type`` into a foreign key to ``waste.Wastetype``.
+
+The free-text column is kept as ``legacy_waste_type`` and the new key
+starts out empty; ``manage.py backfill_report_waste_types`` maps the text
+to the catalogue in batches after the deploy, without holding one long
+transaction over the whole table.
+"""
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+from report import search
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # Changing a column rebuilds report_reportwaste on SQLite, which drops
+    # the triggers that keep the full-text index in sync.
+    if schema_editor.connection.vendor == 'sqlite':
+        search.install_index(schema_editor, apps.get_model('report', 'Reportwaste'))
+
+
+def restore_legacy_names(apps, schema_editor):
+    Wastetype = apps.get_model('waste', 'Wastetype')
+    names = Subquery(Wastetype.objects.filter(pk=OuterRef('waste_type_id')).values('name')[:1])
+    for model in ('Reportwaste', 'ArchivedReport'):
+        apps.get_model('report', model).objects.filter(waste_type__isnull=False).update(legacy_waste_type=names)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0016_archivedreport'),
+        ('waste', '0001_initial'),
+    ]
+
+    operations = [
+        # Only has an effect when migrating backwards, after the table
+        # rebuild that reverts the column change.
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_triggers),
+        migrations.RemoveIndex(model_name='reportwaste', name='report_type_time_idx'),
+        migrations.RenameField(model_name='reportwaste', old_name='waste_type', new_name='legacy_waste_type'),
+        migrations.RenameField(model_name='archivedreport', old_name='waste_type', new_name='legacy_waste_type'),
+        migrations.AlterField(
+            model_name='reportwaste',
+            name='legacy_waste_type',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedreport',
+            name='legacy_waste_type',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportwaste',
+            name='waste_type',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='waste.wastetype'),
+        ),
+        migrations.AddField(
+            model_name='archivedreport',
+            name='waste_type',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='waste.wastetype'),
+        ),
+        migrations.AddIndex(
+            model_name='reportwaste',
+            index=models.Index(fields=['waste_type', 'time_created'], name='report_type_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreport',
+            index=models.Index(fields=['waste_type'], name='archive_type_idx'),
+        ),
+        # Backwards: put the names back before the key is dropped.
+        migrations.RunPython(migrations.RunPython.noop, restore_legacy_names),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+    ]
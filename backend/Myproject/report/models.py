@@ -1,7 +1,49 @@
-from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
-class Reportwaste(models.Model):
+from . import geo
+from .storage import report_storage
+
+class ReportwasteQuerySet(models.QuerySet):
+    def set_status(self, status):
+        """
+        Move every report in the queryset to ``status``.
+
+        The affected rows are read and locked once, changed with a single
+        UPDATE per 1000 ids and announced through ``reports_changed`` so the
+        counters stay exact. Returns the number of reports changed.
+        """
+        from .signals import TRACKED_FIELDS, name_waste_types, reports_changed
+
+        changing = self.exclude(status=status).order_by()
+        if changing.query.distinct:
+            # PostgreSQL refuses SELECT DISTINCT ... FOR UPDATE; lock by id instead.
+            changing = self.model._base_manager.using(self.db).filter(pk__in=changing.values('pk'))
+        with transaction.atomic(using=self.db):
+            before = name_waste_types(list(changing.select_for_update().values(*TRACKED_FIELDS)))
+            ids = [row['id'] for row in before]
+            for start in range(0, len(ids), 1000):
+                self.model._base_manager.using(self.db).filter(
+                    pk__in=ids[start:start + 1000]
+                ).update(status=status)
+            if before:
+                reports_changed.send(
+                    sender=self.model,
+                    changes=[(row, {**row, 'status': status}) for row in before],
+                )
+        return len(before)
+
+
+# The name a report's waste type is counted and exported under, as a query
+# expression: the catalogue name, or the legacy text while it is unmapped.
+WASTE_TYPE_NAME = Coalesce('waste_type__name', 'legacy_waste_type')
+
+
+class AbstractReport(models.Model):
+    """Columns shared by live reports and archived ones (see report.archive)."""
+
     STATUS_CHOICES = (
         ('pending','Pending'),
         ('in_progress','In Progress'),
@@ -9,15 +51,225 @@ class Reportwaste(models.Model):
     )
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    waste_type = models.CharField(max_length=100)
+    # Null only for old reports whose free-text type is not mapped to the
+    # catalogue yet; see ``manage.py backfill_report_waste_types``.
+    waste_type = models.ForeignKey('waste.Wastetype', on_delete=models.PROTECT, null=True, db_index=False)
+    # The free-text type reports had before the catalogue, cleared once mapped.
+    legacy_waste_type = models.CharField(max_length=100, blank=True, null=True, editable=False)
     location = models.CharField(max_length = 100)
     description = models.TextField()
-    image = models.ImageField(upload_to='reports/',blank=True, null=True)
+    image = models.ImageField(upload_to='reports/', storage=report_storage, blank=True, null=True)
+    # Downscaled, EXIF-free copies of ``image`` written by report.imaging.
+    thumbnail = models.ImageField(upload_to='reports/thumbnails/', storage=report_storage, blank=True, null=True, editable=False)
+    image_medium = models.ImageField(upload_to='reports/medium/', storage=report_storage, blank=True, null=True, editable=False)
     status = models.CharField(max_length=25, choices=STATUS_CHOICES,default='pending')
     time_created=models.DateTimeField(auto_now_add=True)
+    # Chosen by the submitting device so a replayed upload is recognised.
+    client_key = models.CharField(max_length=64, blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Geohash of (latitude, longitude), kept by save(); see report.geo.
+    geocell = models.CharField(max_length=geo.GEOCELL_PRECISION, blank=True, null=True, editable=False)
+    # Administrative ward, for the per-ward analytics; unknown for older reports.
+    ward = models.CharField(max_length=100, blank=True, null=True)
+
+    class Meta:
+        abstract = True
+
+    def assign_geocell(self):
+        """Derive ``geocell`` from the coordinates (bulk paths call this before inserting)."""
+        if self.latitude is None or self.longitude is None:
+            self.geocell = None
+        else:
+            self.geocell = geo.encode(self.latitude, self.longitude)
+
+    @property
+    def waste_type_name(self):
+        return self.waste_type.name if self.waste_type_id else self.legacy_waste_type
+
+    def __str__(self):
+        return f"{self.waste_type_name}-{self.location}"
+
+
+class Reportwaste(AbstractReport):
+    objects = ReportwasteQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_key'], name='report_user_client_key_unique'),
+        ]
+        indexes = [
+            # Backs the keyset pagination order (-time_created, -id).
+            models.Index(fields=['time_created', 'id'], name='report_time_id_idx'),
+            # One per list filter, each followed by the ordering column.
+            models.Index(fields=['status', 'time_created'], name='report_status_time_idx'),
+            models.Index(fields=['waste_type', 'time_created'], name='report_type_time_idx'),
+            models.Index(fields=['user', 'time_created'], name='report_user_time_idx'),
+            # Bounding-box and radius queries read geohash prefix ranges.
+            models.Index(fields=['geocell'], name='report_geocell_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the row looked like so post_save can tell which
+        # counters a status change has to move (see report.signals).
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the row and the statistics updated by the post_save handler
+        # in one transaction.
+        self.assign_geocell()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geocell'}
+        if not self._state.adding and self.pk is not None and not kwargs.get('force_insert'):
+            # A loaded report that has been archived since must fail to save,
+            # not be inserted again next to its archived copy.
+            kwargs['force_update'] = True
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class ArchivedReport(AbstractReport):
+    """
+    A resolved report moved out of ``Reportwaste`` by ``manage.py
+    archive_reports``. It keeps its id, so links and cursors stay valid, and
+    is only read through ``?include_archived=true``.
+    """
+
+    # The live report's id; the archive never allocates ids of its own.
+    id = models.BigIntegerField(primary_key=True)
+    # Copied from the live row; auto_now_add would stamp the archiving time.
+    time_created = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The archive is read in the list order, or a reporter's own reports.
+            models.Index(fields=['time_created', 'id'], name='archive_time_id_idx'),
+            models.Index(fields=['user', 'time_created'], name='archive_user_time_idx'),
+            # Lets the catalogue's PROTECT check find a type's reports.
+            models.Index(fields=['waste_type'], name='archive_type_idx'),
+        ]
+
+
+class ReportStat(models.Model):
+    """
+    Running count of reports for one value of one dimension.
+
+    ``dimension`` is ``total`` (with an empty ``key``), ``status`` or
+    ``waste_type``. Rows are adjusted by report.stats on every write and can
+    be recomputed with ``manage.py rebuild_report_stats``.
+    """
+
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=100, blank=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='report_stat_unique_key'),
+        ]
 
     def __str__(self):
-        return f"{self.waste_type}-{self.location}"
-    
+        return f"{self.dimension}:{self.key}={self.count}"
 
 # Create your models here.
+
+
+class StoredFile(models.Model):
+    """Reference count of a file kept by report.storage.ContentAddressedStorage."""
+
+    name = models.CharField(max_length=255, unique=True)
+    references = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.references})"
+
+
+class ReportCluster(models.Model):
+    """
+    Number of reports in one geohash cell, for one status and waste type.
+
+    Every report with coordinates is counted once per precision in
+    report.clusters.PRECISIONS. The coordinate sums give the cluster's
+    centroid. Rows are adjusted by report.clusters on every write and can be
+    recomputed with ``manage.py rebuild_report_clusters``.
+    """
+
+    precision = models.PositiveSmallIntegerField()
+    cell = models.CharField(max_length=geo.GEOCELL_PRECISION)
+    status = models.CharField(max_length=25)
+    waste_type = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index behind the per-viewport cell range scans.
+            models.UniqueConstraint(
+                fields=['precision', 'cell', 'status', 'waste_type'], name='report_cluster_unique_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.precision}:{self.cell}:{self.status}:{self.waste_type}={self.count}"
+
+
+class ReportDailyRollup(models.Model):
+    """
+    Number of reports created on one day, for one waste type, status and
+    ward (empty when the report has none).
+
+    Rows are adjusted by report.rollups on every write and can be checked
+    and recomputed with ``manage.py rebuild_report_rollups``.
+    """
+
+    day = models.DateField()
+    waste_type = models.CharField(max_length=100)
+    status = models.CharField(max_length=25)
+    ward = models.CharField(max_length=100, blank=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index behind the date range scans of the analytics API.
+            models.UniqueConstraint(
+                fields=['day', 'waste_type', 'status', 'ward'], name='report_rollup_unique_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day}:{self.waste_type}:{self.status}:{self.ward}={self.count}"
+
+
+class ResourceVersion(models.Model):
+    """
+    Change counter of one API resource (``reports``, ``wastetypes``, ...).
+
+    Bumped by Myproject.versions in the same transaction as every write, so
+    reading it is a cheap way to tell whether a response can have changed.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}@{self.version}"
+
+
+class ReportEvent(models.Model):
+    """
+    A report event kept for report.events.DatabaseBroker, which lets every
+    worker process see the events written by the others.
+    """
+
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.pk}: {self.payload.get('type')}"
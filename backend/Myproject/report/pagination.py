@@ -0,0 +1,197 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ReportCursorPagination(BasePagination):
+    """
+    Keyset pagination for report lists.
+
+    Pages are addressed by the values of the ordering columns of the last
+    (or first) row seen, so every page is a bounded index range scan instead
+    of an OFFSET that grows with the page number. The cursor is opaque to
+    clients: it is a url-safe base64 encoded JSON document.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Every column is descending and the last one must be unique so the
+    # ordering is total and no row can be skipped or repeated.
+    ordering = ('-time_created', '-id')
+
+    def get_page_size(self, request):
+        page_size = settings.REPORT_PAGE_SIZE
+        raw_value = request.query_params.get(self.page_size_query_param)
+        if raw_value:
+            try:
+                page_size = int(raw_value)
+            except ValueError:
+                pass
+        return max(1, min(page_size, settings.REPORT_MAX_PAGE_SIZE))
+
+    def get_ordering(self, view):
+        return getattr(view, 'keyset_ordering', self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(request, view)
+        results = list(self.get_page_queryset(queryset))
+        return self.build_page(results)
+
+    def prepare(self, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.cursor = self.decode_cursor(request)
+
+    def get_page_queryset(self, queryset):
+        """
+        Return the (unevaluated) queryset for the requested page.
+
+        One extra row is fetched so we can tell whether another page exists
+        without running a COUNT.
+        """
+        reverse = self.cursor is not None and self.cursor['r']
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(queryset, self.cursor['v'], reverse)
+            )
+        order_by = self.ordering
+        if reverse:
+            order_by = [self._flip(field) for field in self.ordering]
+        return queryset.order_by(*order_by)[:self.page_size + 1]
+
+    def merge_results(self, *results):
+        """
+        Merge the page rows fetched from several tables (each from
+        ``get_page_queryset``) into the rows of one page, in keyset order.
+        """
+        reverse = self.cursor is not None and self.cursor['r']
+        names = [field.lstrip('-') for field in self.ordering]
+        # Every column is descending, so one sort direction fits them all.
+        rows = sorted(
+            (row for rows in results for row in rows),
+            key=lambda row: tuple(getattr(row, name) for name in names),
+            reverse=not reverse,
+        )
+        return rows[:self.page_size + 1]
+
+    def build_page(self, results):
+        reverse = self.cursor is not None and self.cursor['r']
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values, reverse = cursor['v'], bool(cursor.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'v': values, 'r': reverse}
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps(
+            {'v': [self._dump(value) for value in values], 'r': reverse},
+            separators=(',', ':'),
+        )
+        return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii').rstrip('=')
+
+    def _link(self, obj, reverse):
+        values = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(values, reverse)
+        )
+
+    def _keyset_filter(self, queryset, values, reverse):
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y), generalised to
+        # any number of columns and per-column direction.
+        values = [
+            self._load(queryset, field.lstrip('-'), value)
+            for field, value in zip(self.ordering, values)
+        ]
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return value
+
+    def _load(self, queryset, name, value):
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        try:
+            return field.to_python(value)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
@@ -1,5 +1,28 @@
 from rest_framework import permissions
 
+
+def report_scope(user):
+    """
+    Return which reports ``user`` may see: 'all' for staff, officers and
+    admins, 'own' for citizens (and users without a profile), None for
+    anonymous users.
+    """
+    if user.is_authenticated:
+        if user.is_superuser or user.is_staff:
+            return 'all'
+        try:
+            from user.models import Userprofile
+            # The accessor is cached on the user, so a permission check
+            # that already loaded the profile saves the query here.
+            profile = user.userprofile
+            if profile.role in ['officer', 'admin']:
+                return 'all'
+            else:
+                return 'own'
+        except Userprofile.DoesNotExist:
+            return 'own'
+    return None
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
     Custom permission to only allow admins to edit or delete.
@@ -55,3 +78,21 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return False
 
         return False
+
+
+class IsOfficerOrAdmin(permissions.BasePermission):
+    """
+    Allow officers and admins (and Django staff) only.
+    Used for bulk status changes, which citizens cannot make on any report.
+    """
+
+    def has_permission(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return False
+        if request.user.is_superuser or request.user.is_staff:
+            return True
+        try:
+            profile = request.user.userprofile
+        except:
+            return False
+        return profile.role in ['officer', 'admin']
@@ -0,0 +1,187 @@
+"""
+Daily report rollups for the analytics API.
+
+Charts of reports per waste type, status and ward used to need a
+``GROUP BY`` over the whole report table on every load. Instead every
+write adjusts ``ReportDailyRollup`` rows, one per creation day, waste type,
+status and ward, in the same transaction (the way report.stats keeps its
+counters). The analytics API sums those rows over any date range, in
+daily, weekly or monthly buckets, so a chart reads at most days x waste
+types x statuses x wards rows however many reports there are.
+
+A report is counted on the day it was created, under its current status:
+when it is resolved it moves from ``pending`` to ``resolved`` on that day.
+The numbers for a range therefore describe the reports created in it, and
+a ward's resolution rate is the share of those that are resolved now.
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import WASTE_TYPE_NAME, ArchivedReport, Reportwaste, ReportDailyRollup
+
+INTERVALS = ('day', 'week', 'month')
+DIMENSIONS = ('waste_type', 'status', 'ward')
+RESOLVED = 'resolved'
+
+
+def _key(row):
+    created = row.get('time_created')
+    if created is None:
+        return None
+    day = timezone.localdate(created) if timezone.is_aware(created) else created.date()
+    return (day, row['waste_type'], row['status'], row.get('ward') or '')
+
+
+def get_deltas(changes):
+    """
+    Turn ``(before, after)`` report snapshots into rollup adjustments.
+    Adjustments that cancel out are dropped.
+    """
+    deltas = Counter()
+    for before, after in changes:
+        for row, sign in ((before, -1), (after, 1)):
+            key = _key(row) if row is not None else None
+            if key is not None:
+                deltas[key] += sign
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def apply_changes(changes):
+    # Sorted so concurrent writers take row locks in the same order.
+    for key, delta in sorted(get_deltas(changes).items()):
+        _bump(key, delta)
+
+
+def _bump(key, delta):
+    day, waste_type, status, ward = key
+    rollups = ReportDailyRollup.objects.filter(day=day, waste_type=waste_type, status=status, ward=ward)
+    if rollups.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ReportDailyRollup.objects.create(
+                day=day, waste_type=waste_type, status=status, ward=ward, count=delta
+            )
+    except IntegrityError:
+        # Another transaction created the row first.
+        rollups.update(count=F('count') + delta)
+
+
+def period_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def periods(start, end, interval):
+    """Every period starting in or overlapping ``start``..``end``."""
+    current = period_start(start, interval)
+    while current <= end:
+        yield current
+        if interval == 'month':
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=7 if interval == 'week' else 1)
+
+
+def _rollups(start, end, filters):
+    return ReportDailyRollup.objects.filter(
+        day__gte=start, day__lte=end, **{name: value for name, value in filters.items() if value is not None}
+    )
+
+
+def get_series(start, end, interval='day', group_by=None, **filters):
+    """
+    Report counts per period of ``interval`` between ``start`` and ``end``
+    (inclusive), optionally split by one of ``DIMENSIONS`` and narrowed by
+    ``waste_type``/``status``/``ward`` filters. Empty periods are included.
+    """
+    bucket = {'day': F('day'), 'week': TruncWeek('day'), 'month': TruncMonth('day')}[interval]
+    groups = _rollups(start, end, filters).values(period=bucket, **({'key': F(group_by)} if group_by else {}))
+    series = {period: {'period': period, 'total': 0} for period in periods(start, end, interval)}
+    if group_by:
+        for entry in series.values():
+            entry['counts'] = {}
+    for group in groups.annotate(n=Sum('count')).order_by():
+        if not group['n']:
+            continue
+        entry = series[group['period']]
+        entry['total'] += group['n']
+        if group_by:
+            entry['counts'][group['key']] = entry['counts'].get(group['key'], 0) + group['n']
+    return list(series.values())
+
+
+def get_ward_resolution(start, end, **filters):
+    """Reports created between ``start`` and ``end`` per ward, with the share resolved."""
+    wards = {}
+    for ward, status, count in _rollups(start, end, filters).values_list('ward', 'status').annotate(
+        n=Sum('count')
+    ).order_by():
+        entry = wards.setdefault(ward, {'ward': ward or None, 'total': 0, 'resolved': 0})
+        entry['total'] += count
+        if status == RESOLVED:
+            entry['resolved'] += count
+    result = []
+    for ward in sorted(wards):
+        entry = wards[ward]
+        if entry['total']:
+            entry['resolution_rate'] = round(entry['resolved'] / entry['total'], 4)
+            result.append(entry)
+    return result
+
+
+def count_reports():
+    """``{(day, waste_type, status, ward): count}`` computed from the report table and the archive."""
+    counts = Counter()
+    for model in (Reportwaste, ArchivedReport):
+        groups = model.objects.values(
+            'status', day=TruncDate('time_created'), type_name=WASTE_TYPE_NAME,
+            ward_key=Coalesce('ward', Value('')),
+        ).annotate(n=Count('id')).order_by()
+        for group in groups:
+            counts[(group['day'], group['type_name'], group['status'], group['ward_key'])] += group['n']
+    return dict(counts)
+
+
+def verify():
+    """Return ``[(key, stored, actual)]`` for every rollup that disagrees with the reports."""
+    stored = {
+        (row.day, row.waste_type, row.status, row.ward): row.count
+        for row in ReportDailyRollup.objects.exclude(count=0)
+    }
+    actual = count_reports()
+    return [
+        (key, stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(stored.keys() | actual.keys())
+        if stored.get(key, 0) != actual.get(key, 0)
+    ]
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every rollup from the report table; returns the number of rows."""
+    ReportDailyRollup.objects.all().delete()
+    rows = ReportDailyRollup.objects.bulk_create([
+        ReportDailyRollup(day=day, waste_type=waste_type, status=status, ward=ward, count=count)
+        for (day, waste_type, status, ward), count in count_reports().items()
+    ], batch_size=1000)
+    return len(rows)
+
+
+def rename_waste_type(old, new):
+    """Move the rollups of waste type ``old`` to ``new`` after a catalogue rename."""
+    rows = ReportDailyRollup.objects.filter(waste_type=old)
+    try:
+        with transaction.atomic():
+            rows.update(waste_type=new)
+    except IntegrityError:
+        # The new name is a key already (see report.stats.rename_waste_type).
+        rebuild()
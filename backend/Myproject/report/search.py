@@ -0,0 +1,151 @@
+"""
+Full-text search over report locations and descriptions.
+
+``icontains`` cannot use an index, so every keyword search used to read
+the whole report table. Each database now gets a real text index:
+
+* PostgreSQL: a GIN index on ``to_tsvector('simple', location || ' ' ||
+  description)``, matched with ``websearch_to_tsquery`` and ranked with
+  ``ts_rank``.
+* SQLite: an FTS5 external-content table that shadows ``report_reportwaste``
+  and is kept in sync by triggers, matched with ``MATCH`` and ranked with
+  bm25.
+
+Other backends fall back to ``icontains``. ``search()`` annotates every
+result with ``search_rank`` (higher is better). The report list orders
+and paginates by that rank when ``?q=`` is given.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'simple'
+FTS_TABLE = 'report_reportwaste_fts'
+REPORT_TABLE = 'report_reportwaste'
+GIN_INDEX = 'report_search_gin_idx'
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        location, description,
+        content='{REPORT_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {REPORT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, location, description)
+        VALUES (new.id, new.location, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {REPORT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, location, description)
+        VALUES ('delete', old.id, old.location, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF location, description ON {REPORT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, location, description)
+        VALUES ('delete', old.id, old.location, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, location, description)
+        VALUES (new.id, new.location, new.description);
+    END
+    """,
+    # Index whatever is already in the table.
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def _search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector('location', 'description', config=SEARCH_CONFIG)
+
+
+def install_index(schema_editor, model):
+    """
+    Create the text index for the current database.
+
+    Called from migrations. On SQLite it must run again after any migration
+    that rebuilds ``report_reportwaste``, because dropping the old table
+    drops its triggers.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+
+        schema_editor.add_index(model, GinIndex(_search_vector(), name=GIN_INDEX))
+    elif vendor == 'sqlite':
+        for statement in SQLITE_INSTALL:
+            schema_editor.execute(statement)
+
+
+def uninstall_index(schema_editor, model):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+    elif vendor == 'sqlite':
+        for statement in SQLITE_UNINSTALL:
+            schema_editor.execute(statement)
+
+
+def fts5_query(text):
+    """Quote every word so user input can never be parsed as FTS5 syntax."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search(queryset, text):
+    text = text.strip()
+    if not text:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql' and queryset.model._meta.db_table == REPORT_TABLE:
+        return _search_postgresql(queryset, text)
+    if vendor == 'sqlite' and queryset.model._meta.db_table == REPORT_TABLE:
+        return _search_sqlite(queryset, text)
+    return search_icontains(queryset, text)
+
+
+def _search_postgresql(queryset, text):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    vector = _search_vector()
+    # Filtering on the same expression the GIN index was built from is what
+    # lets the planner use it.
+    return queryset.annotate(
+        search_document=vector,
+        search_rank=SearchRank(vector, query),
+    ).filter(search_document=query)
+
+
+def _search_sqlite(queryset, text):
+    match = fts5_query(text)
+    if not match:
+        return queryset.none()
+    # Join the FTS table once, so bm25 statistics are computed per query
+    # rather than per row. FTS5's rank is negative, smaller is better.
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {REPORT_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    ).annotate(search_rank=RawSQL(f'-{FTS_TABLE}.rank', (), output_field=FloatField()))
+
+
+def search_icontains(queryset, text):
+    condition = Q()
+    for word in text.split():
+        condition &= Q(location__icontains=word) | Q(description__icontains=word)
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
@@ -1,15 +1,146 @@
 from rest_framework import serializers
 from .models import Reportwaste
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from waste import catalogue
+from Myproject.instrumentation import TimedSerializerMixin
+from waste.models import Wastetype
+
+
+class WasteTypeField(serializers.RelatedField):
+    """
+    A report's waste type, by name.
+
+    Input is the name of a catalogue entry (case and surrounding spaces
+    don't matter); output is that name, or the legacy free-text name of a
+    report that is not mapped to the catalogue yet. Both go through the
+    process-local catalogue (waste.catalogue), or the one in the
+    ``wastetypes`` context entry, so the common path runs no query. Names
+    it does not know yet are looked up once per serializer.
+    """
+
+    default_error_messages = {
+        'does_not_exist': 'Unknown waste type "{value}".',
+        'invalid': 'Expected the name of a waste type.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Wastetype.objects.all())
+        super().__init__(**kwargs)
+        self._by_name = {}
+
+    def get_catalogue(self):
+        return self.context.get('wastetypes') or catalogue.get_catalogue()
+
+    def get_attribute(self, instance):
+        return instance
+
+    def to_representation(self, value):
+        # A report, or a catalogue entry when the browsable API lists choices.
+        if isinstance(value, Wastetype):
+            return value.name
+        if value.waste_type_id is None:
+            return value.legacy_waste_type
+        name = self.get_catalogue().get_name(value.waste_type_id)
+        return name if name is not None else value.waste_type_name
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) or not data.strip():
+            self.fail('invalid')
+        waste_type = self.get_catalogue().get_instance(data)
+        if waste_type is not None:
+            return waste_type
+        # Created in another process since the catalogue was last checked?
+        key = data.strip().casefold()
+        if key not in self._by_name:
+            self._by_name[key] = self.get_queryset().filter(name__iexact=data.strip()).order_by('id').first()
+        if self._by_name[key] is None:
+            self.fail('does_not_exist', value=data)
+        return self._by_name[key]
+
+
+class ReportwasteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    A report. Reads may ask for a subset of the fields (see
+    ``select_fields``); the serializer then drops the others and
+    ``setup_eager_loading`` loads only the columns they need.
+    """
 
-class ReportwasteSerializer(serializers.ModelSerializer):
     user_details = serializers.SerializerMethodField(read_only=True)
-    
+    waste_type = WasteTypeField()
+
+    # ``?summary=true``: what a table of reports shows.
+    SUMMARY_FIELDS = ('id', 'waste_type', 'location', 'status', 'time_created')
+    # Columns behind the fields that are not a column of the same name.
+    FIELD_COLUMNS = {
+        'user_details': ('user',),
+        'waste_type': ('waste_type', 'legacy_waste_type'),
+    }
+    # Keyset pages are cut on these, whatever is shown.
+    ALWAYS_LOADED = ('id', 'time_created')
+
     class Meta:
         model = Reportwaste
-        fields = ['id', 'user', 'user_details', 'waste_type', 'location', 'description', 'image', 'status', 'time_created']
-        read_only_fields = ['id', 'time_created', 'user', 'user_details']
+        fields = ['id', 'user', 'user_details', 'waste_type', 'location', 'description', 'image', 'thumbnail', 'image_medium', 'status', 'time_created', 'client_key', 'latitude', 'longitude', 'ward']
+        read_only_fields = ['id', 'time_created', 'user', 'user_details', 'thumbnail', 'image_medium']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, query_params):
+        """
+        The fields a read asks for with ``?fields=a,b``, ``?summary=true``
+        (``SUMMARY_FIELDS``) and ``?omit=a,b``, in that order of precedence
+        for the starting set, or None for every field.
+        """
+        def names(param):
+            values = [name.strip() for name in query_params.get(param, '').split(',') if name.strip()]
+            unknown = sorted(set(values) - set(cls.Meta.fields))
+            if unknown:
+                raise serializers.ValidationError({param: f'Unknown field(s): {", ".join(unknown)}.'})
+            return values
+
+        fields, omit = names('fields'), names('omit')
+        if not fields and query_params.get('summary', '').lower() in ('1', 'true', 'yes'):
+            fields = cls.SUMMARY_FIELDS
+        if not fields and not omit:
+            return None
+        return [name for name in fields or cls.Meta.fields if name not in omit]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        if fields is not None:
+            queryset = queryset.only(*{
+                column
+                for name in (*cls.ALWAYS_LOADED, *fields)
+                for column in cls.FIELD_COLUMNS.get(name, (name,))
+            })
+        if fields is not None and 'user_details' not in fields:
+            return queryset
+        # Load every reporter of the page in one extra query instead of one
+        # query per row. A prefetch (rather than select_related's INNER JOIN)
+        # keeps rows whose user_id no longer points at a user in the result;
+        # for those the cached relation is simply None. Waste type names come
+        # from the catalogue (see WasteTypeField), so they need no join.
+        return queryset.prefetch_related(
+            Prefetch('user', queryset=User.objects.only('id', 'username', 'email'))
+        )
     
+    def validate(self, data):
+        if self.partial and self.instance is not None:
+            latitude = data.get('latitude', self.instance.latitude)
+            longitude = data.get('longitude', self.instance.longitude)
+        else:
+            latitude, longitude = data.get('latitude'), data.get('longitude')
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError('Provide both latitude and longitude, or neither.')
+        return data
+
     def get_user_details(self, obj):
         # Some legacy rows may have a broken/missing user relation.
         # Guard against RelatedObjectDoesNotExist so list endpoints don't 500.
@@ -17,6 +148,8 @@ class ReportwasteSerializer(serializers.ModelSerializer):
             return None
         try:
             user = obj.user
+            if user is None:
+                return None
             return {
                 'id': user.id,
                 'username': user.username,
@@ -25,3 +158,56 @@ class ReportwasteSerializer(serializers.ModelSerializer):
         except Exception:
             return None
         return None
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Reportwaste.STATUS_CHOICES)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = serializers.DictField(required=False, allow_empty=False)
+
+    def validate_ids(self, value):
+        # One id__in query; keep it under the database's parameter limit.
+        if len(value) > settings.REPORT_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(f'At most {settings.REPORT_BULK_MAX_ITEMS} ids at a time.')
+        return value
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError("Provide either 'ids' or 'filter'.")
+        return data
+
+
+class ClusterQuerySerializer(serializers.Serializer):
+    bbox = serializers.CharField()
+    zoom = serializers.IntegerField(min_value=0, max_value=22)
+    status = serializers.MultipleChoiceField(choices=Reportwaste.STATUS_CHOICES, required=False)
+    waste_type = serializers.CharField(required=False)
+
+    def validate_bbox(self, value):
+        try:
+            west, south, east, north = (float(number) for number in value.split(','))
+        except ValueError:
+            raise serializers.ValidationError('Expected west,south,east,north in degrees.')
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            raise serializers.ValidationError('Expected west,south,east,north in degrees.')
+        return west, south, east, north
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    # Ten years of days is the most a single chart may ask for.
+    MAX_DAYS = 3660
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+    interval = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    group_by = serializers.ChoiceField(choices=['waste_type', 'status', 'ward'], required=False)
+    waste_type = serializers.CharField(required=False)
+    status = serializers.ChoiceField(choices=Reportwaste.STATUS_CHOICES, required=False)
+    ward = serializers.CharField(required=False)
+
+    def validate(self, data):
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("'start' must not be after 'end'.")
+        if (data['end'] - data['start']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f'At most {self.MAX_DAYS} days can be requested at once.')
+        return data
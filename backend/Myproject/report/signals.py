@@ -0,0 +1,193 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from waste import catalogue
+from waste.models import Wastetype
+from Myproject import versions
+from . import clusters, events, imaging, rollups, stats
+from .models import ArchivedReport, Reportwaste
+from .storage import release_on_commit
+
+# Sent with ``changes``, a list of ``(before, after)`` snapshots (see
+# ``snapshot``) for every report that was created, modified or deleted.
+# ``before`` is None for new reports and ``after`` is None for deleted ones.
+reports_changed = Signal()
+
+TRACKED_FIELDS = (
+    'id', 'user_id', 'waste_type_id', 'legacy_waste_type', 'status', 'time_created', 'latitude', 'longitude',
+    'geocell', 'ward',
+)
+
+
+def snapshot(instance):
+    return snapshots([instance])[0]
+
+
+def snapshots(instances):
+    # Only read what is already loaded so deferred fields never hit the db.
+    rows = [
+        {name: instance.__dict__[name] for name in TRACKED_FIELDS if name in instance.__dict__}
+        for instance in instances
+    ]
+    # Names are read from the database rather than from cached relations,
+    # which may come from the process-local catalogue (waste.catalogue).
+    return name_waste_types(rows)
+
+
+def snapshot_values(values):
+    return {name: values[name] for name in TRACKED_FIELDS if name in values}
+
+
+def name_waste_types(rows, known=None):
+    """
+    Add ``waste_type`` to snapshot rows: the name the counters, clusters and
+    rollups are keyed by (see ``WASTE_TYPE_NAME``). ``known`` maps waste
+    type ids to names already at hand; the rest are read in one query.
+    """
+    names = dict(known or {})
+    missing = {row.get('waste_type_id') for row in rows} - names.keys() - {None}
+    if missing:
+        names.update(Wastetype.objects.filter(id__in=missing).values_list('id', 'name'))
+    for row in rows:
+        if 'waste_type_id' in row:
+            row['waste_type'] = names.get(row['waste_type_id']) if row['waste_type_id'] else row.get('legacy_waste_type')
+    return rows
+
+
+def _known_names(row):
+    return {row['waste_type_id']: row['waste_type']} if row.get('waste_type_id') else {}
+
+
+@receiver(post_save, sender=Reportwaste)
+def report_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    after = snapshot(instance)
+    loaded = getattr(instance, '_loaded_values', None)
+    instance._loaded_values = {**(loaded or {}), **after}
+    if created:
+        reports_changed.send(sender=sender, changes=[(None, after)])
+    elif loaded is not None:
+        before = {**after, **snapshot_values(loaded)}
+        name_waste_types([before], _known_names(after))
+        if before != after:
+            reports_changed.send(sender=sender, changes=[(before, after)])
+
+
+@receiver(post_save, sender=Reportwaste)
+def schedule_image_derivatives(sender, instance, created, raw=False, **kwargs):
+    if raw or 'image' not in instance.__dict__:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        loaded = instance._loaded_values = {}
+    name = instance.image.name if instance.image else None
+    previous = loaded.get('image')
+    if name and (created or name != previous):
+        imaging.schedule_derivatives(instance.pk)
+    if previous and previous != name:
+        release_on_commit([previous])
+    loaded['image'] = name
+
+
+# Archived reports are still counted (see report.archive), so deleting one,
+# e.g. with its reporter, is announced like any other deletion.
+@receiver(post_delete, sender=Reportwaste)
+@receiver(post_delete, sender=ArchivedReport)
+def report_deleted(sender, instance, **kwargs):
+    current = snapshot(instance)
+    before = {**current, **snapshot_values(getattr(instance, '_loaded_values', None) or {})}
+    name_waste_types([before], _known_names(current))
+    reports_changed.send(sender=sender, changes=[(before, None)])
+
+
+@receiver(pre_delete, sender=Reportwaste)
+@receiver(pre_delete, sender=ArchivedReport)
+def release_report_files(sender, instance, **kwargs):
+    # Derivatives are attached with a queryset update, so the instance being
+    # deleted may not know them; read the stored names from the row itself.
+    names = sender._default_manager.filter(pk=instance.pk).values_list(
+        'image', 'thumbnail', 'image_medium'
+    ).first()
+    release_on_commit(names or [])
+
+
+@receiver(reports_changed)
+def update_report_stats(sender, changes, **kwargs):
+    stats.apply_changes(changes)
+
+
+@receiver(reports_changed)
+def update_report_clusters(sender, changes, **kwargs):
+    clusters.apply_changes(changes)
+
+
+@receiver(reports_changed)
+def update_report_rollups(sender, changes, **kwargs):
+    rollups.apply_changes(changes)
+
+
+@receiver(reports_changed)
+def publish_report_events(sender, changes, **kwargs):
+    events.record(changes)
+
+
+# Version stamps for conditional GET (see Myproject.versions). Single saves also
+# announce reports_changed, so they bump twice; that is one more UPDATE of a
+# row the transaction has already locked.
+@receiver(post_save, sender=Reportwaste)
+@receiver(post_delete, sender=Reportwaste)
+def bump_report_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.bump(versions.REPORTS)
+
+
+@receiver(reports_changed)
+def bump_report_version_in_bulk(sender, changes, **kwargs):
+    versions.bump(versions.REPORTS)
+
+
+@receiver(post_save, sender='waste.Wastetype')
+@receiver(post_delete, sender='waste.Wastetype')
+def bump_wastetype_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.bump(versions.WASTETYPES)
+        # Other processes notice the new version; this one need not wait.
+        catalogue.invalidate()
+        transaction.on_commit(catalogue.invalidate)
+
+
+@receiver(pre_save, sender='waste.Wastetype')
+def remember_wastetype_name(sender, instance, raw=False, **kwargs):
+    instance._previous_name = None if raw or instance.pk is None else (
+        sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+    )
+
+
+@receiver(post_save, sender='waste.Wastetype')
+def rename_waste_type(sender, instance, created, raw=False, **kwargs):
+    # Reports point at the catalogue row, so a rename leaves them alone;
+    # only the tables keyed by name follow it.
+    previous = getattr(instance, '_previous_name', None)
+    if raw or created or previous is None or previous == instance.name:
+        return
+    for projection in (stats, clusters, rollups):
+        projection.rename_waste_type(previous, instance.name)
+
+
+@receiver(post_save, sender='user.Userprofile')
+@receiver(post_delete, sender='user.Userprofile')
+def bump_userprofile_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.bump(versions.USERPROFILES)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_version(sender, raw=False, update_fields=None, **kwargs):
+    # Every login saves last_login, which no API response shows.
+    if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    versions.bump(versions.USERS)
@@ -0,0 +1,105 @@
+"""
+Incrementally maintained report counters.
+
+Instead of running ``COUNT(*)`` per status and waste type on every page
+view, every write adjusts a handful of ``ReportStat`` rows in the same
+transaction. Reading the statistics is then a single scan of a table with
+one row per status and waste type, independent of the number of reports.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import WASTE_TYPE_NAME, ArchivedReport, Reportwaste, ReportStat
+
+TOTAL = 'total'
+DIMENSIONS = ('status', 'waste_type')
+
+
+def _keys(row):
+    yield (TOTAL, '')
+    for dimension in DIMENSIONS:
+        yield (dimension, row[dimension])
+
+
+def get_deltas(changes):
+    """
+    Turn ``(before, after)`` report snapshots into counter adjustments.
+
+    ``before`` is ``None`` for a new report and ``after`` is ``None`` for a
+    deleted one. Adjustments that cancel out are dropped.
+    """
+    deltas = Counter()
+    for before, after in changes:
+        if before is not None:
+            for key in _keys(before):
+                deltas[key] -= 1
+        if after is not None:
+            for key in _keys(after):
+                deltas[key] += 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def apply_changes(changes):
+    # Sorted so concurrent writers take row locks in the same order.
+    for (dimension, key), delta in sorted(get_deltas(changes).items()):
+        _bump(dimension, key, delta)
+
+
+def _bump(dimension, key, delta):
+    counters = ReportStat.objects.filter(dimension=dimension, key=key)
+    if counters.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ReportStat.objects.create(dimension=dimension, key=key, count=delta)
+    except IntegrityError:
+        # Another transaction created the row first.
+        counters.update(count=F('count') + delta)
+
+
+def get_stats():
+    return _fold(ReportStat.objects.values_list('dimension', 'key', 'count'))
+
+
+async def aget_stats():
+    return _fold([row async for row in ReportStat.objects.values_list('dimension', 'key', 'count')])
+
+
+def _fold(rows):
+    stats = {TOTAL: 0, **{f'by_{dimension}': {} for dimension in DIMENSIONS}}
+    for dimension, key, count in rows:
+        if dimension == TOTAL:
+            stats[TOTAL] = count
+        elif count:
+            stats[f'by_{dimension}'][key] = count
+    return stats
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every counter from the report table and the archive."""
+    counts = Counter()
+    for model in (Reportwaste, ArchivedReport):
+        counts[(TOTAL, '')] += model.objects.count()
+        for dimension in DIMENSIONS:
+            column = WASTE_TYPE_NAME if dimension == 'waste_type' else F(dimension)
+            for group in model.objects.values(key=column).annotate(n=Count('id')).order_by():
+                counts[(dimension, group['key'])] += group['n']
+    rows = [ReportStat(dimension=dimension, key=key, count=count) for (dimension, key), count in counts.items()]
+    ReportStat.objects.all().delete()
+    ReportStat.objects.bulk_create(rows)
+    return get_stats()
+
+
+def rename_waste_type(old, new):
+    """Move the counters of waste type ``old`` to ``new`` after a catalogue rename."""
+    rows = ReportStat.objects.filter(dimension='waste_type', key=old)
+    try:
+        with transaction.atomic():
+            rows.update(key=new)
+    except IntegrityError:
+        # Unmapped reports already count under the new name; merging the
+        # rows is a rebuild.
+        rebuild()
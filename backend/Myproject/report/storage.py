@@ -0,0 +1,101 @@
+"""
+Content-addressed storage for report photos.
+
+Each file is stored once, under the SHA-256 of its bytes, in a sharded
+directory layout::
+
+    reports/3f/a2/3fa2...c9.jpg
+    reports/thumbnails/91/0e/910e...44.jpg
+
+A citizen who retries a failed submit uploads the same bytes again and
+simply gets the existing name back. Because several reports can share one
+file, every save takes a reference in ``StoredFile`` and every delete
+drops one; the file is only removed when the last reference goes.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def report_storage():
+    return storages['reports']
+
+
+def release_on_commit(names):
+    """Drop one reference to each of ``names`` once the transaction commits."""
+    names = [name for name in names if name]
+    if names:
+        storage = report_storage()
+        transaction.on_commit(lambda: [storage.delete(name) for name in names])
+
+
+def is_content_addressed(name):
+    return bool(name and CONTENT_ADDRESSED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    shard_levels = 2
+    shard_width = 2
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        shards = [
+            hexdigest[level * self.shard_width:(level + 1) * self.shard_width]
+            for level in range(self.shard_levels)
+        ]
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(posixpath.dirname(name), *shards, hexdigest + extension)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if not self.exists(name):
+            name = super()._save(name, content)
+        self.retain(name)
+        return name
+
+    def delete(self, name):
+        """Drop one reference to ``name`` and remove the file with the last one."""
+        if name and self.release(name):
+            super().delete(name)
+
+    def retain(self, name, count=1):
+        from .models import StoredFile
+
+        files = StoredFile.objects.filter(name=name)
+        if files.update(references=F('references') + count):
+            return
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, references=count)
+        except IntegrityError:
+            files.update(references=F('references') + count)
+
+    def release(self, name):
+        """
+        Drop one reference and return True if nothing references ``name`` now.
+
+        Names that were never saved through this storage (files from before
+        it was introduced) are left alone.
+        """
+        from .models import StoredFile
+
+        files = StoredFile.objects.filter(name=name)
+        with transaction.atomic():
+            # The UPDATE locks the row until the end of the transaction, so
+            # a concurrent retain() cannot slip in between.
+            if not files.update(references=F('references') - 1):
+                return False
+            if files.filter(references__gt=0).exists():
+                return False
+            files.delete()
+            return True
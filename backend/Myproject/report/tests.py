@@ -1,3 +1,1501 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import warnings
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipIf
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.http import QueryDict
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from Myproject import instrumentation, metrics, middleware
+from Myproject.renderers import FastJSONRenderer
+from user.models import Userprofile
+from waste import catalogue
+from waste.models import Wastetype
+from . import events, export, geo, rollups, stats
+from .management.commands import migrate_report_media
+from .models import ArchivedReport, Reportwaste, ReportCluster, ReportDailyRollup, ReportEvent, ReportStat, StoredFile
+from .filters import ReportwasteFilter
+from .serializers import ReportwasteSerializer
+from .storage import is_content_addressed
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReportAPITestCase(TestCase):
+    list_url = '/api/report/report/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user('citizen', 'citizen@example.com', 'pass')
+        Userprofile.objects.create(user=cls.citizen, role='citizen')
+        cls.officer = User.objects.create_user('officer', 'officer@example.com', 'pass')
+        Userprofile.objects.create(user=cls.officer, role='officer')
+        cls.waste_types = {
+            name: Wastetype.objects.create(name=name, description=name)
+            for name in ('Plastic', 'Glass', 'Metal', 'Organic')
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+        # Version numbers restart with every test's rolled back database.
+        caches['api'].clear()
+        catalogue.invalidate()
+        # Fresh instances, so no test relies on a profile cached at creation.
+        self.citizen = User.objects.get(pk=self.citizen.pk)
+        self.officer = User.objects.get(pk=self.officer.pk)
+
+    def create_reports(self, count, user=None, **fields):
+        fields['waste_type'] = self.waste_types[fields.get('waste_type', 'Plastic')]
+        fields.setdefault('location', 'Main street')
+        fields.setdefault('description', 'Overflowing bin')
+        return [
+            Reportwaste.objects.create(user=user or self.citizen, **fields)
+            for _ in range(count)
+        ]
+
+
+class ReportPaginationTests(ReportAPITestCase):
+    def test_pages_cover_every_report_once_in_order(self):
+        reports = self.create_reports(7)
+        # Identical timestamps force the id tie-breaker to do its job.
+        Reportwaste.objects.filter(id__in=[r.id for r in reports[2:5]]).update(
+            time_created=timezone.now()
+        )
+        expected = list(
+            Reportwaste.objects.order_by('-time_created', '-id').values_list('id', flat=True)
+        )
+        self.client.force_authenticate(self.officer)
+
+        seen, url = [], f'{self.list_url}?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_the_preceding_page(self):
+        self.create_reports(5)
+        self.client.force_authenticate(self.officer)
+        first = self.client.get(f'{self.list_url}?page_size=2').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(
+            [item['id'] for item in back['results']],
+            [item['id'] for item in first['results']],
+        )
+
+    def test_invalid_cursor_is_rejected(self):
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(f'{self.list_url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(REPORT_MAX_PAGE_SIZE=2)
+    def test_page_size_is_capped(self):
+        self.create_reports(3)
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(f'{self.list_url}?page_size=100')
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class ReportQueryCountTests(ReportAPITestCase):
+    # profile lookup + version stamps + report page + one batched reporter lookup;
+    # waste type names come from the catalogue, checked against the stamps.
+    expected_queries = 4
+
+    def setUp(self):
+        super().setUp()
+        catalogue.get_catalogue()
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        self.create_reports(5)
+        self.create_reports(5, user=other)
+        self.client.force_authenticate(self.officer)
+        with self.assertNumQueries(self.expected_queries):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(
+            {item['user_details']['username'] for item in response.data['results']},
+            {'citizen', 'other'},
+        )
+
+    def test_detail_query_count(self):
+        report = self.create_reports(1)[0]
+        self.client.force_authenticate(self.officer)
+        with self.assertNumQueries(self.expected_queries):
+            response = self.client.get(f'{self.list_url}{report.id}/')
+        self.assertEqual(response.data['user_details']['username'], 'citizen')
+
+    def test_broken_user_reference_is_still_listed(self):
+        broken, intact = self.create_reports(2)
+        # FK checks are deferred until commit, which never happens in a TestCase.
+        Reportwaste.objects.filter(id=broken.id).update(user_id=987654)
+        self.addCleanup(
+            Reportwaste.objects.filter(id=broken.id).update, user_id=self.citizen.id
+        )
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(self.list_url)
+        details = {item['id']: item['user_details'] for item in response.data['results']}
+        self.assertIsNone(details[broken.id])
+        self.assertEqual(details[intact.id]['username'], 'citizen')
+
+
+class ReportSparseFieldsTests(ReportAPITestCase):
+    def setUp(self):
+        super().setUp()
+        catalogue.get_catalogue()
+        self.client.force_authenticate(self.officer)
+
+    def test_fields_picks_fields_and_loads_only_their_columns(self):
+        self.create_reports(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{self.list_url}?fields=id,status,waste_type&page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status', 'waste_type'})
+        self.assertEqual(response.data['results'][0]['waste_type'], 'Plastic')
+        # profile + version stamps + page; no reporters
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('"description"', queries[-1]['sql'])
+        following = self.client.get(response.data['next'])
+        self.assertEqual(len(following.data['results']), 1)
+
+    def test_summary_and_omit(self):
+        report = self.create_reports(1)[0]
+        summary = self.client.get(f'{self.list_url}?summary=true').data['results'][0]
+        self.assertEqual(list(summary), list(ReportwasteSerializer.SUMMARY_FIELDS))
+        omitted = self.client.get(f'{self.list_url}{report.id}/?omit=description,user_details').data
+        self.assertNotIn('description', omitted)
+        self.assertNotIn('user_details', omitted)
+        self.assertEqual(omitted['location'], 'Main street')
+        narrowed = self.client.get(f'{self.list_url}?summary=1&omit=location').data['results'][0]
+        self.assertEqual(set(narrowed), set(ReportwasteSerializer.SUMMARY_FIELDS) - {'location'})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(f'{self.list_url}?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', str(response.data['fields']))
+
+    def test_writes_answer_with_every_field(self):
+        report = self.create_reports(1)[0]
+        response = self.client.patch(f'{self.list_url}{report.id}/?fields=id', {'status': 'resolved'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'resolved')
+        self.assertIn('description', response.data)
+
+
+class ReportFilterTests(ReportAPITestCase):
+    def result_ids(self, query):
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(f'{self.list_url}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def test_filter_by_status_and_waste_type(self):
+        pending = self.create_reports(2, waste_type='Glass')
+        self.create_reports(1, waste_type='Glass', status='resolved')
+        self.create_reports(1, waste_type='Plastic')
+        self.assertEqual(
+            self.result_ids('status=pending&waste_type=Glass'), {r.id for r in pending}
+        )
+
+    def test_filter_by_time_range_and_reporter(self):
+        old, recent = self.create_reports(2)
+        Reportwaste.objects.filter(id=old.id).update(
+            time_created=timezone.now() - timezone.timedelta(days=30)
+        )
+        other = self.create_reports(1, user=self.officer)[0]
+        since = (timezone.now() - timezone.timedelta(days=1)).isoformat()
+        self.assertEqual(
+            self.result_ids(f'user={self.citizen.id}&time_created_after={since.replace("+", "%2B")}'),
+            {recent.id},
+        )
+        self.assertEqual(self.result_ids(f'user={self.officer.id}'), {other.id})
+
+    def test_status_filter_does_not_select_distinct(self):
+        filterset = ReportwasteFilter(QueryDict('status=pending&status=resolved'), queryset=Reportwaste.objects.all())
+        self.assertFalse(filterset.qs.query.distinct)
+
+
+class ReportStatsTests(ReportAPITestCase):
+    stats_url = '/api/report/stats/'
+
+    def get_stats(self):
+        self.client.force_authenticate(self.citizen)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counters_follow_create_status_change_and_delete(self):
+        glass, plastic, _ = self.create_reports(1, waste_type='Glass') + self.create_reports(2)
+        glass.status = 'resolved'
+        glass.save()
+        plastic.delete()
+        self.assertEqual(self.get_stats(), {
+            'total': 2,
+            'by_status': {'pending': 1, 'resolved': 1},
+            'by_waste_type': {'Glass': 1, 'Plastic': 1},
+        })
+
+    def test_status_change_through_the_api_moves_the_counter(self):
+        report = self.create_reports(1)[0]
+        self.client.force_authenticate(self.officer)
+        response = self.client.patch(
+            f'{self.list_url}{report.id}/', {'status': 'in_progress'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_stats()['by_status'], {'in_progress': 1})
+
+    def test_rebuild_command_repairs_drift(self):
+        self.create_reports(3)
+        ReportStat.objects.filter(dimension='total').update(count=42)
+        call_command('rebuild_report_stats', stdout=StringIO())
+        self.assertEqual(self.get_stats()['total'], 3)
+
+
+class ReportRollupTests(ReportAPITestCase):
+    analytics_url = '/api/report/analytics/'
+
+    def create_on(self, day, count=1, **fields):
+        reports = self.create_reports(count, **fields)
+        for report in reports:
+            report.time_created = timezone.make_aware(timezone.datetime.combine(day, timezone.datetime.min.time()))
+            report.save()
+        return reports
+
+    def get(self, url, params):
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_rollups_follow_every_kind_of_write(self):
+        glass, plastic, _ = self.create_reports(1, waste_type='Glass', ward='Kariakoo') + self.create_reports(2)
+        glass.status = 'resolved'
+        glass.save()
+        Reportwaste.objects.filter(pk=plastic.pk).set_status('in_progress')
+        plastic = Reportwaste.objects.get(pk=plastic.pk)
+        plastic.ward = 'Upanga'
+        plastic.save()
+        self.create_reports(1)[0].delete()
+        self.assertEqual(rollups.verify(), [])
+        self.assertEqual(ReportDailyRollup.objects.filter(count__gt=0).count(), 3)
+
+    def test_weekly_series_grouped_by_status(self):
+        monday = timezone.datetime(2025, 3, 3).date()
+        self.create_on(monday, 2)
+        self.create_on(monday + timezone.timedelta(days=6), 1, status='resolved')
+        self.create_on(monday + timezone.timedelta(days=14), 1)
+        self.client.force_authenticate(self.officer)
+        # The officer's profile, then one GROUP BY over the rollups.
+        with self.assertNumQueries(2):
+            data = self.client.get(self.analytics_url, {
+                'start': '2025-03-03', 'end': '2025-03-20', 'interval': 'week', 'group_by': 'status',
+            }).data
+        self.assertEqual(data['series'], [
+            {'period': monday, 'total': 3, 'counts': {'pending': 2, 'resolved': 1}},
+            {'period': monday + timezone.timedelta(days=7), 'total': 0, 'counts': {}},
+            {'period': monday + timezone.timedelta(days=14), 'total': 1, 'counts': {'pending': 1}},
+        ])
+        monthly = self.get(self.analytics_url, {'start': '2025-02-01', 'end': '2025-03-31', 'interval': 'month', 'status': 'pending'})
+        self.assertEqual([entry['total'] for entry in monthly['series']], [0, 3])
+
+    def test_ward_resolution_rates(self):
+        day = timezone.datetime(2025, 5, 1).date()
+        self.create_on(day, 3, ward='Upanga')
+        self.create_on(day, 1, ward='Upanga', status='resolved')
+        self.create_on(day, 2, ward='Kariakoo', status='resolved')
+        self.create_on(day, 1)
+        wards = self.get('/api/report/analytics/wards/', {'start': '2025-05-01', 'end': '2025-05-01'})
+        self.assertEqual(wards, [
+            {'ward': None, 'total': 1, 'resolved': 0, 'resolution_rate': 0.0},
+            {'ward': 'Kariakoo', 'total': 2, 'resolved': 2, 'resolution_rate': 1.0},
+            {'ward': 'Upanga', 'total': 4, 'resolved': 1, 'resolution_rate': 0.25},
+        ])
+
+    def test_invalid_ranges_and_citizens_are_refused(self):
+        self.client.force_authenticate(self.officer)
+        self.assertEqual(self.client.get(self.analytics_url, {'start': '2025-02-01', 'end': '2025-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.analytics_url, {'start': '2000-01-01', 'end': '2025-01-01'}).status_code, 400)
+        self.client.force_authenticate(self.citizen)
+        self.assertEqual(self.client.get(self.analytics_url, {'start': '2025-01-01', 'end': '2025-01-02'}).status_code, 403)
+
+    def test_command_checks_and_rebuilds(self):
+        self.create_reports(3)
+        call_command('rebuild_report_rollups', '--check', stdout=StringIO())
+        ReportDailyRollup.objects.update(count=42)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_report_rollups', '--check', stdout=StringIO())
+        output = StringIO()
+        call_command('rebuild_report_rollups', stdout=output)
+        self.assertIn('1 rollups had drifted', output.getvalue())
+        self.assertEqual(rollups.verify(), [])
+
+
+class TemporaryMediaMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def photo(self, color='green', name='bin.jpg'):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        buffer = BytesIO()
+        Image.new('RGB', (800, 600), color).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(REPORT_IMAGE_WORKERS=0, REPORT_THUMBNAIL_SIZE=64, REPORT_MEDIUM_SIZE=128)
+class ReportImageDerivativeTests(TemporaryMediaMixin, ReportAPITestCase):
+    def test_upload_builds_small_exif_free_derivatives_after_commit(self):
+        self.client.force_authenticate(self.citizen)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.list_url, {
+                'waste_type': 'Plastic', 'location': 'Market', 'description': 'Bags',
+                'image': self.photo(),
+            }, format='multipart')
+            self.assertEqual(response.status_code, 201)
+            self.assertIsNone(response.data['thumbnail'])
+
+        report = Reportwaste.objects.get(pk=response.data['id'])
+        for field, size in (('thumbnail', 64), ('image_medium', 128)):
+            with getattr(report, field).open('rb') as stored, Image.open(stored) as image:
+                self.assertEqual(max(image.size), size)
+                self.assertFalse(image.getexif())
+
+        detail = self.client.get(f'{self.list_url}{report.id}/').data
+        self.assertTrue(detail['thumbnail'].endswith(report.thumbnail.url))
+
+    def test_build_command_covers_archived_reports(self):
+        image = ArchivedReport._meta.get_field('image')
+        name = image.storage.save('reports/old.jpg', self.photo())
+        ArchivedReport.objects.create(
+            id=900001, user=self.citizen, waste_type=self.waste_types['Plastic'], location='Depot',
+            status='resolved', time_created=timezone.now(), image=name,
+        )
+        out = StringIO()
+        call_command('build_report_images', stdout=out)
+        archived = ArchivedReport.objects.get(pk=900001)
+        with archived.thumbnail.open('rb') as stored, Image.open(stored) as thumbnail:
+            self.assertEqual(max(thumbnail.size), 64)
+        self.assertIn('Processed archived reports up to id 900001', out.getvalue())
+
+
+@override_settings(REPORT_IMAGE_WORKERS=0)
+class ContentAddressedStorageTests(TemporaryMediaMixin, ReportAPITestCase):
+    def test_identical_uploads_share_one_file_until_the_last_delete(self):
+        first, second = self.create_reports(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            for report in (first, second):
+                report.image = self.photo()
+                report.save()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^reports/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        storage = first.image.storage
+        name = first.image.name
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_migrate_command_moves_legacy_files(self):
+        legacy = FileSystemStorage()
+        old_names = [legacy.save('reports/a.jpg', self.photo()), legacy.save('reports/b.jpg', self.photo())]
+        reports = self.create_reports(3)
+        for report, name in zip(reports, old_names + old_names[:1]):
+            Reportwaste.objects.filter(pk=report.pk).update(image=name)
+
+        call_command('migrate_report_media', '--batch-size=2', '--delete-originals', stdout=StringIO())
+
+        names = set(Reportwaste.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(StoredFile.objects.get(name=names.pop()).references, 3)
+        self.assertFalse(any(legacy.exists(name) for name in old_names))
+
+    def archived(self, report_id, image):
+        return ArchivedReport.objects.create(
+            id=report_id, user=self.citizen, waste_type=self.waste_types['Plastic'], location='Depot',
+            status='resolved', time_created=timezone.now(), image=image,
+        )
+
+    def test_archived_reports_are_migrated_and_keep_their_files(self):
+        legacy = FileSystemStorage()
+        shared = legacy.save('reports/shared.jpg', self.photo())
+        archived_only = legacy.save('reports/archived.jpg', self.photo(color='blue'))
+        live = self.create_reports(1)[0]
+        Reportwaste.objects.filter(pk=live.pk).update(image=shared)
+        self.archived(900001, archived_only)
+        self.archived(900002, shared)
+
+        call_command('migrate_report_media', '--delete-originals', stdout=StringIO())
+
+        archived_names = set(ArchivedReport.objects.values_list('image', flat=True))
+        self.assertEqual(len(archived_names), 2)
+        self.assertTrue(all(is_content_addressed(name) for name in archived_names))
+        new_shared = Reportwaste.objects.get(pk=live.pk).image.name
+        self.assertIn(new_shared, archived_names)
+        self.assertEqual(StoredFile.objects.get(name=new_shared).references, 2)
+        self.assertFalse(legacy.exists(shared) or legacy.exists(archived_only))
+
+    def test_delete_originals_keeps_files_still_referenced(self):
+        legacy = FileSystemStorage()
+        name = legacy.save('reports/c.jpg', self.photo())
+        report = self.create_reports(1)[0]
+        Reportwaste.objects.filter(pk=report.pk).update(image=name)
+        command = migrate_report_media.Command(stdout=StringIO(), stderr=StringIO())
+        # A report written with the old name while the command runs.
+        original_migrate = command.migrate
+
+        def migrate(model, *args):
+            rows = original_migrate(model, *args)
+            if model is ArchivedReport:
+                self.archived(900003, name)
+            return rows
+        command.migrate = migrate
+        call_command(command, '--delete-originals')
+        self.assertTrue(legacy.exists(name))
+
+
+class ReportBulkIngestTests(ReportAPITestCase):
+    bulk_url = '/api/report/report/bulk/'
+
+    def batch(self, count, prefix='truck-7'):
+        return [
+            {'waste_type': 'Organic', 'location': f'Stop {i}', 'description': 'Full bin',
+             'client_key': f'{prefix}-{i}'}
+            for i in range(count)
+        ]
+
+    def post(self, items):
+        self.client.force_authenticate(self.citizen)
+        return self.client.post(self.bulk_url, items, format='json')
+
+    def test_batch_is_created_with_per_item_errors(self):
+        items = self.batch(3)
+        items.insert(1, {'waste_type': 'Organic'})
+        response = self.post(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['invalid']), (3, 1))
+        self.assertEqual(response.data['results'][1]['status'], 'invalid')
+        self.assertIn('location', response.data['results'][1]['errors'])
+        self.assertEqual(Reportwaste.objects.filter(user=self.citizen).count(), 3)
+        self.assertEqual(stats.get_stats()['by_waste_type'], {'Organic': 3})
+
+    def test_replayed_batch_is_a_no_op(self):
+        first = self.post(self.batch(4)).data
+        replay = self.post(self.batch(4))
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay.data['duplicates'], 4)
+        self.assertEqual(
+            [item['id'] for item in replay.data['results']],
+            [item['id'] for item in first['results']],
+        )
+        self.assertEqual(Reportwaste.objects.count(), 4)
+        self.assertEqual(stats.get_stats()['total'], 4)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        self.post(self.batch(1, prefix='warm-up'))  # creates the counter rows
+        with CaptureQueriesContext(connection) as small:
+            self.post(self.batch(2, prefix='a'))
+        with CaptureQueriesContext(connection) as large:
+            self.post(self.batch(40, prefix='b'))
+        self.assertEqual(len(small), len(large))
+
+    def test_single_create_with_known_client_key_returns_the_original(self):
+        report = self.create_reports(1, client_key='kiosk-1')[0]
+        self.client.force_authenticate(self.citizen)
+        response = self.client.post(self.list_url, {
+            'waste_type': 'Plastic', 'location': 'Main street', 'description': 'Again',
+            'client_key': 'kiosk-1',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], report.id)
+
+
+class ReportBulkStatusTests(ReportAPITestCase):
+    bulk_status_url = '/api/report/report/bulk-status/'
+
+    def post(self, payload, user=None):
+        self.client.force_authenticate(user or self.officer)
+        return self.client.post(self.bulk_status_url, payload, format='json')
+
+    def test_officer_updates_reports_by_id(self):
+        reports = self.create_reports(4)
+        already_done = self.create_reports(1, status='resolved')[0]
+        ids = [r.id for r in reports[:3]] + [already_done.id]
+        response = self.post({'ids': ids, 'status': 'resolved'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Reportwaste.objects.filter(status='resolved').count(), 4)
+        self.assertEqual(stats.get_stats()['by_status'], {'pending': 1, 'resolved': 4})
+
+    def test_update_by_filter(self):
+        self.create_reports(2, waste_type='Glass')
+        self.create_reports(3, waste_type='Metal')
+        response = self.post({'filter': {'waste_type': 'Metal'}, 'status': 'in_progress'})
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(
+            set(Reportwaste.objects.filter(status='in_progress').values_list('waste_type__name', flat=True)),
+            {'Metal'},
+        )
+
+    def test_filter_values_may_be_scalars_or_lists(self):
+        self.create_reports(2)
+        self.create_reports(1, status='resolved')
+        response = self.post({'filter': {'status': 'pending'}, 'status': 'in_progress'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        response = self.post({'filter': {'status': ['in_progress', 'resolved'], 'user': self.citizen.id}, 'status': 'pending'})
+        self.assertEqual(response.data['updated'], 3)
+
+    def test_status_filter_locks_without_distinct(self):
+        self.create_reports(2)
+        reports = ReportwasteFilter.from_dict({'status': ['pending', 'in_progress']}, Reportwaste.objects.all()).qs
+        self.assertFalse(reports.query.distinct)
+        # A DISTINCT queryset is locked by id; PostgreSQL refuses SELECT DISTINCT ... FOR UPDATE.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Reportwaste.objects.distinct().set_status('resolved'), 2)
+        self.assertFalse(any(query['sql'].startswith('SELECT DISTINCT') for query in queries))
+
+    @override_settings(REPORT_BULK_MAX_ITEMS=3)
+    def test_too_many_ids_are_refused(self):
+        reports = self.create_reports(4)
+        response = self.post({'ids': [r.id for r in reports], 'status': 'resolved'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', response.data)
+        self.assertEqual(self.post({'ids': [r.id for r in reports[:3]], 'status': 'resolved'}).data['updated'], 3)
+
+    def test_unknown_or_empty_filters_are_refused(self):
+        self.create_reports(3)
+        for payload in ({'q': 'x'}, {'stauts': 'pending'}, {'status': []}, {'radius': 500}):
+            response = self.post({'filter': payload, 'status': 'in_progress'})
+            self.assertEqual(response.status_code, 400, payload)
+        self.assertIn('q', self.post({'filter': {'q': 'x'}, 'status': 'resolved'}).data['filter'])
+        self.assertEqual(Reportwaste.objects.filter(status='pending').count(), 3)
+
+    def test_query_count_does_not_depend_on_the_number_of_reports(self):
+        self.create_reports(1, status='resolved')  # creates the counter rows
+        few, many = self.create_reports(2), self.create_reports(60)
+        counts = []
+        for reports in (few, many):
+            officer = User.objects.get(pk=self.officer.pk)
+            with CaptureQueriesContext(connection) as queries:
+                self.post({'ids': [r.id for r in reports], 'status': 'resolved'}, user=officer)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_citizens_are_refused(self):
+        report = self.create_reports(1)[0]
+        response = self.post({'ids': [report.id], 'status': 'resolved'}, user=self.citizen)
+        self.assertEqual(response.status_code, 403)
+        report.refresh_from_db()
+        self.assertEqual(report.status, 'pending')
+
+    def test_ids_and_filter_are_exclusive(self):
+        response = self.post({'ids': [1], 'filter': {'status': 'pending'}, 'status': 'resolved'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReportExportTests(ReportAPITestCase):
+    export_url = '/api/report/report/export/'
+
+    def test_csv_export_streams_filtered_rows(self):
+        glass = self.create_reports(2, waste_type='Glass')
+        self.create_reports(1, waste_type='Metal')
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(f'{self.export_url}?waste_type=Glass')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'user', 'username'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [r.id for r in glass])
+
+    def test_ndjson_export_is_scoped_to_the_citizen(self):
+        own = self.create_reports(1)[0]
+        self.create_reports(1, user=self.officer)
+        self.client.force_authenticate(self.citizen)
+        response = self.client.get(f'{self.export_url}?output=ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [own.id])
+
+    def test_csv_keeps_orphaned_reports_and_defuses_formulas(self):
+        orphan, formula = self.create_reports(2)
+        Reportwaste.objects.filter(id=formula.id).update(location='=HYPERLINK("http://x")', description='-2+3')
+        # FK checks are deferred until commit, which never happens in a TestCase.
+        Reportwaste.objects.filter(id=orphan.id).update(user_id=987654)
+        self.addCleanup(Reportwaste.objects.filter(id=orphan.id).update, user_id=self.citizen.id)
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(self.export_url)
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        by_id = {int(row['id']): row for row in rows}
+        self.assertEqual(by_id[orphan.id]['username'], '')
+        self.assertEqual(by_id[formula.id]['username'], 'citizen')
+        self.assertEqual(by_id[formula.id]['location'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(by_id[formula.id]['description'], "'-2+3")
+        ndjson = self.client.get(f'{self.export_url}?output=ndjson')
+        lines = [json.loads(line) for line in b''.join(ndjson.streaming_content).decode().splitlines()]
+        self.assertEqual({line['id']: line['description'] for line in lines}[formula.id], '-2+3')
+
+    def test_unknown_output_is_rejected(self):
+        self.client.force_authenticate(self.officer)
+        self.assertEqual(self.client.get(f'{self.export_url}?output=xml').status_code, 400)
+
+    async def test_asgi_export_streams_in_batches(self):
+        reports = await sync_to_async(self.create_reports)(5)
+        token = await sync_to_async(RefreshToken.for_user)(self.officer)
+        with warnings.catch_warnings(record=True) as caught, patch.object(export, 'CHUNK_SIZE', 2):
+            warnings.simplefilter('always')
+            response = await self.async_client.get(
+                f'{self.export_url}?output=ndjson', headers={'Authorization': f'Bearer {token.access_token}'}
+            )
+            self.assertTrue(response.streaming)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([w for w in caught if 'synchronous iterators' in str(w.message)], [])
+        self.assertEqual(len(chunks), 3)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [r.id for r in reports])
+
+    def test_export_command_applies_filters(self):
+        self.create_reports(2)
+        resolved = self.create_reports(1, status='resolved')[0]
+        out = StringIO()
+        call_command('export_reports', '--output=ndjson', '--status=resolved', stdout=out)
+        self.assertEqual(
+            [json.loads(line)['id'] for line in out.getvalue().splitlines()], [resolved.id]
+        )
+
+
+class ReportSearchTests(ReportAPITestCase):
+    def search(self, query, **params):
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(self.list_url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_matches_location_and_description_ranked(self):
+        both = self.create_reports(1, location='Uhuru street', description='Bins on Uhuru street overflow')[0]
+        location_only = self.create_reports(1, location='Uhuru street', description='Broken glass')[0]
+        self.create_reports(1, location='Market road', description='Plastic bags')
+        results = self.search('uhuru')['results']
+        self.assertEqual([item['id'] for item in results], [both.id, location_only.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        report = self.create_reports(1, description='Old tyres')[0]
+        report.description = 'Dumped mattress'
+        report.save()
+        self.assertEqual(self.search('tyres')['results'], [])
+        self.assertEqual(len(self.search('mattress')['results']), 1)
+        report.delete()
+        self.assertEqual(self.search('mattress')['results'], [])
+
+    def test_search_results_are_paginated(self):
+        self.create_reports(5, description='Leaking oil drum')
+        seen, data = [], self.search('oil', page_size=2)
+        while True:
+            seen.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                break
+            data = self.client.get(data['next']).data
+        self.assertEqual(sorted(seen), sorted(Reportwaste.objects.values_list('id', flat=True)))
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.create_reports(1, description='Sewage near "school" gate')
+        self.assertEqual(len(self.search('school" (gate*')['results']), 1)
+
+
+class ReportGeoTests(ReportAPITestCase):
+    # Around the Kariakoo market, Dar es Salaam.
+    lat, lng = -6.8161, 39.2804
+
+    def result_ids(self, **params):
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(self.list_url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return {item['id'] for item in response.data['results']}
+
+    def report_at(self, latitude, longitude):
+        return self.create_reports(1, latitude=latitude, longitude=longitude)[0]
+
+    def test_geohash_matches_the_reference_encoding(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        report = self.report_at(57.64911, 10.40744)
+        self.assertEqual(report.geocell, 'u4pruydqq')
+
+    def test_radius_query_uses_only_nearby_cells(self):
+        close = self.report_at(self.lat + 0.001, self.lng)  # ~110 m north
+        edge = self.report_at(self.lat, self.lng + 0.0027)  # ~300 m east
+        far = self.report_at(self.lat + 0.05, self.lng)
+        self.create_reports(1)  # no coordinates
+        self.assertEqual(self.result_ids(near=f'{self.lat},{self.lng}'), {close.id})
+        self.assertEqual(self.result_ids(near=f'{self.lat},{self.lng}', radius=400), {close.id, edge.id})
+        self.assertNotIn(far.id, self.result_ids(near=f'{self.lat},{self.lng}', radius=5000))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.result_ids(near=f'{self.lat},{self.lng}', radius=250)
+        page_query = next(q['sql'] for q in queries if 'report_reportwaste' in q['sql'])
+        self.assertIn('"geocell" >=', page_query)
+
+    def test_bounding_box_including_the_antimeridian(self):
+        inside = self.report_at(self.lat, self.lng)
+        self.report_at(self.lat, self.lng + 1)
+        fiji = self.report_at(-17.7, 179.5)
+        samoa = self.report_at(-13.8, -171.8)
+        self.assertEqual(self.result_ids(bbox=f'{self.lng - 0.1},{self.lat - 0.1},{self.lng + 0.1},{self.lat + 0.1}'), {inside.id})
+        self.assertEqual(self.result_ids(bbox='179,-20,-170,-10'), {fiji.id, samoa.id})
+
+    def test_invalid_geo_parameters_are_rejected(self):
+        self.client.force_authenticate(self.officer)
+        for params in ({'bbox': '1,2,3'}, {'bbox': '0,10,1,5'}, {'near': '95,0'}, {'near': '0,0', 'radius': 10 ** 7}):
+            self.assertEqual(self.client.get(self.list_url, params).status_code, 400, params)
+
+    def test_coordinates_come_in_pairs(self):
+        self.client.force_authenticate(self.citizen)
+        response = self.client.post(self.list_url, {
+            'waste_type': 'Plastic', 'location': 'Kariakoo', 'description': 'Bags', 'latitude': self.lat,
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_backfill_command(self):
+        typed = self.create_reports(1, location='-6.8161, 39.2804')[0]
+        stale = self.report_at(self.lat, self.lng)
+        Reportwaste.objects.filter(id=stale.id).update(geocell=None)
+        call_command('backfill_report_geocells', '--parse-location', stdout=StringIO())
+        typed.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual((typed.latitude, typed.longitude), (self.lat, self.lng))
+        self.assertEqual(typed.geocell, geo.encode(self.lat, self.lng))
+        self.assertEqual(stale.geocell, typed.geocell)
+
+
+class ReportClusterTests(ReportAPITestCase):
+    clusters_url = '/api/report/clusters/'
+    lat, lng = -6.8161, 39.2804
+
+    def cluster_rows(self):
+        return set(ReportCluster.objects.filter(count__gt=0).values_list(
+            'precision', 'cell', 'status', 'waste_type', 'count'
+        ))
+
+    def get_clusters(self, user=None, **params):
+        self.client.force_authenticate(user or self.officer)
+        response = self.client.get(self.clusters_url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_clusters_follow_every_kind_of_write(self):
+        first, second = self.create_reports(2, latitude=self.lat, longitude=self.lng)
+        self.create_reports(1)  # no coordinates, not on the map
+        first.latitude += 0.01
+        first.save()
+        Reportwaste.objects.filter(pk=second.pk).set_status('resolved')
+        self.client.force_authenticate(self.citizen)
+        self.client.post('/api/report/report/bulk/', {'reports': [
+            {'waste_type': 'Glass', 'location': 'Kariakoo', 'description': 'Bottles',
+             'latitude': self.lat, 'longitude': self.lng},
+        ]}, format='json')
+        Reportwaste.objects.filter(waste_type__name='Glass').get().delete()
+
+        incremental = self.cluster_rows()
+        self.assertIn((7, second.geocell[:7], 'resolved', 'Plastic', 1), incremental)
+        call_command('rebuild_report_clusters', stdout=StringIO())
+        self.assertEqual(self.cluster_rows(), incremental)
+
+    def test_viewport_counts_by_status_and_type(self):
+        self.create_reports(3, latitude=self.lat, longitude=self.lng)
+        self.create_reports(1, latitude=self.lat, longitude=self.lng, status='resolved', waste_type='Glass')
+        self.create_reports(1, latitude=self.lat + 0.3, longitude=self.lng)  # outside the viewport
+        bbox = f'{self.lng - 0.01},{self.lat - 0.01},{self.lng + 0.01},{self.lat + 0.01}'
+
+        data = self.get_clusters(bbox=bbox, zoom=15)
+        self.assertEqual(data['precision'], 7)
+        self.assertEqual(len(data['clusters']), 1)
+        cluster = data['clusters'][0]
+        self.assertEqual(cluster['count'], 4)
+        self.assertEqual(cluster['by_status'], {'pending': 3, 'resolved': 1})
+        self.assertEqual(cluster['by_waste_type'], {'Plastic': 3, 'Glass': 1})
+        self.assertAlmostEqual(cluster['latitude'], self.lat)
+
+        resolved = self.get_clusters(bbox=bbox, zoom=15, status='resolved')['clusters']
+        self.assertEqual([c['count'] for c in resolved], [1])
+
+    def test_response_size_depends_on_the_viewport(self):
+        self.create_reports(1, latitude=self.lat, longitude=self.lng)
+        self.create_reports(1, latitude=-17.7, longitude=179.5)
+        # The profile, for the scope, and the clusters.
+        with self.assertNumQueries(2):
+            data = self.get_clusters(bbox='-180,-90,180,90', zoom=22)
+        # The whole world at street zoom would be billions of cells.
+        self.assertEqual(data['precision'], 2)
+        self.assertEqual(sum(c['count'] for c in data['clusters']), 2)
+
+    def test_small_viewport_at_low_zoom(self):
+        self.create_reports(1, latitude=self.lat, longitude=self.lng)
+        bbox = f'{self.lng - 0.01},{self.lat - 0.01},{self.lng + 0.01},{self.lat + 0.01}'
+        for zoom in range(0, 16):
+            for user in (self.officer, self.citizen):
+                clusters = self.get_clusters(user, bbox=bbox, zoom=zoom)['clusters']
+                self.assertEqual([c['count'] for c in clusters], [1], (zoom, user.username))
+
+    def test_citizens_only_get_cell_centres(self):
+        report = self.create_reports(1, user=self.officer, latitude=self.lat, longitude=self.lng)[0]
+        bbox = f'{self.lng - 0.01},{self.lat - 0.01},{self.lng + 0.01},{self.lat + 0.01}'
+        exact = self.get_clusters(bbox=bbox, zoom=15)['clusters'][0]
+        self.assertEqual((exact['latitude'], exact['longitude']), (self.lat, self.lng))
+
+        cluster = self.get_clusters(self.citizen, bbox=bbox, zoom=15)['clusters'][0]
+        south, west, north, east = geo.cell_bounds(report.geocell[:7])
+        self.assertEqual(
+            (cluster['latitude'], cluster['longitude']),
+            (round((south + north) / 2, 6), round((west + east) / 2, 6)),
+        )
+        # A viewport that touches the cell but not the report still shows it.
+        beside = f'{self.lng + 0.00001},{self.lat + 0.00001},{self.lng + 0.01},{self.lat + 0.01}'
+        self.assertEqual(self.get_clusters(self.citizen, bbox=beside, zoom=15)['clusters'], [cluster])
+
+    def test_invalid_query_is_rejected(self):
+        self.client.force_authenticate(self.citizen)
+        for params in ({'zoom': 3}, {'bbox': '1,2,3', 'zoom': 3}, {'bbox': '0,0,1,1', 'zoom': 40}):
+            self.assertEqual(self.client.get(self.clusters_url, params).status_code, 400, params)
+
+
+class ReportConditionalGetTests(ReportAPITestCase):
+    def get(self, user, **headers):
+        self.client.force_authenticate(user)
+        return self.client.get(self.list_url, headers=headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        self.create_reports(3)
+        first = self.get(self.officer)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        self.assertIn('Authorization', first['Vary'])
+
+        # Only the version stamps: no report query, no serialization.
+        with self.assertNumQueries(1):
+            again = self.get(self.officer, if_none_match=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(again.content, b'')
+        since = self.get(self.officer, if_modified_since=first['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_any_write_changes_the_etag(self):
+        report = self.create_reports(1)[0]
+        etag = self.get(self.officer)['ETag']
+        Reportwaste.objects.filter(pk=report.pk).set_status('resolved')
+        changed = self.get(self.officer, if_none_match=etag)
+        self.assertEqual(changed.status_code, 200)
+
+        etag = changed['ETag']
+        self.citizen.username = 'renamed'
+        self.citizen.save()
+        self.assertEqual(self.get(self.officer, if_none_match=etag).status_code, 200)
+
+    def test_etag_is_per_user_and_ignores_logins(self):
+        self.create_reports(1)
+        officer_etag = self.get(self.officer)['ETag']
+        self.assertNotEqual(self.get(self.citizen)['ETag'], officer_etag)
+        self.assertTrue(self.client.login(username='officer', password='pass'))
+        self.assertEqual(self.get(self.officer, if_none_match=officer_etag).status_code, 304)
+
+
+class ApiEncodingTests(ReportAPITestCase):
+    def test_fast_renderer_matches_drf(self):
+        self.create_reports(3, description='Chupa za plastiki \u2028 tupu')
+        self.client.force_authenticate(self.officer)
+        page = self.client.get(self.list_url).data
+        self.assertEqual(FastJSONRenderer().render(page), JSONRenderer().render(page))
+        raw = {'at': timezone.now(), 'naive': datetime(2025, 1, 2, 3, 4, 5, 678901), 'amount': Decimal('1.50'), 2: None}
+        self.assertEqual(FastJSONRenderer().render(raw), JSONRenderer().render(raw))
+        pretty = FastJSONRenderer().render(page, 'application/json; indent=4')
+        self.assertEqual(pretty, JSONRenderer().render(page, 'application/json; indent=4'))
+
+    def test_malformed_json_is_a_parse_error(self):
+        self.client.force_authenticate(self.citizen)
+        response = self.client.post(self.list_url, '{"waste_type": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.data['detail'])
+
+    def test_large_responses_are_gzipped_when_accepted(self):
+        self.create_reports(30)
+        self.client.force_authenticate(self.officer)
+        plain = self.client.get(self.list_url)
+        self.assertNotIn('Content-Encoding', plain)
+        response = self.client.get(self.list_url, headers={'Accept-Encoding': 'gzip;q=1, br;q=0'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(plain.content))
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        not_modified = self.client.get(
+            self.list_url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    @skipIf(middleware.brotli is None, 'brotli is not installed')
+    def test_brotli_is_preferred(self):
+        self.create_reports(30)
+        self.client.force_authenticate(self.officer)
+        response = self.client.get(self.list_url, headers={'Accept-Encoding': 'gzip, deflate, br'})
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(middleware.brotli.decompress(response.content))['results'][0]['location'], 'Main street')
+
+    def test_credentialed_responses_are_only_gzipped(self):
+        self.create_reports(30)
+        token = RefreshToken.for_user(self.officer).access_token
+        response = self.client.get(
+            self.list_url, headers={'Accept-Encoding': 'br, gzip', 'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.client.force_authenticate(self.officer)
+        self.client.cookies['sessionid'] = 'x'
+        self.assertEqual(self.client.get(self.list_url, headers={'Accept-Encoding': 'br, gzip'})['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Encoding', self.client.get(self.list_url, headers={'Accept-Encoding': 'br'}))
+        # gzip output differs in length from one response to the next.
+        lengths = {len(self.client.get(self.list_url, headers={'Accept-Encoding': 'gzip'}).content) for _ in range(5)}
+        self.assertGreater(len(lengths), 1)
+
+    def test_small_responses_are_sent_as_they_are(self):
+        self.client.force_authenticate(self.officer)
+        response = self.client.get('/api/report/stats/', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_negotiation(self):
+        self.assertIsNone(middleware.negotiate(''))
+        self.assertIsNone(middleware.negotiate('identity, gzip;q=0'))
+        self.assertEqual(middleware.negotiate('*'), middleware.get_encodings()[0])
+        self.assertEqual(middleware.negotiate('GZIP;q=0.5'), 'gzip')
+        self.assertEqual(middleware.negotiate('br, gzip', padded=True), 'gzip')
+        self.assertIsNone(middleware.negotiate('br', padded=True))
+
+
+
+class RequestTimingTests(ReportAPITestCase):
+    def server_timing(self, response):
+        return {
+            metric.split(';')[0]: metric for metric in response['Server-Timing'].split(', ')
+        }
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing_header(self):
+        self.create_reports(3)
+        self.client.force_authenticate(self.officer)
+        caches['api'].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url)
+        metrics = self.server_timing(response)
+        self.assertEqual(set(metrics), {'total', 'db', 'permissions', 'serializer'})
+        self.assertIn(f'desc="{len(queries)} queries"', metrics['db'])
+
+    def test_request_log_line(self):
+        self.client.force_authenticate(self.officer)
+        with self.assertLogs('Myproject.middleware', 'INFO') as logs:
+            self.client.get(self.list_url + '?status=resolved')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['method'], line['path'], line['status']), ('GET', self.list_url, 200))
+        self.assertGreater(line['db_queries'], 0)
+        self.assertIn('permissions_ms', line)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_logged_with_their_call_site(self):
+        self.client.force_authenticate(self.officer)
+        with self.assertLogs('Myproject.instrumentation', 'WARNING') as logs:
+            self.client.get(self.list_url)
+        lines = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertTrue(all(line['event'] == 'slow_query' and line['path'] == self.list_url for line in lines))
+        self.assertTrue(any(line['call_site'].startswith('report/') for line in lines))
+
+    def test_sections_nest_and_are_free_outside_requests(self):
+        with instrumentation.section('serializer'):
+            pass
+        timings = instrumentation.Timings()
+        token = instrumentation.current.set(timings)
+        try:
+            with instrumentation.section('serializer'):
+                ReportwasteSerializer(self.create_reports(2), many=True).data
+        finally:
+            instrumentation.current.reset(token)
+        self.assertEqual(list(timings.sections), ['serializer'])
+
+    def test_server_timing_header_is_off_by_default(self):
+        self.client.force_authenticate(self.officer)
+        with self.assertLogs('Myproject.middleware', 'INFO'):
+            response = self.client.get(self.list_url)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING=False, SERVER_TIMING_HEADER=True)
+    def test_can_be_turned_off(self):
+        self.client.force_authenticate(self.officer)
+        self.assertNotIn('Server-Timing', self.client.get(self.list_url))
+
+
+class MetricsTests(ReportAPITestCase):
+    def sample(self, name, **labels):
+        return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_counted_by_route_and_status(self):
+        self.create_reports(2)
+        self.client.force_authenticate(self.officer)
+        labels = {'route': 'reportwaste-list', 'method': 'GET'}
+        before = self.sample('http_requests_total', status='200', **labels)
+        observed = self.sample('http_request_duration_seconds_count', **labels)
+        queries = self.sample('http_request_db_queries_sum', route='reportwaste-list')
+        self.client.get(self.list_url)
+        self.client.get('/api/report/report/999999/')
+        self.assertEqual(self.sample('http_requests_total', status='200', **labels), before + 1)
+        self.assertEqual(self.sample('http_request_duration_seconds_count', **labels), observed + 1)
+        self.assertGreater(self.sample('http_request_db_queries_sum', route='reportwaste-list'), queries)
+        self.assertGreater(self.sample('http_requests_total', route='reportwaste-detail', method='GET', status='404'), 0)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_endpoint(self):
+        self.client.force_authenticate(self.officer)
+        caches['api'].clear()
+        self.client.get(self.list_url)
+        self.client.get(self.list_url)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="reportwaste-list",status="200"}', body)
+        self.assertIn('api_cache_requests_total{namespace="reports",outcome="hits"} 1.0', body)
+        self.assertIn('api_cache_requests_total{namespace="reports",outcome="misses"} 1.0', body)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_off_without_a_token_unless_debugging(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret', SECURE_SSL_REDIRECT=True)
+    def test_metrics_are_not_served_over_plain_http(self):
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 301)
+
+class ReportResponseCacheTests(ReportAPITestCase):
+    def get(self, user, url=None):
+        self.client.force_authenticate(user)
+        return self.client.get(url or self.list_url)
+
+    def test_officers_share_cached_pages(self):
+        self.create_reports(3)
+        other_officer = User.objects.create_user('officer2', 'officer2@example.com', 'pass')
+        Userprofile.objects.create(user=other_officer, role='officer')
+        other_officer = User.objects.get(pk=other_officer.pk)
+        first = self.get(self.officer)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        # profile lookup + version stamps
+        with self.assertNumQueries(2):
+            second = self.get(other_officer)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_citizens_get_their_own_entries(self):
+        self.create_reports(2)
+        self.create_reports(1, user=self.officer)
+        self.assertEqual(len(self.get(self.officer).data['results']), 3)
+        response = self.get(self.citizen)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_writes_and_filters_miss_the_cache(self):
+        report = self.create_reports(1)[0]
+        self.get(self.officer)
+        self.client.patch(f'{self.list_url}{report.id}/', {'status': 'resolved'}, format='json')
+        response = self.get(self.officer)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['status'], 'resolved')
+        self.assertEqual(self.get(self.officer, f'{self.list_url}?status=pending')['X-Cache'], 'MISS')
+
+    def test_counters_are_exposed_to_officers(self):
+        self.get(self.officer)
+        self.get(self.officer)
+        self.client.force_authenticate(self.officer)
+        counters = self.client.get('/api/report/cache/').data
+        self.assertEqual(counters['reports'], {'hits': 1, 'misses': 1})
+        self.client.force_authenticate(self.citizen)
+        self.assertEqual(self.client.get('/api/report/cache/').status_code, 403)
+
+    def test_file_based_backend(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+        with override_settings(CACHES={'default': backend, 'api': backend}):
+            self.create_reports(1)
+            self.assertEqual(self.get(self.officer)['X-Cache'], 'MISS')
+            self.assertEqual(self.get(self.officer)['X-Cache'], 'HIT')
+
+
+
+class ReportEventTests(ReportAPITestCase):
+    url = '/api/report/events/'
+
+    def get_ticket(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(f'{self.url}ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['ticket']
+
+    async def open_stream(self, user):
+        ticket = await sync_to_async(self.get_ticket)(user)
+        response = await AsyncClient().get(self.url, {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertIn(b'retry: 5000', await anext(content))
+        return content
+
+    async def next_event(self, content):
+        chunk = (await asyncio.wait_for(anext(content), 5)).decode()
+        return json.loads(chunk.split('data: ', 1)[1])
+
+    def write(self, function):
+        # The test transaction never commits, so run the on_commit hooks here.
+        def run():
+            with self.captureOnCommitCallbacks(execute=True):
+                return function()
+        return sync_to_async(run)()
+
+    async def test_officer_receives_creates_and_status_changes(self):
+        content = await self.open_stream(self.officer)
+        report = (await self.write(lambda: self.create_reports(1)))[0]
+        event = await self.next_event(content)
+        self.assertEqual((event['type'], event['report']), ('created', report.id))
+
+        await self.write(lambda: Reportwaste.objects.filter(pk=report.pk).set_status('resolved'))
+        event = await self.next_event(content)
+        self.assertEqual(
+            (event['type'], event['status'], event['previous_status']),
+            ('status_changed', 'resolved', 'pending'),
+        )
+        await content.aclose()
+
+    async def test_citizens_only_receive_their_own_reports(self):
+        content = await self.open_stream(self.citizen)
+        await self.write(lambda: self.create_reports(1, user=self.officer))
+        own = (await self.write(lambda: self.create_reports(1)))[0]
+        event = await self.next_event(content)
+        self.assertEqual(event['report'], own.id)
+        await content.aclose()
+
+    async def test_closing_the_stream_unsubscribes(self):
+        broker = events.InProcessBroker()
+        content = events.stream(broker, await broker.subscribe(), 'all', self.officer.pk)
+        await anext(content)
+        self.assertEqual(broker.subscriber_count, 1)
+        await content.aclose()
+        self.assertEqual(broker.subscriber_count, 0)
+
+    async def test_asgi_router_serves_the_stream_itself(self):
+        paths = []
+
+        async def django_application(scope, receive, send):
+            paths.append(scope['path'])
+
+        application = events.route_streams(django_application)
+        await application({'type': 'http', 'path': '/api/report/report/'}, None, None)
+        self.assertEqual(paths, ['/api/report/report/'])
+
+        ticket = await sync_to_async(self.get_ticket)(self.officer)
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http', 'method': 'GET', 'path': self.url, 'query_string': f'ticket={ticket}'.encode(),
+            'headers': [(b'host', b'testserver')],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        self.assertEqual((await communicator.receive_output(5))['status'], 200)
+        self.assertIn(b'retry: 5000', (await communicator.receive_output(5))['body'])
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(5)
+        self.assertEqual(paths, ['/api/report/report/'])
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get(self.url, {'ticket': 'not-a-ticket'})
+        self.assertEqual(response.status_code, 401)
+        # Access tokens are not taken from the query string, where they would be logged.
+        token = str(RefreshToken.for_user(self.officer).access_token)
+        response = await AsyncClient().get(self.url, {'token': token})
+        self.assertEqual(response.status_code, 401)
+
+    def test_tickets_expire_and_need_a_user(self):
+        self.assertEqual(self.client.post(f'{self.url}ticket/').status_code, 401)
+        ticket = self.get_ticket(self.officer)
+        self.assertEqual(events.read_ticket(ticket), self.officer.pk)
+        # Signed for another purpose.
+        self.assertIsNone(events.read_ticket(signing.TimestampSigner().sign(str(self.officer.pk))))
+        with override_settings(REPORT_EVENTS_TICKET_MAX_AGE=-1):
+            self.assertIsNone(events.read_ticket(ticket))
+
+    def test_not_served_under_wsgi(self):
+        self.client.force_authenticate(self.officer)
+        self.assertEqual(self.client.get(self.url).status_code, 501)
+
+    @override_settings(REPORT_EVENTS_BACKEND='report.events.DatabaseBroker')
+    def test_database_broker_shares_and_replays_events(self):
+        broker = events.DatabaseBroker()
+        broker.fetch_new()
+        first = self.create_reports(1)[0]
+        second = self.create_reports(1)[0]
+        self.assertEqual([event['report'] for event in broker.fetch_new()], [first.id, second.id])
+        self.assertEqual(broker.fetch_new(), [])
+        first_id = ReportEvent.objects.get(payload__report=first.id).id
+        self.assertEqual([event['report'] for event in broker._since(first_id)], [second.id])
+
+
+class ReportAsyncViewTests(ReportAPITestCase):
+    async_list_url = '/api/async/report/report/'
+
+    def auth(self, user):
+        return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    async def test_list_matches_the_viewset(self):
+        await sync_to_async(self.create_reports)(3)
+        await sync_to_async(self.create_reports)(2, status='resolved')
+        self.client.force_authenticate(self.officer)
+        for query in ('', '?status=resolved', '?summary=true', '?fields=id,user_details', '?page_size=2'):
+            expected = await sync_to_async(self.client.get)(self.list_url + query)
+            response = await self.async_client.get(self.async_list_url + query, headers=self.auth(self.officer))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['results'], json.loads(expected.content)['results'])
+        self.assertIn('/api/async/report/report/?cursor=', response.json()['next'])
+
+    def test_list_reads_in_five_queries_then_hits_the_cache(self):
+        self.create_reports(5)
+        catalogue.get_catalogue()
+        get = async_to_sync(self.async_client.get)
+        headers = self.auth(self.officer)
+        # user + profile + version stamps + page + reporters
+        with self.assertNumQueries(5):
+            response = get(self.async_list_url, headers=headers)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        # user + profile + version stamps
+        with self.assertNumQueries(3):
+            response = get(self.async_list_url, headers=headers)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        not_modified = get(self.async_list_url, headers={**headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_citizens_see_their_own_reports(self):
+        own = (await sync_to_async(self.create_reports)(1))[0]
+        other = (await sync_to_async(self.create_reports)(1, user=self.officer))[0]
+        response = await self.async_client.get(self.async_list_url, headers=self.auth(self.citizen))
+        self.assertEqual([report['id'] for report in response.json()['results']], [own.id])
+        detail = await self.async_client.get(f'{self.async_list_url}{own.id}/', headers=self.auth(self.citizen))
+        self.assertEqual(detail.json()['id'], own.id)
+        hidden = await self.async_client.get(f'{self.async_list_url}{other.id}/', headers=self.auth(self.citizen))
+        self.assertEqual(hidden.status_code, 404)
+        anonymous = await self.async_client.get(self.async_list_url)
+        self.assertEqual(anonymous.json()['results'], [])
+
+    async def test_stats_and_errors(self):
+        await sync_to_async(self.create_reports)(2)
+        response = await self.async_client.get('/api/async/report/stats/', headers=self.auth(self.citizen))
+        self.assertEqual(response.json()['total'], 2)
+        self.assertEqual((await self.async_client.get('/api/async/report/stats/')).status_code, 401)
+        bad_token = await self.async_client.get(
+            '/api/async/report/stats/', headers={'Authorization': 'Bearer nonsense'}
+        )
+        self.assertEqual(bad_token.status_code, 401)
+        self.assertEqual(bad_token.json()['code'], 'token_not_valid')
+        self.assertIn('Bearer', bad_token['WWW-Authenticate'])
+        headers = self.auth(self.citizen)
+        self.citizen.is_active = False
+        await self.citizen.asave(update_fields=['is_active'])
+        inactive = await self.async_client.get('/api/async/report/stats/', headers=headers)
+        self.assertEqual(inactive.status_code, 401)
+        invalid = await self.async_client.get(
+            f'{self.async_list_url}?status=lost', headers=self.auth(self.officer)
+        )
+        self.assertEqual(invalid.status_code, 400)
+        self.assertIn('status', invalid.json())
+        post = await self.async_client.post('/api/async/report/stats/', headers=self.auth(self.officer))
+        self.assertEqual(post.status_code, 405)
+
+
+class ReportArchiveTests(ReportAPITestCase):
+    def create_aged(self, count, days, **fields):
+        reports = self.create_reports(count, **fields)
+        for report in reports:
+            report.time_created = timezone.now() - timezone.timedelta(days=days)
+            report.save()
+        return reports
+
+    def setUp(self):
+        super().setUp()
+        self.old_resolved = self.create_aged(3, 400, status='resolved')
+        self.recent_resolved = self.create_aged(1, 10, status='resolved')
+        self.old_pending = self.create_aged(1, 400)
+
+    def archive(self):
+        call_command('archive_reports', '--older-than', '180', '--batch-size', '2', stdout=StringIO())
+
+    def ids(self, reports):
+        return sorted(report.id for report in reports)
+
+    def test_moves_old_resolved_reports_and_keeps_the_counts(self):
+        stats_before = stats.get_stats()
+        self.archive()
+        self.assertEqual(sorted(ArchivedReport.objects.values_list('id', flat=True)), self.ids(self.old_resolved))
+        self.assertFalse(Reportwaste.objects.filter(id__in=self.ids(self.old_resolved)).exists())
+        self.assertEqual(stats.get_stats(), stats_before)
+        self.assertEqual(stats.rebuild(), stats_before)
+        self.assertEqual(rollups.verify(), [])
+        # A second run finds nothing left to move.
+        self.archive()
+        self.assertEqual(ArchivedReport.objects.count(), 3)
+
+    def test_deleting_the_reporter_removes_archived_reports_from_the_counts(self):
+        self.archive()
+        self.citizen.delete()
+        self.assertEqual(ArchivedReport.objects.count(), 0)
+        self.assertEqual(stats.get_stats()['total'], 0)
+        self.assertEqual(rollups.verify(), [])
+
+    def test_list_reads_the_archive_on_request(self):
+        self.archive()
+        self.client.force_authenticate(self.officer)
+        live = self.client.get(self.list_url).data['results']
+        self.assertEqual(len(live), 2)
+
+        seen, url = [], f'{self.list_url}?include_archived=true&page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen += [report['time_created'] for report in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        filtered = self.client.get(self.list_url, {'include_archived': 'true', 'status': 'resolved'}).data
+        self.assertEqual(len(filtered['results']), 4)
+
+    def test_archived_reports_are_read_only(self):
+        self.archive()
+        url = f'{self.list_url}{self.old_resolved[0].id}/'
+        self.client.force_authenticate(self.officer)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(url, {'include_archived': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'resolved')
+        self.assertEqual(self.client.patch(f'{url}?include_archived=true', {'status': 'pending'}, format='json').status_code, 404)
+
+    def test_a_loaded_report_archived_meanwhile_is_not_saved_again(self):
+        report = Reportwaste.objects.get(pk=self.old_resolved[0].pk)
+        self.archive()
+        report.description = 'Edited'
+        with self.assertRaises(DatabaseError):
+            report.save()
+        self.assertFalse(Reportwaste.objects.filter(pk=report.pk).exists())
+
+    def test_async_list_and_detail_match(self):
+        self.archive()
+        self.client.force_authenticate(self.officer)
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.officer).access_token}'}
+        get = async_to_sync(self.async_client.get)
+        query = '?include_archived=true&page_size=3'
+        response = get(f'/api/async/report/report/{query}', headers=headers)
+        self.assertEqual(response.json()['results'], json.loads(self.client.get(self.list_url + query).content)['results'])
+        detail = get(f'/api/async/report/report/{self.old_resolved[0].id}/?include_archived=true', headers=headers)
+        self.assertEqual(detail.json()['id'], self.old_resolved[0].id)
+
+
+class ReportWasteTypeTests(ReportAPITestCase):
+    def legacy_reports(self, names):
+        # Reports as the migration leaves them: only the free-text type.
+        reports = self.create_reports(len(names))
+        for report, name in zip(reports, names):
+            Reportwaste.objects.filter(pk=report.pk).update(waste_type=None, legacy_waste_type=name)
+        stats.rebuild()
+        rollups.rebuild()
+        return reports
+
+    def test_reports_are_written_and_read_by_name(self):
+        self.client.force_authenticate(self.citizen)
+        payload = {'location': 'Market', 'description': 'Bags'}
+        response = self.client.post(self.list_url, {**payload, 'waste_type': ' plastic '}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['waste_type'], 'Plastic')
+        self.assertEqual(Reportwaste.objects.get(pk=response.data['id']).waste_type, self.waste_types['Plastic'])
+        unknown = self.client.post(self.list_url, {**payload, 'waste_type': 'Asbestos'}, format='json')
+        self.assertEqual(unknown.status_code, 400)
+        self.assertIn('waste_type', unknown.data)
+
+    def test_backfill_maps_legacy_names_and_lists_the_rest(self):
+        reports = self.legacy_reports(['Glass', ' glass', 'Asbestos'])
+        self.client.force_authenticate(self.officer)
+        self.assertEqual(
+            [report['waste_type'] for report in self.client.get(self.list_url).data['results']],
+            ['Asbestos', ' glass', 'Glass'],
+        )
+        output = StringIO()
+        call_command('backfill_report_waste_types', '--batch-size', '2', stdout=output)
+        self.assertIn("'Asbestos': 1", output.getvalue())
+        self.assertEqual(
+            list(Reportwaste.objects.order_by('id').values_list('waste_type__name', 'legacy_waste_type')),
+            [('Glass', None), ('Glass', None), (None, 'Asbestos')],
+        )
+        self.assertEqual(stats.get_stats()['by_waste_type'], {'Asbestos': 1, 'Glass': 2})
+        self.assertEqual(rollups.verify(), [])
+        self.assertEqual(len(self.client.get(self.list_url, {'waste_type': 'Glass'}).data['results']), 2)
+
+        call_command('backfill_report_waste_types', '--create-missing', stdout=StringIO())
+        self.assertEqual(Reportwaste.objects.get(pk=reports[2].pk).waste_type.name, 'Asbestos')
+
+    def test_renaming_a_type_keeps_reports_and_renames_the_counts(self):
+        self.create_reports(2)
+        self.client.force_authenticate(self.officer)
+        first = self.client.get(self.list_url)
+        plastic = self.waste_types['Plastic']
+        plastic.name = 'Plastics'
+        plastic.save()
+        changed = self.client.get(self.list_url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual({report['waste_type'] for report in changed.data['results']}, {'Plastics'})
+        self.assertEqual(stats.get_stats()['by_waste_type'], {'Plastics': 2})
+        self.assertEqual(rollups.verify(), [])
+
+    def test_rename_onto_an_unmapped_name_merges_the_counts(self):
+        self.create_reports(1)
+        self.legacy_reports(['Plastics'])
+        plastic = self.waste_types['Plastic']
+        plastic.name = 'Plastics'
+        plastic.save()
+        self.assertEqual(stats.get_stats()['by_waste_type'], {'Plastics': 2})
+        self.assertEqual(rollups.verify(), [])
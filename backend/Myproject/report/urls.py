@@ -24,11 +24,23 @@ path('officer/', officer_reports, name='officer_reports'),
 ]'''
 
 
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import ReportwasteViewSet
+from .views import (
+    ApiCacheStatsView, ReportAnalyticsView, ReportClusterView, ReportWardResolutionView, ReportwasteViewSet,
+    ReportEventTicketView, ReportStatsView, report_events,
+)
 
 router = DefaultRouter()
 router.register(r'report', ReportwasteViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('stats/', ReportStatsView.as_view(), name='report_stats'),
+    path('clusters/', ReportClusterView.as_view(), name='report_clusters'),
+    path('analytics/', ReportAnalyticsView.as_view(), name='report_analytics'),
+    path('analytics/wards/', ReportWardResolutionView.as_view(), name='report_ward_resolution'),
+    path('cache/', ApiCacheStatsView.as_view(), name='api_cache_stats'),
+    path('events/', report_events, name='report_events'),
+    path('events/ticket/', ReportEventTicketView.as_view(), name='report_event_ticket'),
+] + router.urls
 
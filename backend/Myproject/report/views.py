@@ -66,38 +66,354 @@ def officer_reports(request):
 
 
 
-from django.shortcuts import render
-from rest_framework import viewsets
-from rest_framework.exceptions import PermissionDenied
+from collections import Counter
+
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from .models import Reportwaste
-from .serializers import ReportwasteSerializer
-from .permissions import IsAdminOrReadOnly
+from .models import ArchivedReport, Reportwaste
+from .serializers import AnalyticsQuerySerializer, BulkStatusSerializer, ClusterQuerySerializer, ReportwasteSerializer
+from . import export
+from django_filters.rest_framework import DjangoFilterBackend
+from .filters import ReportSearchFilter, ReportwasteFilter
+from .ingest import CREATED, DUPLICATE, INVALID, ingest_reports
+from .pagination import ReportCursorPagination
+from .permissions import IsAdminOrReadOnly, IsOfficerOrAdmin, report_scope
+from Myproject import versions
+from Myproject.caching import CachedListMixin, get_counters
+from Myproject.instrumentation import TimedViewMixin
+from Myproject.versions import ConditionalGetMixin
+from . import archive, clusters, events, rollups, stats
+from waste import catalogue
 
-class ReportwasteViewSet(viewsets.ModelViewSet):
+class ReportwasteViewSet(TimedViewMixin, ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Reportwaste.objects.all()
     serializer_class = ReportwasteSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = ReportCursorPagination
+    filterset_class = ReportwasteFilter
+    filter_backends = [DjangoFilterBackend, ReportSearchFilter]
+    # Reports embed their reporter and their waste type's name, and the
+    # reporter's role decides the scope.
+    version_resources = (versions.REPORTS, versions.USERS, versions.USERPROFILES, versions.WASTETYPES)
+    cache_namespace = versions.REPORTS
+
+    @property
+    def keyset_ordering(self):
+        return ReportSearchFilter.get_keyset_ordering(self.request)
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            if user.is_superuser or user.is_staff:
-                return Reportwaste.objects.all()
-            try:
-                from user.models import Userprofile
-                profile = Userprofile.objects.get(user=user)
-                if profile.role in ['officer', 'admin']:
-                    return Reportwaste.objects.all()
-                else:
-                    return Reportwaste.objects.filter(user=user)
-            except Userprofile.DoesNotExist:
-                return Reportwaste.objects.filter(user=user)
-        return Reportwaste.objects.none()
+        return ReportwasteSerializer.setup_eager_loading(self.get_scoped_queryset(), self.get_selected_fields())
+
+    def get_selected_fields(self):
+        # Reads only; writes answer with the whole report.
+        if self.action not in ('list', 'retrieve'):
+            return None
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = ReportwasteSerializer.select_fields(self.request.query_params)
+        return self._selected_fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_selected_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_scope(self):
+        return report_scope(self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        stamps = getattr(self, 'versions', None)
+        if stamps is not None:
+            # The waste type stamp read for the ETag also checks the catalogue.
+            context['wastetypes'] = catalogue.get_catalogue(stamp=stamps[versions.WASTETYPES])
+        return context
+
+    def get_scoped_queryset(self, model=Reportwaste):
+        scope = self.get_scope()
+        if scope == 'all':
+            return model.objects.all()
+        if scope == 'own':
+            return model.objects.filter(user=self.request.user)
+        return model.objects.none()
+
+    def get_archived_queryset(self):
+        archived = ReportwasteSerializer.setup_eager_loading(
+            self.get_scoped_queryset(ArchivedReport), self.get_selected_fields()
+        )
+        return archive.filter_archive(self.request, archived, self)
+
+    def paginate_queryset(self, queryset):
+        if self.action != 'list' or not archive.include_archived(self.request):
+            return super().paginate_queryset(queryset)
+        # One keyset page from each table, merged; see report.archive.
+        paginator = self.paginator
+        paginator.prepare(self.request, self)
+        return paginator.build_page(paginator.merge_results(
+            paginator.get_page_queryset(queryset),
+            paginator.get_page_queryset(self.get_archived_queryset()),
+        ))
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Archived reports can be read, never changed.
+            if self.action != 'retrieve' or not archive.include_archived(self.request):
+                raise
+        report = get_object_or_404(
+            ReportwasteSerializer.setup_eager_loading(
+                self.get_scoped_queryset(ArchivedReport), self.get_selected_fields()
+            ),
+            pk=self.kwargs['pk'],
+        )
+        self.check_object_permissions(self.request, report)
+        return report
+
+    def get_cache_scope(self):
+        # Everyone with the global view shares one set of cached pages.
+        scope = self.get_scope()
+        return f'user-{self.request.user.pk}' if scope == 'own' else str(scope)
     
+    def create(self, request, *args, **kwargs):
+        # A retried submit carrying a known client_key gets the original back.
+        client_key = request.data.get('client_key') if hasattr(request.data, 'get') else None
+        if client_key and request.user.is_authenticated:
+            existing = self.get_queryset().filter(user=request.user, client_key=client_key).first()
+            if existing is not None:
+                return Response(self.get_serializer(existing).data, status=status.HTTP_200_OK)
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
             serializer.save(user=self.request.user)
         else:
             raise PermissionDenied('Authentication is required to submit a report.')
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """Create a batch of reports in one transaction, with a result per item."""
+        if not request.user.is_authenticated:
+            raise PermissionDenied('Authentication is required to submit a report.')
+        items = request.data.get('reports') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of reports.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.REPORT_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'A batch may contain at most {settings.REPORT_BULK_MAX_ITEMS} reports.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = ingest_reports(items, request.user, self.get_serializer_context())
+        counts = Counter(result['status'] for result in results)
+        return Response(
+            {
+                'created': counts[CREATED],
+                'duplicates': counts[DUPLICATE],
+                'invalid': counts[INVALID],
+                'results': results,
+            },
+            status=status.HTTP_201_CREATED if counts[CREATED] else status.HTTP_200_OK,
+        )
+
+
+    @action(detail=False, methods=['post'], url_path='bulk-status', permission_classes=[IsOfficerOrAdmin])
+    def bulk_status(self, request):
+        """Set the status of many reports, picked by id or by list filters."""
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        reports = self.get_scoped_queryset()
+        if 'ids' in data:
+            reports = reports.filter(id__in=data['ids'])
+        else:
+            reports = ReportwasteFilter.from_dict(data['filter'], reports, request).qs
+        updated = reports.set_status(data['status'])
+        return Response({'updated': updated, 'status': data['status']})
+
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """Stream the filtered reports as CSV or NDJSON (``?output=``)."""
+        output = request.query_params.get('output', 'csv')
+        if output not in export.FORMATS:
+            return Response(
+                {'error': f"output must be one of: {', '.join(export.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        reports = self.filter_queryset(self.get_scoped_queryset())
+        archived = self.get_archived_queryset() if archive.include_archived(request) else None
+        iter_export = export.aiter_export if isinstance(request._request, ASGIRequest) else export.iter_export
+        response = StreamingHttpResponse(
+            iter_export(reports, output, archived=archived), content_type=export.FORMATS[output]
+        )
+        response['Content-Disposition'] = f'attachment; filename="reports.{output}"'
+        return response
+
+
+class ReportStatsView(APIView):
+    """Report totals per status and waste type, read from the counters table."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(stats.get_stats())
+
+
+class ReportClusterView(APIView):
+    """
+    Report counts per map cell for a viewport, read from the cluster table.
+
+    ``?bbox=west,south,east,north&zoom=12`` with optional ``status`` and
+    ``waste_type`` filters. Only users who may see every report get exact
+    centroids; everyone else gets cell centres (see clusters.get_clusters).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = ClusterQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        west, south, east, north = query.validated_data['bbox']
+        precision, cells = clusters.get_clusters(
+            south, west, north, east,
+            zoom=query.validated_data['zoom'],
+            status=query.validated_data.get('status'),
+            waste_type=query.validated_data.get('waste_type'),
+            exact=report_scope(request.user) == 'all',
+        )
+        return Response({'precision': precision, 'clusters': cells})
+
+
+class ReportAnalyticsView(APIView):
+    """
+    Report counts per day, week or month, read from the daily rollups.
+
+    ``?start=2025-01-01&end=2025-03-31&interval=week`` with an optional
+    ``group_by`` (``waste_type``, ``status`` or ``ward``) and optional
+    ``waste_type``, ``status`` and ``ward`` filters.
+    """
+
+    permission_classes = [IsOfficerOrAdmin]
+
+    def get(self, request):
+        query = AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        series = rollups.get_series(
+            params['start'], params['end'], params['interval'],
+            group_by=params.get('group_by'),
+            waste_type=params.get('waste_type'), status=params.get('status'), ward=params.get('ward'),
+        )
+        return Response({'interval': params['interval'], 'group_by': params.get('group_by'), 'series': series})
+
+
+class ReportWardResolutionView(APIView):
+    """
+    Per ward, the reports created between ``start`` and ``end`` and the
+    share of them resolved, read from the daily rollups.
+    """
+
+    permission_classes = [IsOfficerOrAdmin]
+
+    def get(self, request):
+        query = AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        return Response(rollups.get_ward_resolution(
+            params['start'], params['end'], waste_type=params.get('waste_type'), ward=params.get('ward'),
+        ))
+
+
+class ApiCacheStatsView(APIView):
+    """Hit and miss counters of the list response cache (see Myproject.caching)."""
+
+    permission_classes = [IsOfficerOrAdmin]
+
+    def get(self, request):
+        return Response(get_counters([versions.REPORTS, versions.WASTETYPES, versions.USERPROFILES]))
+
+
+class ReportEventTicketView(APIView):
+    """A short-lived ticket to open the event stream with (see report.events)."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'ticket': events.get_ticket(request.user),
+            'expires_in': settings.REPORT_EVENTS_TICKET_MAX_AGE,
+        })
+
+
+def authenticate_stream(request):
+    """
+    Return ``(user, scope)`` for an event stream, or ``(None, None)``.
+
+    EventSource cannot set headers, so besides the usual Authorization
+    header and session a stream ticket is accepted as ``?ticket=``; access
+    tokens never go in the query string, where they would be logged.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else None
+    try:
+        if raw_token is not None:
+            try:
+                user = authenticator.get_user(authenticator.get_validated_token(raw_token))
+            except (InvalidToken, AuthenticationFailed):
+                return None, None
+        elif 'ticket' in request.GET:
+            user_id = events.read_ticket(request.GET['ticket'])
+            user = User.objects.filter(pk=user_id, is_active=True).first() if user_id is not None else None
+            if user is None:
+                return None, None
+        else:
+            user = request.user
+        scope = report_scope(user)
+        return (user, scope) if scope else (None, None)
+    finally:
+        # The stream can stay open for hours; hand the connection back now
+        # instead of when the response closes.
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def report_events(request):
+    """Server-sent events for report creates and status changes (see report.events)."""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI an endless stream would hold a worker forever.
+        return JsonResponse({'detail': 'Live events are only served by the ASGI application.'}, status=501)
+    user, scope = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    broker = events.get_broker()
+    subscription = await broker.subscribe(last_event_id)
+    response = StreamingHttpResponse(
+        events.stream(broker, subscription, scope, user.pk), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.db import IntegrityError
+from Myproject.instrumentation import TimedSerializerMixin
 from .models import Userprofile
 
 class UserSerializer(serializers.ModelSerializer):
@@ -8,7 +9,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
-class UserprofileSerializer(serializers.ModelSerializer):
+class UserprofileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     user_id = serializers.IntegerField(write_only=True, required=False)
     
@@ -17,7 +18,7 @@ class UserprofileSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'user_id', 'phone_number', 'role']
         read_only_fields = ['id', 'user']
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password2 = serializers.CharField(write_only=True)
     phone_number = serializers.CharField(max_length=20, required=False, allow_blank=True)
     role = serializers.CharField(max_length=20, required=False, default='citizen')
@@ -50,6 +51,6 @@ class RegisterSerializer(serializers.ModelSerializer):
         Userprofile.objects.create(user=user, phone_number=phone_number, role=role)
         return user
 
-class LoginSerializer(serializers.Serializer):
+class LoginSerializer(TimedSerializerMixin, serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField()
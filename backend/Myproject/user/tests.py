@@ -1,3 +1,33 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Userprofile
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UserprofileConditionalGetTests(TestCase):
+    url = '/api/user/user/'
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['api'].clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', is_staff=True)
+        self.citizen = User.objects.create_user('citizen', 'citizen@example.com', 'pass')
+        self.profile = Userprofile.objects.create(user=self.citizen, role='citizen')
+        self.client.force_authenticate(self.admin)
+
+    def test_profiles_revalidate_until_a_profile_or_user_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+
+        self.profile.role = 'officer'
+        self.profile.save()
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.citizen.email = 'new@example.com'
+        self.citizen.save()
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 200)
@@ -7,6 +7,10 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from .models import Userprofile
 from report.models import Reportwaste
+from Myproject import versions
+from Myproject.caching import CachedListMixin
+from Myproject.instrumentation import TimedViewMixin, section
+from Myproject.versions import ConditionalGetMixin
 
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import api_view
@@ -76,15 +80,16 @@ def dashboard_view(request):
         role = profile.role
 
     if request.method == 'POST' and role == 'officer':
+        # One UPDATE per target status instead of a get() and save() per report.
+        ids_by_status = {}
+        valid_statuses = dict(Reportwaste.STATUS_CHOICES)
         for key, value in request.POST.items():
-            if key.startswith('status_'):
+            if key.startswith('status_') and value in valid_statuses:
                 report_id = key.split('_')[1]
-                try:
-                    report = Reportwaste.objects.get(id=report_id)
-                    report.status = value
-                    report.save()
-                except Reportwaste.DoesNotExist:
-                    pass
+                if report_id.isdigit():
+                    ids_by_status.setdefault(value, []).append(int(report_id))
+        for new_status, report_ids in ids_by_status.items():
+            Reportwaste.objects.filter(id__in=report_ids).set_status(new_status)
         return redirect('/dashboard/')
 
     if role == 'citizen':
@@ -157,14 +162,16 @@ def login_api(request):
         username = serializer.validated_data['username'].strip()
         password = serializer.validated_data['password']
 
-        # Support login by username (case-insensitive) or email.
-        user = authenticate(username=username, password=password)
-        if user is None and username:
-            matched_user = User.objects.filter(
-                Q(username__iexact=username) | Q(email__iexact=username)
-            ).first()
-            if matched_user:
-                user = authenticate(username=matched_user.username, password=password)
+        # Support login by username (case-insensitive) or email. Password
+        # hashing is most of a login, so it gets its own timing.
+        with section('authenticate'):
+            user = authenticate(username=username, password=password)
+            if user is None and username:
+                matched_user = User.objects.filter(
+                    Q(username__iexact=username) | Q(email__iexact=username)
+                ).first()
+                if matched_user:
+                    user = authenticate(username=matched_user.username, password=password)
 
         if user is not None:
             login(request, user)
@@ -223,10 +230,12 @@ def logout_api(request):
     logout(request)
     return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
 
-class UserprofileViewSet(viewsets.ModelViewSet):
+class UserprofileViewSet(TimedViewMixin, ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Userprofile.objects.all()
     serializer_class = UserprofileSerializer
     permission_classes = [IsAdmin]
+    version_resources = (versions.USERPROFILES, versions.USERS)
+    cache_namespace = versions.USERPROFILES
     
     def perform_create(self, serializer):
         """Override to set user from request"""
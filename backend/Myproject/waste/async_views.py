@@ -0,0 +1,25 @@
+from rest_framework.response import Response
+
+from Myproject import versions
+from Myproject.async_views import AsyncAPIView
+from Myproject.caching import acount
+from . import catalogue
+from .views import IsAdmin
+
+
+class WastetypeListAsyncView(AsyncAPIView):
+    """``/api/async/waste/waste/``: the waste type list, from the catalogue (see waste.catalogue)."""
+
+    permission_classes = [IsAdmin]
+    version_resources = (versions.WASTETYPES,)
+
+    async def get_resource_versions(self):
+        previous = catalogue.peek()
+        self.catalogue = await catalogue.aget_catalogue()
+        self.catalogue_reloaded = self.catalogue is not previous
+        return {versions.WASTETYPES: (self.catalogue.version, self.catalogue.updated_at)}
+
+    async def get(self, request):
+        await acount(versions.WASTETYPES, 'misses' if self.catalogue_reloaded else 'hits')
+        self.cache_status = 'MISS' if self.catalogue_reloaded else 'HIT'
+        return Response(self.catalogue.entries)
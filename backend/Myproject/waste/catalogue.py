@@ -0,0 +1,123 @@
+"""
+Process-local cache of the waste type catalogue.
+
+The report form loads the catalogue every time it opens, and every report
+the API returns carries its waste type's name, yet the catalogue changes
+perhaps once a month. Each process keeps one ``Catalogue``: the serialized
+list the API returns plus lookups by id and by name, tagged with the
+``wastetypes`` version stamp (Myproject.versions) it was read at.
+
+For ``WASTETYPE_CATALOGUE_CHECK_INTERVAL`` seconds the catalogue is used
+without touching the database. After that the stamp is read again (one
+small query) and the catalogue is only reloaded if the stamp moved, so an
+edit made in any worker shows up everywhere within the interval. Writes
+in this process drop the catalogue at once (see report.signals).
+
+Only reads use it: the report signals still name waste types from the
+database, so the counters never follow a stale name.
+"""
+import time
+
+from django.conf import settings
+
+from Myproject import versions
+from .models import Wastetype
+from .serializers import WastetypeSerializer
+
+
+class Catalogue:
+    def __init__(self, version, updated_at, entries):
+        self.version = version
+        self.updated_at = updated_at
+        self.entries = entries
+        self.by_id = {entry['id']: entry for entry in entries}
+        self.by_name = {}
+        # Names match like WasteTypeField's input: case-insensitively, and
+        # the oldest entry wins when several match.
+        for entry in sorted(entries, key=lambda entry: entry['id'], reverse=True):
+            self.by_name[entry['name'].strip().casefold()] = entry
+
+    def get_name(self, id):
+        entry = self.by_id.get(id)
+        return entry['name'] if entry is not None else None
+
+    def get_instance(self, name):
+        """The entry named ``name`` as a ``Wastetype`` to assign to a report, or None."""
+        entry = self.by_name.get(name.strip().casefold())
+        if entry is None:
+            return None
+        return Wastetype(**entry)
+
+
+# (catalogue, time.monotonic() of the last check); replaced, never mutated,
+# so threads can share it without a lock.
+_state = (None, 0.0)
+
+
+def _cached(ids):
+    catalogue, checked_at = _state
+    if catalogue is None or time.monotonic() - checked_at >= settings.WASTETYPE_CATALOGUE_CHECK_INTERVAL:
+        return None
+    if not set(ids) <= catalogue.by_id.keys():
+        return None
+    return catalogue
+
+
+def _store(catalogue):
+    global _state
+    _state = (catalogue, time.monotonic())
+    return catalogue
+
+
+def _is_current(catalogue, version, updated_at, ids):
+    return (
+        catalogue is not None
+        and (catalogue.version, catalogue.updated_at) == (version, updated_at)
+        and set(ids) <= catalogue.by_id.keys()
+    )
+
+
+def _build(version, updated_at, wastes):
+    return Catalogue(version, updated_at, [dict(entry) for entry in WastetypeSerializer(wastes, many=True).data])
+
+
+def peek():
+    """The catalogue this process holds, without checking it; None if there is none."""
+    return _state[0]
+
+
+def get_catalogue(ids=(), stamp=None):
+    """
+    Return the catalogue, checking the version stamp if the interval has
+    passed or if any of the waste type ``ids`` is missing from it (an entry
+    created in another worker since the last check).
+
+    A view that has just read the ``wastetypes`` stamp for its ETag passes
+    it as ``stamp``, a ``(version, updated_at)`` pair, and the catalogue is
+    checked against it with no query of its own.
+    """
+    catalogue = _cached(ids) if stamp is None else None
+    if catalogue is not None:
+        return catalogue
+    catalogue = _state[0]
+    # Read before the data, as ConditionalGetMixin does.
+    version, updated_at = stamp or versions.get_versions([versions.WASTETYPES])[versions.WASTETYPES]
+    if not _is_current(catalogue, version, updated_at, ids):
+        catalogue = _build(version, updated_at, Wastetype.objects.all())
+    return _store(catalogue)
+
+
+async def aget_catalogue(ids=(), stamp=None):
+    catalogue = _cached(ids) if stamp is None else None
+    if catalogue is not None:
+        return catalogue
+    catalogue = _state[0]
+    version, updated_at = stamp or (await versions.aget_versions([versions.WASTETYPES]))[versions.WASTETYPES]
+    if not _is_current(catalogue, version, updated_at, ids):
+        catalogue = _build(version, updated_at, [waste async for waste in Wastetype.objects.all()])
+    return _store(catalogue)
+
+
+def invalidate():
+    global _state
+    _state = (None, 0.0)
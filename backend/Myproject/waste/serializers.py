@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from Myproject.instrumentation import TimedSerializerMixin
 from .models import Wastetype
 
-class WastetypeSerializer(serializers.ModelSerializer):
+class WastetypeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Wastetype
         fields = ['id', 'name', 'description']
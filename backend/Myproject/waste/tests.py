@@ -1,3 +1,79 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from Myproject import versions
+from report.models import Reportwaste
+from user.models import Userprofile
+from . import catalogue
+from .models import Wastetype
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class WastetypeConditionalGetTests(TestCase):
+    url = '/api/waste/waste/'
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['api'].clear()
+        catalogue.invalidate()
+        self.user = User.objects.create_user('citizen', 'citizen@example.com', 'pass')
+        Userprofile.objects.create(user=self.user, role='citizen')
+        self.client.force_authenticate(self.user)
+        Wastetype.objects.create(name='Plastic', description='Bottles and bags')
+
+    def test_catalogue_revalidates_until_it_changes(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': first['ETag']}).status_code, 304)
+        self.assertEqual(self.client.get(f'{self.url}{Wastetype.objects.get().pk}/', headers={'If-None-Match': first['ETag']}).status_code, 200)
+
+        Wastetype.objects.create(name='Glass', description='Bottles')
+        changed = self.client.get(self.url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.data), 2)
+
+    def test_async_list_matches_and_revalidates(self):
+        get = async_to_sync(self.async_client.get)
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = get('/api/async/waste/waste/', headers=headers)
+        self.assertEqual(response.json(), self.client.get(self.url).json())
+        self.assertEqual(get('/api/async/waste/waste/', headers={**headers, 'If-None-Match': response['ETag']}).status_code, 304)
+        self.assertEqual(get('/api/async/waste/waste/').status_code, 401)
+
+    def test_types_in_use_cannot_be_deleted(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', 'pass', is_staff=True)
+        self.client.force_authenticate(admin)
+        plastic = Wastetype.objects.get()
+        Reportwaste.objects.create(user=self.user, waste_type=plastic, location='Market', description='Bags')
+        response = self.client.delete(f'{self.url}{plastic.pk}/')
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Wastetype.objects.filter(pk=plastic.pk).exists())
+
+    @override_settings(WASTETYPE_CATALOGUE_CHECK_INTERVAL=60)
+    def test_catalogue_serves_the_list_without_queries(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual([waste['name'] for waste in response.data], ['Plastic'])
+
+        # Written by another process: no signal reaches this one, only the stamp.
+        Wastetype.objects.update(name='Plastics')
+        versions.bump(versions.WASTETYPES)
+        self.assertEqual(self.client.get(self.url).data[0]['name'], 'Plastic')
+        with override_settings(WASTETYPE_CATALOGUE_CHECK_INTERVAL=0):
+            self.assertEqual(self.client.get(self.url).data[0]['name'], 'Plastics')
+
+    def test_writes_in_this_process_show_at_once(self):
+        self.client.get(self.url)
+        plastic = Wastetype.objects.get()
+        plastic.name = 'Plastics'
+        plastic.save()
+        self.assertEqual(self.client.get(self.url).data[0]['name'], 'Plastics')
+        report = Reportwaste.objects.create(user=self.user, waste_type=plastic, location='Market', description='Bags')
+        detail = self.client.get(f'/api/report/report/{report.pk}/')
+        self.assertEqual(detail.data['waste_type'], 'Plastics')
@@ -8,8 +8,15 @@ def waste_list(request):
     wastes = Wastetype.objects.all()
     return render(request, 'waste/waste_list.html', {'wastes': wastes})'''
 
+from django.db.models import ProtectedError
 from django.shortcuts import render
-from rest_framework import viewsets, permissions
+from rest_framework import permissions, status, viewsets
+from rest_framework.response import Response
+from Myproject import versions
+from Myproject.caching import count
+from Myproject.instrumentation import TimedViewMixin
+from Myproject.versions import ConditionalGetMixin
+from . import catalogue
 from .models import Wastetype
 from .serializers import WastetypeSerializer
 
@@ -27,7 +34,40 @@ class IsAdmin(permissions.BasePermission):
         except:
             return False
 
-class WastetypeViewSet(viewsets.ModelViewSet):
+class WastetypeViewSet(TimedViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Wastetype.objects.all()
     serializer_class = WastetypeSerializer
     permission_classes = [IsAdmin]
+    version_resources = (versions.WASTETYPES,)
+    cache_status = None
+
+    def get_resource_versions(self):
+        # The process-local catalogue carries the version it was read at,
+        # so while it is fresh the list needs no query at all.
+        previous = catalogue.peek()
+        self.catalogue = catalogue.get_catalogue()
+        self.catalogue_reloaded = self.catalogue is not previous
+        return {versions.WASTETYPES: (self.catalogue.version, self.catalogue.updated_at)}
+
+    def list(self, request, *args, **kwargs):
+        response = self.get_not_modified_response(request)
+        if response is not None:
+            return response
+        count(versions.WASTETYPES, 'misses' if self.catalogue_reloaded else 'hits')
+        self.cache_status = 'MISS' if self.catalogue_reloaded else 'HIT'
+        return Response(self.catalogue.entries)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.cache_status:
+            response['X-Cache'] = self.cache_status
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            return Response(
+                {'error': 'This waste type is used by reports and cannot be deleted.'},
+                status=status.HTTP_409_CONFLICT,
+            )
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { reportAPI, userAPI, wasteAPI } from '../services/api';
 import '../styles/Dashboard.css';
@@ -12,6 +12,12 @@ const Dashboard = () => {
   const [wasteForm, setWasteForm] = useState({ name: '', description: '' });
   const [savingWasteType, setSavingWasteType] = useState(false);
   const [loading, setLoading] = useState(true);
+  // Cursor of the next page of reports, or null on the last page.
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Read by the live refresh, whose callback outlives renders.
+  const reportsRef = useRef(reports);
+  reportsRef.current = reports;
   const [error, setError] = useState('');
   const [activeTab, setActiveTab] = useState('reports');
 
@@ -23,18 +29,52 @@ const Dashboard = () => {
     }
   }, [user, role]);
 
-  const fetchReports = async () => {
+  useEffect(() => {
+    if (!user) return undefined;
+    // Refresh quietly whenever a report is created or changes status.
+    return reportAPI.subscribeToEvents(() => fetchReports({ quiet: true }));
+  }, [user]);
+
+  // The table shows no map coordinates or image derivatives.
+  const REPORT_PARAMS = { omit: 'thumbnail,image_medium,client_key,latitude,longitude,ward' };
+
+  const getCursor = (nextUrl) => {
+    if (!nextUrl) return null;
+    return new URL(nextUrl, window.location.origin).searchParams.get('cursor');
+  };
+
+  // Reports come newest first; true when a is older than b.
+  const isOlder = (a, b) => (
+    a.time_created === b.time_created ? a.id < b.id : new Date(a.time_created) < new Date(b.time_created)
+  );
+
+  const fetchReports = async ({ quiet = false } = {}) => {
     try {
-      setLoading(true);
+      if (!quiet) setLoading(true);
       setError('');
-      const response = await reportAPI.getReports();
+      const response = await reportAPI.getReports(REPORT_PARAMS);
       const payload = response.data;
-      const reportList = Array.isArray(payload)
-        ? payload
-        : Array.isArray(payload?.results)
-          ? payload.results
+      if (Array.isArray(payload)) {
+        setReports(payload);
+        setNextCursor(null);
+        return;
+      }
+      const firstPage = Array.isArray(payload?.results) ? payload.results : [];
+      const firstCursor = getCursor(payload?.next);
+      if (quiet) {
+        // Keep the pages loaded with "Load more" below the refreshed first
+        // page; the cursor after them stays valid.
+        const last = firstPage[firstPage.length - 1];
+        const ids = new Set(firstPage.map(report => report.id));
+        const older = firstCursor && last
+          ? reportsRef.current.filter(report => !ids.has(report.id) && isOlder(report, last))
           : [];
-      setReports(reportList);
+        setReports([...firstPage, ...older]);
+        if (older.length === 0) setNextCursor(firstCursor);
+      } else {
+        setReports(firstPage);
+        setNextCursor(firstCursor);
+      }
     } catch (err) {
       const apiMessage =
         err?.response?.data?.detail ||
@@ -48,6 +88,25 @@ const Dashboard = () => {
     }
   };
 
+  const loadMoreReports = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await reportAPI.getReports({ ...REPORT_PARAMS, cursor: nextCursor });
+      const page = Array.isArray(response.data?.results) ? response.data.results : [];
+      setReports(previous => {
+        const ids = new Set(previous.map(report => report.id));
+        return [...previous, ...page.filter(report => !ids.has(report.id))];
+      });
+      setNextCursor(getCursor(response.data?.next));
+    } catch (err) {
+      setError(err?.response?.data?.detail || 'Failed to load more reports');
+      console.error('Error loading more reports:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchUsers = async () => {
     try {
       const response = await userAPI.getProfiles();
@@ -154,7 +213,7 @@ const Dashboard = () => {
         await wasteAPI.deleteWaste(wasteId);
         setWasteTypes(wasteTypes.filter(w => w.id !== wasteId));
       } catch (err) {
-        setError('Failed to delete waste type');
+        setError(err.response?.data?.error || 'Failed to delete waste type');
         console.error('Error deleting waste type:', err);
       }
     }
@@ -241,6 +300,13 @@ const Dashboard = () => {
             ))}
           </tbody>
         </table>
+        {nextCursor && (
+          <div className="load-more">
+            <button className="btn-small" onClick={loadMoreReports} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more reports'}
+            </button>
+          </div>
+        )}
       </div>
     )
   );
@@ -161,9 +161,6 @@ const ReportWaste = () => {
         <form onSubmit={handleSubmit}>
           <div className="form-group">
             <label htmlFor="waste_type">Waste Type *</label>
-            <small style={{display: 'block', marginBottom: '8px', color: '#666'}}>
-              Select from the dropdown or type manually below
-            </small>
             <select
               id="waste_type"
               name="waste_type"
@@ -180,17 +177,9 @@ const ReportWaste = () => {
                   </option>
                 ))
               ) : (
-                <option disabled>No waste types available - enter manually</option>
+                <option disabled>No waste types available</option>
               )}
             </select>
-            <small>Can't find your type? Use the text field below instead</small>
-            <input
-              type="text"
-              placeholder="Or type waste type here..."
-              value={formData.waste_type}
-              onChange={(e) => setFormData(prev => ({...prev, waste_type: e.target.value}))}
-              style={{marginTop: '8px'}}
-            />
           </div>
 
           <div className="form-group">
@@ -99,8 +99,10 @@ export const wasteAPI = {
 
 // API methods for Reports
 export const reportAPI = {
-  getReports: () => api.get('/report/report/'),
+  getReports: (params = {}) => api.get('/report/report/', { params }),
   getReport: (id) => api.get(`/report/report/${id}/`),
+  getStats: () => api.get('/report/stats/'),
+  getClusters: (bbox, zoom, params = {}) => api.get('/report/clusters/', { params: { bbox: bbox.join(','), zoom, ...params } }),
   createReport: (data) => {
     // Use FormData for file uploads
     const formData = new FormData();
@@ -113,6 +115,38 @@ export const reportAPI = {
   },
   updateReport: (id, data) => api.patch(`/report/report/${id}/`, data),
   deleteReport: (id) => api.delete(`/report/report/${id}/`),
+  // Live report creates and status changes. EventSource cannot send headers,
+  // and an access token in the URL would end up in access logs, so the stream
+  // is opened with a short-lived ticket. Once the browser's own reconnect is
+  // refused (the ticket has expired), a new ticket is fetched.
+  // Returns an unsubscribe function.
+  subscribeToEvents: (onEvent) => {
+    let source = null;
+    let stopped = false;
+    const handler = (message) => onEvent(JSON.parse(message.data));
+    const reconnect = () => {
+      if (!stopped) setTimeout(connect, 5000);
+    };
+    const connect = async () => {
+      try {
+        const { data } = await api.post('/report/events/ticket/');
+        if (stopped) return;
+        source = new EventSource(`${API_BASE_URL}/report/events/?ticket=${encodeURIComponent(data.ticket)}`);
+        source.addEventListener('created', handler);
+        source.addEventListener('status_changed', handler);
+        source.onerror = () => {
+          if (source.readyState === EventSource.CLOSED) reconnect();
+        };
+      } catch (error) {
+        reconnect();
+      }
+    };
+    connect();
+    return () => {
+      stopped = true;
+      if (source) source.close();
+    };
+  },
 };
 
 export default api;